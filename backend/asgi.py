@@ -0,0 +1,227 @@
+"""
+ASGI variant of the search endpoints, for many concurrent, mostly idle
+client connections.
+
+Serves POST /api/search, GET /search, GET /health, GET /ready and
+GET /metrics with the same request and response schema as server.py (it
+runs the same SearchPipeline). Startup does not wait for the model and
+index: they load on server.start_warmup()'s thread while lexical results
+are served. The event loop only parses requests and writes responses; every search
+(encoding, FAISS, scoring) runs on a bounded thread pool:
+
+  - SEARCH_MAX_INFLIGHT searches run at once (pool size);
+  - up to SEARCH_MAX_QUEUE more wait for a thread; beyond that requests are
+    rejected at once with 503 and Retry-After (backpressure);
+  - a search not finished after SEARCH_TIMEOUT_S seconds gets 504;
+  - on a timeout or a client disconnect the search is cancelled: it stops
+    before its next pipeline stage instead of finishing for nobody.
+
+Searches still count against the limits until their thread actually
+returns, so abandoned work cannot pile up.
+
+Run with any ASGI server, e.g.:
+  pip install uvicorn
+  uvicorn backend.asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import MultiDict
+
+try:
+    from backend import metrics, server
+    from backend.pipeline import SearchRequest, SearchCancelled, InvalidCursor
+except ImportError:
+    import metrics
+    import server
+    from pipeline import SearchRequest, SearchCancelled, InvalidCursor
+
+MAX_INFLIGHT = int(os.environ.get("SEARCH_MAX_INFLIGHT", 8))
+MAX_QUEUE = int(os.environ.get("SEARCH_MAX_QUEUE", 256))
+TIMEOUT_S = float(os.environ.get("SEARCH_TIMEOUT_S", 10))
+MAX_BODY = 1 << 20
+
+_executor = ThreadPoolExecutor(max_workers=MAX_INFLIGHT, thread_name_prefix="search")
+_admitted = 0  # searches queued or running; only touched on the event loop
+
+
+class _ClientGone(Exception):
+    pass
+
+
+class _Rejected(Exception):
+    def __init__(self, status, message, headers=()):
+        self.status = status
+        self.message = message
+        self.headers = list(headers)
+
+
+def _json_body(payload):
+    # Same bytes as Flask's jsonify in non-debug mode
+    return (json.dumps(payload, sort_keys=True, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+async def _send_json(send, status, payload, headers=()):
+    await _send_body(send, status, _json_body(payload), headers)
+
+
+async def _send_body(send, status, body, headers=(), content_type=b"application/json"):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type),
+                    (b"content-length", str(len(body)).encode())] + list(headers),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive):
+    chunks, size = [], 0
+    while True:
+        msg = await receive()
+        if msg["type"] == "http.disconnect":
+            raise _ClientGone()
+        chunk = msg.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY:
+            raise _Rejected(413, "Request body too large")
+        chunks.append(chunk)
+        if not msg.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _wait_disconnect(receive):
+    while True:
+        msg = await receive()
+        if msg["type"] == "http.disconnect":
+            return
+
+
+def _release(_):
+    global _admitted
+    _admitted -= 1
+
+
+async def run_search(req, receive):
+    """Runs one search on the pool, honoring the queue limit, timeout and disconnects."""
+    global _admitted
+    if _admitted >= MAX_INFLIGHT + MAX_QUEUE:
+        raise _Rejected(503, "Server busy, retry shortly", [(b"retry-after", b"1")])
+    loop = asyncio.get_running_loop()
+    cancel = threading.Event()
+    _admitted += 1
+    fut = asyncio.wrap_future(_executor.submit(server.PIPELINE.run, req, cancel), loop=loop)
+    fut.add_done_callback(_release)
+    watcher = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        done, _ = await asyncio.wait({fut, watcher}, timeout=TIMEOUT_S, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    if fut in done:
+        return fut.result()
+    cancel.set()
+    if watcher in done:
+        raise _ClientGone()  # nobody left to answer
+    raise _Rejected(504, "Search timed out")
+
+
+async def _search(scope, receive, send):
+    if server.warming_up():
+        raise _Rejected(503, "Search is warming up, retry shortly",
+                        [(b"retry-after", str(server.WARMUP_RETRY_AFTER).encode())])
+    if scope["path"] == "/api/search":
+        raw = await _read_body(receive)
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            body = {}
+        req = SearchRequest.from_json(body if isinstance(body, dict) else {})
+    else:
+        args = MultiDict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+        req = SearchRequest.from_args(args)
+    ctx = await run_search(req, receive)
+    query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+    payload = server.search_payload(ctx, query.get("debug_timing") == "1")
+    with metrics.timed("serialize"):
+        body = _json_body(payload)
+    await _send_body(send, 200, body)
+
+
+async def _lifespan(receive, send):
+    while True:
+        msg = await receive()
+        if msg["type"] == "lifespan.startup":
+            try:
+                if server.READINESS["state"] == "idle":  # not loaded by an embedding process
+                    server.start_warmup()
+                server.start_background()
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif msg["type"] == "lifespan.shutdown":
+            _executor.shutdown(wait=False, cancel_futures=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+ROUTES = {("POST", "/api/search"), ("GET", "/search"), ("GET", "/health"), ("GET", "/ready"),
+          ("GET", "/metrics")}
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    t0 = time.perf_counter()
+    status = []
+
+    async def send_recorded(msg):
+        if msg["type"] == "http.response.start":
+            status.append(msg["status"])
+        await send(msg)
+
+    try:
+        await _dispatch(scope, receive, send_recorded)
+    finally:
+        endpoint = scope["path"] if any(p == scope["path"] for _, p in ROUTES) else "unmatched"
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - t0, endpoint)
+        metrics.REQUESTS.inc(1, endpoint, status[0] if status else 499)  # 499: client went away
+
+
+async def _dispatch(scope, receive, send):
+    method, path = scope["method"], scope["path"]
+    if (method, path) not in ROUTES:
+        status = 405 if any(p == path for _, p in ROUTES) else 404
+        return await _send_json(send, status, {"success": False, "message": "Not found" if status == 404 else "Method not allowed"})
+    if path == "/health":
+        return await _send_json(send, 200, {
+            "status": "ok",
+            "count": len(server.DATA.get("nonprofits", [])),
+            "ts": datetime.utcnow().isoformat()
+        })
+    if path == "/metrics":
+        return await _send_body(send, 200, metrics.render().encode("utf-8"),
+                                content_type=metrics.CONTENT_TYPE.encode())
+    if path == "/ready":
+        body, ok = server.readiness()
+        if ok:
+            return await _send_json(send, 200, body)
+        return await _send_json(send, 503, body, [(b"retry-after", str(server.WARMUP_RETRY_AFTER).encode())])
+    try:
+        await _search(scope, receive, send)
+    except _Rejected as e:
+        await _send_json(send, e.status, {"success": False, "message": e.message}, e.headers)
+    except InvalidCursor as e:
+        await _send_json(send, 400, {"success": False, "message": str(e)})
+    except (_ClientGone, SearchCancelled):
+        return  # client disconnected: nothing to send
+    except Exception:
+        await _send_json(send, 500, {"success": False, "message": "Internal server error"})
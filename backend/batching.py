@@ -0,0 +1,102 @@
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    from backend import metrics
+except ImportError:
+    import metrics
+
+
+class QueryBatcher:
+    """
+    Collects single-query searches from concurrent request threads and runs
+    them as one batched call.
+
+    A batch closes when `window_ms` has passed since its first query arrived
+    or when `max_batch` queries are waiting, whichever comes first. The
+    batched function is called as `batch_fn(query_texts, top_k)` with the
+    largest top_k in the batch and must return one hit list per query; each
+    caller gets its own list trimmed back to the top_k it asked for.
+
+    Stage timings recorded while the batch runs (encode, index_search) are
+    added to every caller's own recording, plus "batch_wait": the time
+    spent queued before its batch started.
+    """
+
+    def __init__(self, batch_fn, window_ms: float = 3.0, max_batch: int = 32):
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending = []  # [(query_text, top_k, Future)]
+        self._cond = threading.Condition()
+        self._closed = False
+        self.batches = 0
+        self.queries = 0
+        self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, query_text: str, top_k: int, timeout: float = None):
+        """Blocks until the batch containing this query has been searched."""
+        t0 = time.perf_counter()
+        fut = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("QueryBatcher is closed")
+            self._pending.append((query_text, top_k, fut))
+            self._cond.notify()
+        hits, timings, run_s = fut.result(timeout=timeout)
+        metrics.observe_stage("batch_wait", max(0.0, time.perf_counter() - t0 - run_s))
+        metrics.add_recorded(timings)
+        return hits
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._worker.join()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            deadline = time.monotonic() + self.window
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            texts = [q for q, _, _ in batch]
+            top_k = max(k for _, k, _ in batch)
+            timings = {}
+            t0 = time.perf_counter()
+            try:
+                with metrics.recording(timings):
+                    results = self.batch_fn(texts, top_k)
+            except Exception as exc:  # fan the failure out to every waiter
+                for _, _, fut in batch:
+                    fut.set_exception(exc)
+                continue
+            run_s = time.perf_counter() - t0
+            self.batches += 1
+            self.queries += len(batch)
+            for (_, k, fut), hits in zip(batch, results):
+                fut.set_result((hits[:k], timings, run_s))
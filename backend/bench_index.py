@@ -0,0 +1,130 @@
+"""
+Recall-vs-latency-vs-memory report for the FAISS index backends.
+
+Every approximate backend (IVF-Flat, IVF-PQ, HNSW) is swept over its search
+knob (nprobe / efSearch) and compared against the exact flat index on the
+same vectors. Recall@k is the overlap with the flat top-k. Quantized
+backends (IVF-PQ, SQ8, PQ) are measured both on their own scores and with
+exact float re-ranking of rerank * k candidates, as the server does.
+bytes/org is the serialized index size per vector; re-ranking additionally
+reads the float embeddings (dim * 4 bytes/org, memory-mapped from the
+artifact).
+
+Usage:
+  python bench_index.py                                   # synthetic vectors
+  python bench_index.py --embeddings data/index_cache/embeddings.npy
+  python bench_index.py --n 200000 --queries 500 --k 10 --json report.json
+"""
+import argparse
+import json
+import time
+import numpy as np
+
+try:
+    import faiss
+    from backend.vector_search import (make_index, apply_search_params, rerank_exact, _normalize,
+                                       QUANTIZED_TYPES, SEARCH_PARAMS)
+except ImportError:
+    import faiss
+    from vector_search import (make_index, apply_search_params, rerank_exact, _normalize,
+                               QUANTIZED_TYPES, SEARCH_PARAMS)
+
+SWEEPS = {
+    "flat": [None],
+    "ivf_flat": [1, 4, 16, 64],
+    "ivf_pq": [1, 4, 16, 64],
+    "hnsw": [16, 32, 64, 128],
+    "sq8": [None],
+    "pq": [None],
+}
+
+def synthetic_embeddings(n, dim=384, clusters=256, seed=0):
+    # Clustered vectors are a closer match to sentence embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    assign = rng.integers(0, clusters, size=n)
+    vecs = centers[assign] + 0.5 * rng.standard_normal((n, dim)).astype("float32")
+    return _normalize(vecs.astype("float32"))
+
+def _queries(embeddings, count, seed=1):
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, embeddings.shape[0], size=count)
+    noise = 0.1 * rng.standard_normal((count, embeddings.shape[1])).astype("float32")
+    return _normalize(np.asarray(embeddings[picks], dtype="float32") + noise)
+
+def _timed_search(index, queries, k, embeddings, rerank=0):
+    # One query per call, as the server issues them
+    lat = []
+    found = []
+    for q in queries:
+        t0 = time.perf_counter()
+        _, I = index.search(q[None, :], k * max(rerank, 1))
+        if rerank:
+            _, I = rerank_exact(q[None, :], I, lambda rows: embeddings[rows], k)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+        found.append(I[0])
+    return np.array(found), np.array(lat)
+
+def run(embeddings, queries, k, rerank=SEARCH_PARAMS["rerank"]):
+    rows = []
+    exact = None
+    n = embeddings.shape[0]
+    for index_type, knobs in SWEEPS.items():
+        t0 = time.perf_counter()
+        index = make_index(embeddings, index_type)
+        build_s = time.perf_counter() - t0
+        bytes_per_org = len(faiss.serialize_index(index)) / n
+        reranks = sorted({0, rerank}) if index_type in QUANTIZED_TYPES else [0]
+        for knob in knobs:
+            if index_type.startswith("ivf"):
+                apply_search_params(index, nprobe=knob)
+            elif index_type == "hnsw":
+                apply_search_params(index, ef_search=knob)
+            for factor in reranks:
+                found, lat = _timed_search(index, queries, k, embeddings, factor)
+                if exact is None:
+                    exact = found
+                recall = np.mean([len(set(a) & set(b)) / float(k) for a, b in zip(found, exact)])
+                rows.append({
+                    "index_type": index_type,
+                    "faiss_class": type(index).__name__,
+                    "knob": knob,
+                    "rerank": factor,
+                    "build_s": round(build_s, 3),
+                    "bytes_per_org": round(bytes_per_org, 1),
+                    "recall_at_k": round(float(recall), 4),
+                    "p50_ms": round(float(np.percentile(lat, 50)), 4),
+                    "p99_ms": round(float(np.percentile(lat, 99)), 4),
+                })
+    return rows
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--embeddings", help="path to an embeddings.npy artifact (default: synthetic)")
+    ap.add_argument("--n", type=int, default=100000, help="synthetic corpus size")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--rerank", type=int, default=SEARCH_PARAMS["rerank"],
+                    help="re-ranking factor measured for quantized backends (0 = off)")
+    ap.add_argument("--json", help="also write the report to this file")
+    args = ap.parse_args()
+
+    if args.embeddings:
+        embeddings = np.ascontiguousarray(np.load(args.embeddings, mmap_mode="r"), dtype="float32")
+    else:
+        embeddings = synthetic_embeddings(args.n)
+    queries = _queries(embeddings, args.queries)
+
+    rows = run(embeddings, queries, args.k, args.rerank)
+    print(f"n={embeddings.shape[0]} dim={embeddings.shape[1]} queries={len(queries)} k={args.k}")
+    print(f"{'index':<10}{'knob':>6}{'rerank':>8}{'build_s':>10}{'bytes/org':>11}{'recall@k':>10}{'p50_ms':>10}{'p99_ms':>10}")
+    for r in rows:
+        knob = "-" if r["knob"] is None else r["knob"]
+        print(f"{r['index_type']:<10}{knob:>6}{r['rerank'] or '-':>8}{r['build_s']:>10}{r['bytes_per_org']:>11}"
+              f"{r['recall_at_k']:>10}{r['p50_ms']:>10}{r['p99_ms']:>10}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"n": int(embeddings.shape[0]), "k": args.k, "rows": rows}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark of intent parsing against taxonomy size.
+
+Synthetic taxonomies of --causes canonical causes with --synonyms variants
+each (the real CAUSE_CANON included) are parsed two ways:
+
+  substring: the former parser's scan, `any(v in q for v in variants)` per
+             cause, O(causes x variants x query length);
+  automaton: nlu.parse() on the compiled Aho-Corasick matcher, O(query
+             length + matches).
+
+Both run uncached, so the numbers are per-parse cost; parse_intent()
+additionally caches repeated queries.
+
+Usage:
+  python bench_nlu.py
+  python bench_nlu.py --causes 10 100 1000 --synonyms 10 --json nlu_report.json
+"""
+import argparse
+import json
+import random
+import time
+
+try:
+    from backend.nlu import CAUSE_CANON, compile_matcher, parse
+except ImportError:
+    from nlu import CAUSE_CANON, compile_matcher, parse
+
+QUERIES = (
+    "affordable housing near 94103 within 5 miles one-time",
+    "youth education tutoring in 30303",
+    "veterans ptsd counseling monthly",
+    "free legal help with eviction for families",
+    "after-school stem programs for teenagers near 60602",
+    "nonprofit",
+)
+SYLLABLES = ("ka", "lo", "mi", "ren", "tas", "vo", "qui", "zen", "por", "del", "shu", "bri")
+
+
+def taxonomy(n_causes, n_synonyms, seed=0):
+    """CAUSE_CANON plus made-up causes up to n_causes, n_synonyms variants each."""
+    rng = random.Random(seed)
+
+    def word():
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+    canon = {k: list(v) for k, v in CAUSE_CANON.items()}
+    while len(canon) < n_causes:
+        canon[f"cause {len(canon)}"] = [" ".join(word() for _ in range(rng.randint(1, 2)))
+                                        for _ in range(n_synonyms)]
+    return canon
+
+
+def substring_causes(q, canon):
+    return sorted(c for c, variants in canon.items() if any(v in q for v in variants))
+
+
+def _time_per_query(fn, queries, min_s):
+    n, t0 = 0, time.perf_counter()
+    while True:
+        for q in queries:
+            fn(q)
+        n += len(queries)
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_s:
+            return elapsed / n * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--causes", type=int, nargs="+", default=[7, 100, 1000, 5000])
+    ap.add_argument("--synonyms", type=int, default=10)
+    ap.add_argument("--min-seconds", type=float, default=0.5, help="time per measurement")
+    ap.add_argument("--json", help="also write the report to this file")
+    args = ap.parse_args()
+
+    queries = [q.lower() for q in QUERIES]
+    rows = []
+    for n_causes in args.causes:
+        canon = taxonomy(n_causes, args.synonyms)
+        t0 = time.perf_counter()
+        matcher = compile_matcher(canon)
+        compile_ms = (time.perf_counter() - t0) * 1000.0
+        rows.append({
+            "causes": len(canon),
+            "phrases": sum(len(v) for v in canon.values()),
+            "states": len(matcher.goto),
+            "compile_ms": round(compile_ms, 1),
+            "substring_us": round(_time_per_query(lambda q: substring_causes(q, canon), queries, args.min_seconds), 2),
+            "automaton_us": round(_time_per_query(lambda q: parse(q, matcher), queries, args.min_seconds), 2),
+        })
+
+    print(f"{'causes':>8}{'phrases':>9}{'states':>9}{'compile_ms':>12}{'substring_us':>14}{'automaton_us':>14}")
+    for r in rows:
+        print(f"{r['causes']:>8}{r['phrases']:>9}{r['states']:>9}{r['compile_ms']:>12}"
+              f"{r['substring_us']:>14}{r['automaton_us']:>14}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"queries": len(queries), "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Offline benchmark of the whole search path, with JSON output to diff
+across releases.
+
+  1. corpus: generates synthetic nonprofits (synthetic.py) at --n records,
+     or uses --source;
+  2. build: init_search() as a server runs it; reports the time of each
+     stage (data, model, index, query_cache) and peak RSS;
+  3. single: every sort mode x filter combination x with/without location,
+     --requests sequential POST /api/search calls each through the Flask
+     test client: p50/p99 latency and QPS;
+  4. concurrent: the mixed workload from --concurrency threads.
+
+The result cache is off unless --result-cache, so repeated queries measure
+the full pipeline; query vectors are still cached, as in production.
+
+Usage:
+  python bench_search.py --n 1000 --json bench_1k.json
+  python bench_search.py --n 100000 --index-type hnsw --concurrency 16 --json bench_100k.json
+  python bench_search.py --source data/nonprofits.jsonl --json bench_prod.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from backend.ingest import peak_rss_mb
+    from backend.pipeline import SORTS
+    from backend.synthetic import write_corpus
+except ImportError:
+    from ingest import peak_rss_mb
+    from pipeline import SORTS
+    from synthetic import write_corpus
+
+BENCH_SCHEMA = 1
+
+QUERIES = (
+    "affordable housing for families", "homeless shelter", "veterans ptsd counseling",
+    "mental health therapy", "after-school tutoring", "stem education for kids",
+    "legal help with eviction", "youth mentoring", "rent assistance", "food for families",
+    "teen jobs program", "free counseling", "tenant rights", "housing near me",
+    "support veterans", "scholarships", "childcare", "nonprofit", "", "help",
+)
+FILTERS = {
+    "none": None,
+    "cause": {"cause": ["housing"]},
+    "min_rating": {"min_rating": 4.0},
+    "cause+min_rating": {"cause": ["education", "youth"], "min_rating": 4.0},
+}
+LOCATIONS = {
+    "anywhere": None,
+    "zip": {"zip": "94103", "radius_miles": 25},
+}
+
+
+def scenarios():
+    """(name, body template) for every sort x filter x location combination."""
+    for sort in SORTS:
+        for fname, filters in FILTERS.items():
+            for lname, location in LOCATIONS.items():
+                yield f"{sort}/{fname}/{lname}", {"sort": sort, "filters": filters, "location": location, "limit": 10}
+
+
+def _summary(latencies_ms, elapsed_s):
+    lat = np.asarray(latencies_ms)
+    return {
+        "requests": len(lat),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p99_ms": round(float(np.percentile(lat, 99)), 3),
+        "mean_ms": round(float(lat.mean()), 3),
+        "qps": round(len(lat) / elapsed_s, 1) if elapsed_s else None,
+    }
+
+
+def _post(client, body):
+    t0 = time.perf_counter()
+    res = client.post("/api/search", json=body)
+    ms = (time.perf_counter() - t0) * 1000.0
+    if res.status_code != 200:
+        raise RuntimeError(f"search {body} failed with {res.status_code}: {res.get_data(as_text=True)[:200]}")
+    return ms, res.get_json()["total_found"]
+
+
+def run_single(app, requests):
+    client = app.test_client()
+    out = {}
+    for n, (name, template) in enumerate(scenarios()):
+        latencies, found = [], []
+        t0 = time.perf_counter()
+        for i in range(requests):
+            ms, total = _post(client, {**template, "query": QUERIES[(n + i) % len(QUERIES)]})
+            latencies.append(ms)
+            found.append(total)
+        out[name] = {**_summary(latencies, time.perf_counter() - t0), "avg_total_found": round(float(np.mean(found)), 1)}
+    return out
+
+
+def run_concurrent(app, concurrency, total):
+    templates = [template for _, template in scenarios()]
+    bodies = [{**templates[i % len(templates)], "query": QUERIES[i % len(QUERIES)]} for i in range(total)]
+    local = threading.local()
+
+    def one(body):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        return _post(local.client, body)[0]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, bodies[:concurrency]))  # warm each thread's client
+        t0 = time.perf_counter()
+        latencies = list(pool.map(one, bodies))
+        elapsed = time.perf_counter() - t0
+    return {"concurrency": concurrency, **_summary(latencies, elapsed)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=1000, help="synthetic corpus size (e.g. 1000, 100000, 1000000)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--source", help="benchmark this .json/.jsonl instead of a synthetic corpus")
+    ap.add_argument("--workdir", help="where the synthetic corpus and index artifact go (default: a temp dir)")
+    ap.add_argument("--index-type", default=os.environ.get("SEARCH_INDEX_TYPE", "flat"))
+    ap.add_argument("--requests", type=int, default=20, help="sequential requests per scenario")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--concurrent-requests", type=int, default=400)
+    ap.add_argument("--result-cache", action="store_true", help="keep the ranked-result cache on")
+    ap.add_argument("--json", help="write the report here")
+    args = ap.parse_args()
+
+    report = {"schema": BENCH_SCHEMA, "args": vars(args), "env": {
+        "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}}
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_search_")
+    path = args.source
+    if path is None:
+        path = os.path.join(workdir, f"synthetic_{args.n}_{args.seed}.jsonl")
+        t0 = time.perf_counter()
+        write_corpus(path, args.n, args.seed)
+        report["corpus"] = {"synthetic": True, "n": args.n, "seed": args.seed,
+                            "generate_s": round(time.perf_counter() - t0, 3)}
+    else:
+        report["corpus"] = {"synthetic": False, "source": os.path.abspath(path)}
+
+    # The server reads these at init time
+    os.environ["NONPROFITS_PATH"] = path
+    os.environ["SEARCH_INDEX_TYPE"] = args.index_type
+    try:
+        from backend import server
+    except ImportError:
+        import server
+
+    rss_before = peak_rss_mb()
+    t0 = time.perf_counter()
+    server.init_search()
+    report["build"] = {
+        "records": len(server.DATA.get("nonprofits", [])),
+        "index_type": args.index_type,
+        "total_s": round(time.perf_counter() - t0, 3),
+        "stages_ms": dict(server.READINESS["stages"]),
+        "peak_rss_mb_before": round(rss_before, 1),
+        "peak_rss_mb_after": round(peak_rss_mb(), 1),
+    }
+    if not args.result_cache:
+        server.PIPELINE.result_cache = None
+
+    report["single"] = run_single(server.app, args.requests)
+    report["concurrent"] = run_concurrent(server.app, args.concurrency, args.concurrent_requests)
+    report["peak_rss_mb"] = round(peak_rss_mb(), 1)
+
+    b = report["build"]
+    print(f"{b['records']} records, build {b['total_s']}s {b['stages_ms']}, peak RSS {report['peak_rss_mb']} MiB")
+    print(f"{'scenario':<40}{'p50_ms':>10}{'p99_ms':>10}{'qps':>10}{'found':>10}")
+    for name, r in report["single"].items():
+        print(f"{name:<40}{r['p50_ms']:>10}{r['p99_ms']:>10}{r['qps']:>10}{r['avg_total_found']:>10}")
+    c = report["concurrent"]
+    print(f"concurrent x{c['concurrency']}: {c['qps']} qps, p50 {c['p50_ms']} ms, p99 {c['p99_ms']} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Builds backend/data/zip_latlon.bin (see geo.ZipGazetteer) from a CSV/TSV of
+ZIP centroids.
+
+Accepted inputs:
+  - the Census ZCTA Gazetteer file (tab-separated; GEOID, INTPTLAT, INTPTLONG),
+    e.g. 2023_Gaz_zcta_national.txt from
+    https://www.census.gov/geographies/reference-files/time-series/geo/gazetteer-files.html
+  - any CSV with zip/lat/lon columns (header names: zip|zcta|zcta5|geoid,
+    lat|latitude|intptlat, lon|lng|longitude|intptlong)
+
+Usage:
+  python build_zip_gazetteer.py 2023_Gaz_zcta_national.txt
+  python build_zip_gazetteer.py zips.csv --out data/zip_latlon.bin
+"""
+import argparse
+import csv
+
+try:
+    from backend.geo import write_gazetteer, _gazetteer_path
+except ImportError:
+    from geo import write_gazetteer, _gazetteer_path
+
+ZIP_COLUMNS = ("zip", "zipcode", "zcta", "zcta5", "geoid")
+LAT_COLUMNS = ("lat", "latitude", "intptlat")
+LON_COLUMNS = ("lon", "lng", "longitude", "intptlong")
+
+
+def _column(header, names):
+    for i, h in enumerate(header):
+        if h.strip().lower() in names:
+            return i
+    raise ValueError(f"none of the columns {names} found in header {header}")
+
+
+def read_centroids(path):
+    """Returns (zips, lats, lons) lists; rows with unusable values are skipped."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.readline()
+        f.seek(0)
+        delimiter = "\t" if "\t" in sample else ","
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader)
+        zi, ai, oi = _column(header, ZIP_COLUMNS), _column(header, LAT_COLUMNS), _column(header, LON_COLUMNS)
+        zips, lats, lons = [], [], []
+        for row in reader:
+            try:
+                code = row[zi].strip().zfill(5)
+                if len(code) != 5 or not code.isdigit():
+                    continue
+                lat, lon = float(row[ai]), float(row[oi])
+            except (IndexError, ValueError):
+                continue
+            zips.append(int(code))
+            lats.append(lat)
+            lons.append(lon)
+    return zips, lats, lons
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("source", help="CSV/TSV of ZIP centroids")
+    ap.add_argument("--out", default=_gazetteer_path())
+    args = ap.parse_args()
+
+    zips, lats, lons = read_centroids(args.source)
+    if len(set(zips)) != len(zips):
+        raise SystemExit("ERROR: duplicate ZIP codes in source")
+    write_gazetteer(args.out, zips, lats, lons)
+    print(f"wrote {len(zips)} ZIPs to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
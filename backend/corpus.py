@@ -0,0 +1,208 @@
+"""
+In-memory corpus with columnar copies of the attributes the search path
+scores and sorts on. Row i of every column is corpus.items[i], and rows are
+the labels of the vector index built from the same item list.
+
+Filters are answered from precomputed structures instead of the records:
+per-cause posting lists (sorted row arrays) and the rating column sorted
+once for range queries. A GridIndex over lat/lon serves radius and
+nearest-first queries, and a BM25Index over the text fields serves lexical
+retrieval.
+"""
+from datetime import datetime
+import itertools
+import numpy as np
+
+try:
+    from backend.geo import GridIndex
+    from backend.lexical import BM25Index
+    from backend.records import RecordStore, RecordsById, LiveRecords
+except ImportError:
+    from geo import GridIndex
+    from lexical import BM25Index
+    from records import RecordStore, RecordsById, LiveRecords
+
+# Every Corpus gets a new version; result caches key on it
+_versions = itertools.count(1)
+
+# Lower cost per outcome → higher impact; first key present wins
+IMPACT_COST_KEYS = ("cost_per_family", "cost_per_session")
+
+
+def _epoch(value):
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _impact(it):
+    im = it.get("impact_metrics") or {}
+    for k in IMPACT_COST_KEYS:
+        if k in im and im[k] > 0:
+            return 1.0 / float(im[k])
+    return 0.0
+
+
+COLUMNS = ("lat", "lon", "trust", "popularity", "avg_rating", "created_at", "impact")
+# Column values of a deleted row: unreachable by geo, rating and every sort
+_TOMBSTONE = (np.nan, np.nan, 0.0, 0.0, -np.inf, 0.0, 0.0)
+
+
+def _row_values(it):
+    """One value per COLUMNS entry (created_at in epoch seconds)."""
+    if it is None:
+        return _TOMBSTONE
+    loc = it.get("location") or {}
+    return (
+        loc.get("lat", np.nan),
+        loc.get("lon", np.nan),
+        1.0 if (it.get("trust") or {}).get("verification_status") else 0.0,
+        float(it.get("popularity_90d", 0.0)),
+        (it.get("ratings") or {}).get("avg_rating", 0),
+        _epoch(it.get("created_at", "")),
+        _impact(it),
+    )
+
+
+class Corpus:
+    """
+    Records live in a compact RecordStore (corpus.items[row] decodes a fresh
+    dict); by_id is a decoding view over it.
+
+    Rows are stable for the lifetime of a corpus and its successors built by
+    with_changes(): edits keep their row, inserts append, deletes leave a
+    tombstone (items[row] is None) until the next full load.
+    """
+
+    def __init__(self, items):
+        self.version = next(_versions)
+        # One pass over `items`, which may be a stream: each record is
+        # encoded into the store and reduced to its columns, then dropped.
+        ids, values, postings = [], [], {}
+
+        def consume():
+            for row, it in enumerate(items):
+                ids.append(it["id"])
+                values.append(_row_values(it))
+                for cause in set(it.get("causes") or []):
+                    postings.setdefault(cause, []).append(row)
+                yield it
+
+        self.items = RecordStore(consume())
+        self.ids = ids
+        self.row_of = {cid: row for row, cid in enumerate(ids)}
+        self.by_id = RecordsById(self.items, self.row_of)
+        columns = np.array(values, dtype=np.float64).reshape(len(values), len(COLUMNS))
+        for i, name in enumerate(COLUMNS):
+            setattr(self, name, np.ascontiguousarray(columns[:, i]))
+
+        self.cause_rows = {cause: np.array(rows, dtype=np.int64) for cause, rows in postings.items()}
+        self._index_columns()
+        self.lexical = BM25Index(self.items)
+
+    def _index_columns(self):
+        # Derived structures that are cheap to rebuild from the columns
+        self.rating_order = np.argsort(self.avg_rating, kind="stable")
+        self.rating_sorted = self.avg_rating[self.rating_order]
+        self.spatial = GridIndex(self.lat, self.lon)
+
+    def with_changes(self, upserts=(), deletes=()):
+        """
+        Returns (new_corpus, changes) with `upserts` (nonprofit dicts, matched
+        by id) and `deletes` (ids) applied. `changes` maps each touched row to
+        its new item, or None for a delete, in the form
+        VectorState.with_changes() takes. This corpus is left untouched, so
+        in-flight searches keep a consistent view.
+        """
+        new = Corpus.__new__(Corpus)
+        new.version = next(_versions)
+        new.ids = list(self.ids)
+        new.row_of = dict(self.row_of)
+        changes = {}
+        for cid in deletes:
+            row = new.row_of.pop(cid, None)
+            if row is not None:
+                new.ids[row] = None
+                changes[row] = None
+        for it in upserts:
+            row = new.row_of.get(it["id"])
+            if row is None:
+                row = len(new.ids)
+                new.ids.append(None)
+                new.row_of[it["id"]] = row
+            new.ids[row] = it["id"]
+            changes[row] = it
+        new.items = self.items.with_rows(changes)
+        new.by_id = RecordsById(new.items, new.row_of)
+        old = {row: self.items[row] if row < len(self.items) else None for row in changes}
+
+        grow = len(new.ids) - len(self.ids)
+        for name in COLUMNS:
+            col = getattr(self, name)
+            setattr(new, name, np.concatenate((col, np.zeros(grow))) if grow else col.copy())
+        for row, it in changes.items():
+            for name, value in zip(COLUMNS, _row_values(it)):
+                getattr(new, name)[row] = value
+
+        # Patch only the posting lists of causes the touched rows had or now have
+        touched = np.array(sorted(changes), dtype=np.int64)
+        affected = set()
+        for row, it in changes.items():
+            for rec in (old[row], it):
+                if rec is not None:
+                    affected.update(rec.get("causes") or [])
+        new.cause_rows = dict(self.cause_rows)
+        for cause in affected:
+            rows = self.cause_rows.get(cause, np.zeros(0, dtype=np.int64))
+            rows = rows[~np.isin(rows, touched)]
+            added = [row for row, it in changes.items() if it is not None and cause in (it.get("causes") or [])]
+            rows = np.union1d(rows, np.array(added, dtype=np.int64))
+            if len(rows):
+                new.cause_rows[cause] = rows
+            else:
+                new.cause_rows.pop(cause, None)
+
+        new._index_columns()
+        new.lexical = self.lexical.with_changes({row: (old[row], it) for row, it in changes.items()})
+        return new, changes
+
+    def live_items(self):
+        """Non-deleted records in row order, decoded lazily."""
+        rows = [row for row, cid in enumerate(self.ids) if cid is not None]
+        return LiveRecords(self.items, rows)
+
+    def __len__(self):
+        # Row count, tombstones included; masks over rows use this length
+        return len(self.ids)
+
+    def rows_for(self, ids):
+        """Corpus rows for org ids, as an int64 array (unknown ids are dropped)."""
+        rows = [self.row_of[cid] for cid in ids if cid in self.row_of]
+        return np.array(rows, dtype=np.int64)
+
+    def filter_mask(self, filters):
+        """
+        Boolean mask over all rows passing the cause (any-of) and min_rating
+        filters, or None when nothing is filtered.
+        """
+        if not filters:
+            return None
+        causes = set((filters.get("cause") or []) + (filters.get("causes") or []))
+        min_rating = filters.get("min_rating")
+        if not causes and not min_rating:
+            return None
+        mask = np.ones(len(self.ids), dtype=bool)
+        if causes:
+            by_cause = np.zeros(len(self.ids), dtype=bool)
+            for cause in causes:
+                rows = self.cause_rows.get(cause)
+                if rows is not None:
+                    by_cause[rows] = True
+            mask &= by_cause
+        if min_rating:
+            start = np.searchsorted(self.rating_sorted, float(min_rating), side="left")
+            by_rating = np.zeros(len(self.ids), dtype=bool)
+            by_rating[self.rating_order[start:]] = True
+            mask &= by_rating
+        return mask
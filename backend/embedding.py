@@ -0,0 +1,162 @@
+"""
+Corpus embedding for index builds, optionally spread over worker processes.
+
+encode_jobs() takes a stream of (rows, texts) jobs, which build_index yields
+one chunk at a time, and yields (rows, vectors) as shards finish. In
+addition to that:
+
+  - every job is cut into shards of similar-length texts, longest first, so
+    each encoder batch pads to about its own length instead of the longest
+    text in a random batch, and the slowest shards start first;
+  - with workers > 1, shards run on a process pool where each worker loads
+    its own copy of the model and uses cpu_count // workers torch threads.
+    The pool is only started once MIN_PARALLEL texts are queued, because
+    loading the model in every worker costs a few seconds. At most
+    2 * workers shards are in flight, so the whole corpus is never queued
+    in memory.
+
+Identical texts are deduplicated by the caller (build_index matches content
+hashes), so each distinct text is encoded once.
+
+The pool uses "spawn": forking a process that has already run torch can
+deadlock its thread pools.
+"""
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+ENCODE_BATCH = 32
+# Texts per unit of work handed to a worker
+SHARD_SIZE = 512
+# Fewer queued texts than this are encoded in-process even with workers > 1
+MIN_PARALLEL = 4096
+
+_worker_model = None
+
+
+def load_sentence_transformer(model_name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def _init_worker(loader, loader_arg, threads):
+    global _worker_model
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    _worker_model = loader(loader_arg)
+
+
+def _encode_shard(texts, batch_size):
+    return np.asarray(_worker_model.encode(texts, batch_size=batch_size, show_progress_bar=False),
+                      dtype="float32")
+
+
+def resolve_workers(workers):
+    """workers: None/1 = in-process, 0 = one per CPU, n = n processes."""
+    if workers is None:
+        return 1
+    workers = int(workers)
+    return (os.cpu_count() or 1) if workers <= 0 else workers
+
+
+def length_sorted_shards(rows, texts, shard_size=SHARD_SIZE):
+    """(rows, texts) shards of at most shard_size texts, longest texts first."""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    for start in range(0, len(order), shard_size):
+        part = order[start:start + shard_size]
+        yield [rows[i] for i in part], [texts[i] for i in part]
+
+
+class ProgressLog:
+    """progress= callback that prints the encoded count and throughput every `interval` seconds."""
+
+    def __init__(self, interval=5.0, file=None):
+        self.interval = interval
+        self.file = file or sys.stderr
+        self._last = 0.0
+
+    def __call__(self, encoded, elapsed_s, done=False):
+        if not done and elapsed_s - self._last < self.interval:
+            return
+        self._last = elapsed_s
+        rate = encoded / elapsed_s if elapsed_s else 0.0
+        print(f"{'encoded' if done else 'encoding:'} {encoded} texts in {elapsed_s:.1f}s ({rate:.0f} texts/s)",
+              file=self.file, flush=True)
+
+
+def encode_jobs(jobs, local_model, model_name=None, workers=1, batch_size=ENCODE_BATCH,
+                shard_size=SHARD_SIZE, progress=None, loader=load_sentence_transformer):
+    """
+    jobs: iterable of (rows, texts); consumed lazily
+    local_model: callable returning the in-process model (used when not parallel)
+    model_name: what each pool worker passes to loader()
+    progress: optional callable(encoded, elapsed_s, done=False)
+    yields: (rows, float32 vectors) per shard, in completion order
+    """
+    workers = resolve_workers(workers)
+    t0 = time.perf_counter()
+    encoded = 0
+    jobs = iter(jobs)
+
+    # Look ahead until there is enough work to be worth a pool
+    queued, n_queued = [], 0
+    for job in jobs:
+        queued.append(job)
+        n_queued += len(job[1])
+        if workers <= 1 or n_queued >= MIN_PARALLEL:
+            break
+
+    if workers <= 1 or n_queued < MIN_PARALLEL:
+        results = _encode_local(_chain(queued, jobs), local_model, batch_size, shard_size)
+    else:
+        results = _encode_pool(_chain(queued, jobs), workers, loader, model_name, batch_size, shard_size)
+    for rows, vecs in results:
+        encoded += len(rows)
+        if progress:
+            progress(encoded, time.perf_counter() - t0)
+        yield rows, vecs
+    if progress and encoded:
+        progress(encoded, time.perf_counter() - t0, done=True)
+
+
+def _encode_local(jobs, local_model, batch_size, shard_size):
+    model = None
+    for rows, texts in jobs:
+        for shard_rows, shard_texts in length_sorted_shards(rows, texts, shard_size):
+            if model is None:
+                model = local_model()
+            yield shard_rows, np.asarray(model.encode(shard_texts, batch_size=batch_size,
+                                                      show_progress_bar=False), dtype="float32")
+
+
+def _encode_pool(jobs, workers, loader, model_name, batch_size, shard_size):
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(loader, model_name, threads)) as pool:
+        pending = {}  # future -> rows
+        for rows, texts in jobs:
+            for shard_rows, shard_texts in length_sorted_shards(rows, texts, shard_size):
+                while len(pending) >= 2 * workers:
+                    yield from _collect(pending)
+                pending[pool.submit(_encode_shard, shard_texts, batch_size)] = shard_rows
+        while pending:
+            yield from _collect(pending)
+
+
+def _chain(first, rest):
+    yield from first
+    yield from rest
+
+
+def _collect(pending):
+    """Waits for at least one shard; returns [(rows, vecs)] for those done."""
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    return [(pending.pop(fut), fut.result()) for fut in done]
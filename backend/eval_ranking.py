@@ -0,0 +1,139 @@
+"""
+Offline comparison of ranking scorers on a judged query log.
+
+Each log line (JSONL) is a search request body plus relevance judgments:
+
+  {"query": "veterans ptsd", "location": {"zip": "94103"},
+   "relevance": {"org_011": 3, "org_004": 1}}
+  {"query": "tutoring", "clicked": ["org_007"]}          # clicks count as grade 1
+
+Every query runs through the pipeline once, up to the score stage: intent,
+retrieval, geo and filters against the real data and index. Each scorer
+then ranks the same candidate feature matrix. That gives, per scorer:
+
+  ndcg@k     mean NDCG over the log (gain 2^grade - 1; the ideal ranking
+             uses every judged record, retrieved or not)
+  p50/p99_us time of the scorer call alone, per query
+
+Scorers: "linear" (the default weights) plus --model files (registered under
+their base name) and any other --scorer names.
+
+Usage:
+  python eval_ranking.py queries.jsonl --model models/logistic.json --model models/gbdt.json
+  python eval_ranking.py queries.jsonl --source data/nonprofits.jsonl --k 10 --json eval.json
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+try:
+    from backend.pipeline import DEFAULT_STAGES, SearchContext, SearchRequest, features, top_positions
+    from backend.ranking import get_scorer, load_scorer, register_scorer
+except ImportError:
+    from pipeline import DEFAULT_STAGES, SearchContext, SearchRequest, features, top_positions
+    from ranking import get_scorer, load_scorer, register_scorer
+
+# intent .. filter: everything before scoring
+CANDIDATE_STAGES = DEFAULT_STAGES[:4]
+
+
+def read_log(path):
+    """(request body, {id: grade}) per judged line of a JSONL query log."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            grades = {str(k): float(v) for k, v in (entry.pop("relevance", None) or {}).items()}
+            for cid in entry.pop("clicked", None) or []:
+                grades.setdefault(str(cid), 1.0)
+            if grades:
+                yield entry, grades
+
+
+def ndcg(ranked_ids, grades, k):
+    gains = np.array([2.0 ** grades.get(cid, 0.0) - 1.0 for cid in ranked_ids[:k]])
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    ideal = np.sort(2.0 ** np.array(list(grades.values())) - 1.0)[::-1][:k]
+    idcg = float(ideal @ discounts[:len(ideal)])
+    return float(gains @ discounts[:len(gains)]) / idcg if idcg > 0 else 0.0
+
+
+def candidates(snapshot, body):
+    """(corpus ids of the candidates, their feature matrix) for one logged search."""
+    req = SearchRequest.from_json({**body, "sort": "relevance", "page": 1})
+    ctx = SearchContext(req, snapshot.corpus, snapshot.vectors)
+    for _, stage in CANDIDATE_STAGES:
+        stage(ctx)
+    return np.asarray(ctx.corpus.ids, dtype=object)[ctx.rows], features(ctx)
+
+
+def evaluate(snapshot, log, scorers, k=10):
+    """{scorer name: report} over the (body, grades) pairs of log."""
+    scores = {name: [] for name in scorers}
+    latencies = {name: [] for name in scorers}
+    n_candidates = []
+    for body, grades in log:
+        ids, X = candidates(snapshot, body)
+        n_candidates.append(len(ids))
+        for name, scorer in scorers.items():
+            t0 = time.perf_counter()
+            s = scorer(X)
+            latencies[name].append((time.perf_counter() - t0) * 1e6)
+            ranked = ids[top_positions(-s, k)]
+            scores[name].append(ndcg(list(ranked), grades, k))
+    report = {}
+    for name in scorers:
+        lat = np.asarray(latencies[name])
+        report[name] = {
+            "queries": len(scores[name]),
+            f"ndcg@{k}": round(float(np.mean(scores[name])), 4) if scores[name] else None,
+            "p50_us": round(float(np.percentile(lat, 50)), 1) if len(lat) else None,
+            "p99_us": round(float(np.percentile(lat, 99)), 1) if len(lat) else None,
+            "avg_candidates": round(float(np.mean(n_candidates)), 1) if n_candidates else None,
+        }
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("log", help="judged query log (.jsonl)")
+    ap.add_argument("--model", action="append", default=[], help="scorer model file (repeatable)")
+    ap.add_argument("--scorer", action="append", default=[], help="registered scorer name (repeatable)")
+    ap.add_argument("--source", help="nonprofits .json/.jsonl (default: NONPROFITS_PATH or the sample data)")
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--json", help="also write the report to this file")
+    args = ap.parse_args()
+
+    scorers = {"linear": get_scorer("linear")}
+    for path in args.model:
+        name = os.path.splitext(os.path.basename(path))[0]
+        register_scorer(name, load_scorer(path))
+        scorers[name] = get_scorer(name)
+    for name in args.scorer:
+        scorers[name] = get_scorer(name)
+
+    if args.source:
+        os.environ["NONPROFITS_PATH"] = args.source
+    try:
+        from backend import server
+    except ImportError:
+        import server
+    server.init_search()
+
+    report = evaluate(server.current_snapshot(), list(read_log(args.log)), scorers, args.k)
+    ndcg_key = f"ndcg@{args.k}"
+    print(f"{'scorer':<20}{'queries':>9}{ndcg_key:>10}{'p50_us':>10}{'p99_us':>10}")
+    for name, r in report.items():
+        print(f"{name:<20}{r['queries']:>9}{r[ndcg_key]:>10}{r['p50_us']:>10}{r['p99_us']:>10}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"k": args.k, "scorers": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
+import logging
 import math
+import os
+import numpy as np
 
-ZIP_TO_LATLON = {
+# Built-in points, used when the full gazetteer binary has not been built
+SEED_ZIP_TO_LATLON = {
     "94103": (37.7763, -122.4167),
     "94105": (37.7892, -122.3960),
     "94102": (37.7784, -122.4175),
@@ -10,6 +14,116 @@ ZIP_TO_LATLON = {
     "95113": (37.3348, -121.8906)
 }
 
+# Compact gazetteer file written by build_zip_gazetteer.py:
+#   16-byte header: b"ZIPG", uint32 version, uint32 count, 4 pad bytes
+#   int32 zip[count] (sorted) | float32 lat[count] | float32 lon[count]
+GAZETTEER_MAGIC = b"ZIPG"
+GAZETTEER_VERSION = 1
+GAZETTEER_HEADER = 16
+
+def _gazetteer_path():
+    return os.path.join(os.path.dirname(__file__), "data", "zip_latlon.bin")
+
+def write_gazetteer(path, zips, lats, lons):
+    order = np.argsort(np.asarray(zips, dtype=np.int32), kind="stable")
+    zips = np.asarray(zips, dtype=np.int32)[order]
+    header = np.zeros(GAZETTEER_HEADER, dtype=np.uint8)
+    header[:4] = np.frombuffer(GAZETTEER_MAGIC, dtype=np.uint8)
+    header[4:12] = np.array([GAZETTEER_VERSION, len(zips)], dtype="<u4").view(np.uint8)
+    with open(path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(zips.astype("<i4").tobytes())
+        f.write(np.asarray(lats, dtype="<f4")[order].tobytes())
+        f.write(np.asarray(lons, dtype="<f4")[order].tobytes())
+
+class ZipGazetteer:
+    """
+    ZIP -> (lat, lon) lookup over sorted int32 ZIP codes and float32 lat/lon
+    arrays. With a gazetteer file the arrays are memory-mapped (shared page
+    cache across workers, nothing parsed at startup); otherwise they are
+    built from SEED_ZIP_TO_LATLON. Lookups are a binary search.
+
+    Dict-style access (`[zip]`, `.get`, `in`) is exact; `locate` also falls
+    back to the numerically nearest known ZIP with the same 3-digit prefix.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.source = "file"
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                header = f.read(GAZETTEER_HEADER)
+            if header[:4] != GAZETTEER_MAGIC:
+                raise ValueError(f"{path} is not a ZIP gazetteer file")
+            version, count = np.frombuffer(header[4:12], dtype="<u4")
+            if version != GAZETTEER_VERSION:
+                raise ValueError(f"{path}: unsupported gazetteer version {version}")
+            count = int(count)
+            self.zips = np.memmap(path, dtype="<i4", mode="r", offset=GAZETTEER_HEADER, shape=(count,))
+            self.lats = np.memmap(path, dtype="<f4", mode="r", offset=GAZETTEER_HEADER + 4 * count, shape=(count,))
+            self.lons = np.memmap(path, dtype="<f4", mode="r", offset=GAZETTEER_HEADER + 8 * count, shape=(count,))
+        else:
+            if path:
+                logging.getLogger(__name__).warning(
+                    "ZIP gazetteer %s not found: only the %d seed ZIPs resolve; "
+                    "build it with build_zip_gazetteer.py", path, len(SEED_ZIP_TO_LATLON))
+            self.source = "seed"
+            codes = sorted(SEED_ZIP_TO_LATLON)
+            self.zips = np.array([int(z) for z in codes], dtype=np.int32)
+            self.lats = np.array([SEED_ZIP_TO_LATLON[z][0] for z in codes], dtype=np.float32)
+            self.lons = np.array([SEED_ZIP_TO_LATLON[z][1] for z in codes], dtype=np.float32)
+
+    def __len__(self):
+        return len(self.zips)
+
+    def stats(self):
+        return {"zips": len(self.zips), "source": self.source, "path": self.path}
+
+    @staticmethod
+    def _code(zip_code):
+        # "94103", 94103 and ZIP+4 "94103-1234" all map to 94103
+        digits = str(zip_code).strip()[:5]
+        return int(digits) if len(digits) == 5 and digits.isdigit() else None
+
+    def _latlon(self, i):
+        # float32 holds ~7 significant digits; 5 decimals (~1 m) is what survives
+        return (round(float(self.lats[i]), 5), round(float(self.lons[i]), 5))
+
+    def _find(self, code):
+        i = int(np.searchsorted(self.zips, code))
+        return i if i < len(self.zips) and self.zips[i] == code else None
+
+    def get(self, zip_code, default=None):
+        code = self._code(zip_code)
+        i = self._find(code) if code is not None else None
+        return self._latlon(i) if i is not None else default
+
+    def __getitem__(self, zip_code):
+        latlon = self.get(zip_code)
+        if latlon is None:
+            raise KeyError(zip_code)
+        return latlon
+
+    def __contains__(self, zip_code):
+        return self.get(zip_code) is not None
+
+    def locate(self, zip_code):
+        """Exact match, else the nearest known ZIP in the same 3-digit prefix, else None."""
+        code = self._code(zip_code)
+        if code is None or not len(self.zips):
+            return None
+        i = int(np.searchsorted(self.zips, code))
+        if i < len(self.zips) and self.zips[i] == code:
+            return self._latlon(i)
+        best = None
+        for j in (i - 1, i):
+            if 0 <= j < len(self.zips) and self.zips[j] // 100 == code // 100:
+                if best is None or abs(int(self.zips[j]) - code) < abs(int(self.zips[best]) - code):
+                    best = j
+        return self._latlon(best) if best is not None else None
+
+ZIP_TO_LATLON = ZipGazetteer(_gazetteer_path())
+
 def haversine_miles(lat1, lon1, lat2, lon2):
     # radius of Earth in miles
     R = 3958.8
@@ -26,3 +140,83 @@ def geo_score_miles(distance_miles, max_radius_miles):
     # score decays linearly to 0 at max radius
     s = max(0.0, 1.0 - (distance_miles / max_radius_miles))
     return s
+
+def haversine_miles_np(lat1, lon1, lat2, lon2):
+    # Same formula as haversine_miles; lat2/lon2 are arrays, returns an array
+    R = 3958.8
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dphi = np.radians(np.asarray(lat2) - lat1)
+    dlmb = np.radians(np.asarray(lon2) - lon1)
+    a = (np.sin(dphi/2)**2 +
+         np.cos(p1) * np.cos(p2) * np.sin(dlmb/2)**2)
+    return 2 * R * np.arcsin(np.sqrt(a))
+
+def geo_score_miles_np(distance_miles, max_radius_miles):
+    if max_radius_miles is None or max_radius_miles <= 0:
+        return np.zeros(len(distance_miles))
+    return np.maximum(0.0, 1.0 - (distance_miles / max_radius_miles))
+
+MILES_PER_DEG_LAT = 69.0
+
+class GridIndex:
+    """
+    Fixed lat/lon cell grid over point coordinates for radius and nearest
+    queries. Rows are bucketed by cell once; a query only looks at the
+    occupied cells overlapping its bounding box and runs exact haversine on
+    the points inside them, so cost tracks local density, not corpus size.
+    (Bounding boxes do not wrap the antimeridian; fine for US data.)
+    """
+
+    def __init__(self, lat, lon, cell_deg=0.25):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        self.cell_deg = cell_deg
+        self.lat, self.lon = lat, lon
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        ci = np.floor(lat[valid] / cell_deg).astype(np.int64)
+        cj = np.floor(lon[valid] / cell_deg).astype(np.int64)
+        order = np.lexsort((cj, ci))
+        self.rows = valid[order]
+        ci, cj = ci[order], cj[order]
+        # one entry per occupied cell: (ci, cj) and its [start, end) slice of self.rows
+        change = np.flatnonzero((np.diff(ci) != 0) | (np.diff(cj) != 0)) + 1
+        self.starts = np.concatenate(([0], change)).astype(np.int64)
+        self.ends = np.concatenate((change, [len(self.rows)])).astype(np.int64)
+        self.cell_i = ci[self.starts] if len(self.rows) else np.zeros(0, dtype=np.int64)
+        self.cell_j = cj[self.starts] if len(self.rows) else np.zeros(0, dtype=np.int64)
+
+    def _box_rows(self, lat, lon, radius_miles):
+        dlat = radius_miles / MILES_PER_DEG_LAT
+        coslat = math.cos(math.radians(lat))
+        dlon = 180.0 if coslat < 1e-6 else min(180.0, radius_miles / (MILES_PER_DEG_LAT * coslat))
+        i0, i1 = math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg)
+        j0, j1 = math.floor((lon - dlon) / self.cell_deg), math.floor((lon + dlon) / self.cell_deg)
+        hit = np.flatnonzero((self.cell_i >= i0) & (self.cell_i <= i1) &
+                             (self.cell_j >= j0) & (self.cell_j <= j1))
+        if not len(hit):
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([self.rows[self.starts[c]:self.ends[c]] for c in hit])
+
+    def within(self, lat, lon, radius_miles, allowed=None):
+        """(rows, miles) of points within radius_miles, in no particular order."""
+        rows = self._box_rows(lat, lon, radius_miles)
+        if allowed is not None:
+            rows = rows[allowed[rows]]
+        d = haversine_miles_np(lat, lon, self.lat[rows], self.lon[rows])
+        keep = d <= radius_miles
+        return rows[keep], d[keep]
+
+    def nearest(self, lat, lon, k, max_radius_miles, allowed=None, start_radius_miles=5.0):
+        """
+        (rows, miles) of the k nearest points within max_radius_miles, nearest
+        first. The search radius doubles until k points are found, so dense
+        areas are answered from a handful of cells.
+        """
+        r = min(start_radius_miles, max_radius_miles)
+        while True:
+            rows, d = self.within(lat, lon, r, allowed)
+            if len(rows) >= k or r >= max_radius_miles:
+                break
+            r = min(r * 2, max_radius_miles)
+        order = np.lexsort((rows, d))[:k]
+        return rows[order], d[order]
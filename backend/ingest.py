@@ -0,0 +1,178 @@
+"""
+Streaming record ingestion.
+
+Reads nonprofits one record at a time instead of json.load-ing the whole
+file, so startup never holds the raw file text next to the parsed records.
+Two input formats:
+
+  - JSON  ({"nonprofits": [...], ...}): the array is decoded element by
+    element from a fixed-size read buffer; other top-level keys (e.g.
+    "metadata") are small and decoded whole.
+  - JSONL (.jsonl / .ndjson): one nonprofit object per line.
+
+Usage (streams a file through embedding and indexing and reports
+throughput and peak RSS):
+  python ingest.py data/nonprofits.jsonl --index-type hnsw --chunk-size 2048
+  python ingest.py data/nonprofits.jsonl --workers 0   # encode on every core
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+READ_SIZE = 1 << 20
+CHUNK_SIZE = 4096
+
+_decoder = json.JSONDecoder()
+_WS = " \t\r\n"
+
+
+class _Buffer:
+    """Read buffer over a text file that drops what has been consumed."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        chunk = self.f.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character (not consumed), or "" at EOF."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise ValueError(f"expected {ch!r} at offset {self.pos} of the read buffer")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next JSON value, reading more until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number could continue past the end of the buffer
+            if end == len(self.buf) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_json(f, key, meta):
+    buf = _Buffer(f)
+    buf.expect("{")
+    if buf.peek() == "}":
+        return
+    while True:
+        name = buf.value()
+        buf.expect(":")
+        if name == key:
+            buf.expect("[")
+            if buf.peek() == "]":
+                buf.pos += 1
+            else:
+                while True:
+                    yield buf.value()
+                    if buf.peek() == "]":
+                        buf.pos += 1
+                        break
+                    buf.expect(",")
+        elif meta is not None:
+            meta[name] = buf.value()
+        else:
+            buf.value()
+        if buf.peek() == "}":
+            return
+        buf.expect(",")
+
+
+def _iter_jsonl(f):
+    for lineno, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {lineno}: {e}") from None
+
+
+def iter_records(path, key="nonprofits", meta=None):
+    """
+    Yields the records of a JSON or JSONL file one at a time. For JSON, the
+    other top-level values are stored into `meta` (a dict) when given.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(JSONL_SUFFIXES):
+            yield from _iter_jsonl(f)
+        else:
+            yield from _iter_json(f, key, meta)
+
+
+def iter_chunks(iterable, size=CHUNK_SIZE):
+    """Lists of at most `size` items from any iterable."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    try:
+        from backend.embedding import ProgressLog
+        from backend.vector_search import build_index, INDEX_TYPES
+    except ImportError:
+        from embedding import ProgressLog
+        from vector_search import build_index, INDEX_TYPES
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("source", help="nonprofits .json or .jsonl")
+    ap.add_argument("--index-type", default="flat", choices=INDEX_TYPES)
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    ap.add_argument("--cache-dir", default=None, help="write/reuse the index artifact here")
+    ap.add_argument("--workers", type=int, default=1, help="encoder processes (0 = one per CPU)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    state = build_index(iter_records(args.source), cache_dir=args.cache_dir,
+                        index_type=args.index_type, chunk_size=args.chunk_size,
+                        workers=args.workers, progress=ProgressLog())
+    print(f"indexed {state.n_rows} records from {os.path.basename(args.source)} "
+          f"in {time.perf_counter() - t0:.1f}s; peak RSS {peak_rss_mb():.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
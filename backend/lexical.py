@@ -0,0 +1,151 @@
+"""
+In-process BM25 index over the text fields of the corpus.
+
+Rows are corpus rows (same order as the item list it was built from), so
+lexical hits line up with the vector index and the Corpus columns. Scoring
+is vectorized per query term over its posting list; no Python loop over
+documents at query time.
+"""
+import re
+from collections import Counter
+import numpy as np
+
+LEXICAL_FIELDS = ("name", "mission_text", "description", "tags")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# EINs ("12-3456789") are indexed and queried as one token of 9 digits
+_EIN_RE = re.compile(r"\b(\d{2})-(\d{7})\b")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(_EIN_RE.sub(r"\1\2", str(text or "").lower()))
+
+
+def _doc_text(it, fields):
+    parts = []
+    for f in fields:
+        v = it.get(f)
+        if isinstance(v, (list, tuple)):
+            parts.extend(str(x) for x in v)
+        elif v is not None:
+            parts.append(str(v))
+    if it.get("ein"):
+        parts.append(str(it["ein"]))
+    return " ".join(parts)
+
+
+class BM25Index:
+    def __init__(self, items, fields=LEXICAL_FIELDS, k1=1.2, b=0.75):
+        self.fields = fields
+        self.k1 = k1
+        self.b = b
+        postings = {}
+        doc_len = []
+        live = 0
+        for row, it in enumerate(items):
+            live += it is not None
+            counts = Counter(tokenize(_doc_text(it, fields))) if it is not None else Counter()
+            doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(row)
+                postings[term][1].append(tf)
+        self.doc_len = np.array(doc_len, dtype=np.float32)
+        self._update_stats(live)
+        # term -> (sorted rows int64, term frequencies float32)
+        self.postings = {
+            term: (np.array(rows, dtype=np.int64), np.array(tfs, dtype=np.float32))
+            for term, (rows, tfs) in postings.items()
+        }
+
+    def _update_stats(self, live_docs):
+        self.n = live_docs
+        self.avgdl = float(self.doc_len.sum() / live_docs) if live_docs else 0.0
+
+    def with_changes(self, changes):
+        """
+        changes: {row: (old_item or None, new_item or None)}. Returns a new
+        index in which only the posting lists of terms those documents
+        contain(ed) are rebuilt; this index is left untouched.
+        """
+        new = BM25Index.__new__(BM25Index)
+        new.fields, new.k1, new.b = self.fields, self.k1, self.b
+        size = max([len(self.doc_len)] + [row + 1 for row in changes])
+        new.doc_len = np.zeros(size, dtype=np.float32)
+        new.doc_len[:len(self.doc_len)] = self.doc_len
+        new.postings = dict(self.postings)
+        touched = np.array(sorted(changes), dtype=np.int64)
+        added = {}  # term -> [(row, tf)]
+        affected = set()
+        live_delta = 0
+        for row, (old, it) in changes.items():
+            if old is not None:
+                affected.update(tokenize(_doc_text(old, self.fields)))
+                live_delta -= 1
+            new.doc_len[row] = 0
+            if it is not None:
+                counts = Counter(tokenize(_doc_text(it, self.fields)))
+                new.doc_len[row] = sum(counts.values())
+                for term, tf in counts.items():
+                    added.setdefault(term, []).append((row, tf))
+                affected.update(counts)
+                live_delta += 1
+        for term in affected:
+            rows, tfs = self.postings.get(term, (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)))
+            keep = ~np.isin(rows, touched)
+            extra = sorted(added.get(term, []))
+            rows = np.concatenate((rows[keep], np.array([r for r, _ in extra], dtype=np.int64)))
+            tfs = np.concatenate((tfs[keep], np.array([t for _, t in extra], dtype=np.float32)))
+            order = np.argsort(rows, kind="stable")
+            if len(rows):
+                new.postings[term] = (rows[order], tfs[order])
+            else:
+                new.postings.pop(term, None)
+        new._update_stats(self.n + live_delta)
+        return new
+
+    def _idf(self, df):
+        return np.log(1.0 + (self.n - df + 0.5) / (df + 0.5))
+
+    def _term_scores(self, rows, tfs, df):
+        norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[rows] / (self.avgdl or 1.0))
+        return self._idf(df) * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+    def search(self, query, top_k=50, allowed=None):
+        """(rows, scores) of the top_k BM25 matches, best first."""
+        parts_rows, parts_scores = [], []
+        for term in set(tokenize(query)):
+            hit = self.postings.get(term)
+            if hit is None:
+                continue
+            rows, tfs = hit
+            parts_rows.append(rows)
+            parts_scores.append(self._term_scores(rows, tfs, len(rows)))
+        if not parts_rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows, inverse = np.unique(np.concatenate(parts_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(parts_scores)).astype(np.float32)
+        if allowed is not None:
+            keep = allowed[rows]
+            rows, scores = rows[keep], scores[keep]
+        if len(rows) > top_k:
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            rows, scores = rows[top], scores[top]
+        order = np.lexsort((rows, -scores))
+        return rows[order], scores[order]
+
+    def score_rows(self, query, rows):
+        """Exact BM25 scores for specific rows (0 where no term matches)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.zeros(len(rows), dtype=np.float32)
+        for term in set(tokenize(query)):
+            hit = self.postings.get(term)
+            if hit is None:
+                continue
+            t_rows, tfs = hit
+            pos = np.searchsorted(t_rows, rows)
+            pos[pos >= len(t_rows)] = 0
+            found = t_rows[pos] == rows
+            if found.any():
+                out[found] += self._term_scores(rows[found], tfs[pos[found]], len(t_rows))
+        return out
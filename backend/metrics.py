@@ -0,0 +1,168 @@
+"""
+In-process metrics with Prometheus text exposition (GET /metrics).
+
+Histograms and counters are plain Python objects guarded by one lock each;
+an observation is a bisect plus a few additions, cheap enough to leave on
+in production. Metric families are keyed by label values:
+
+  search_stage_seconds{stage}      pipeline stages (intent, retrieve, geo,
+                                   filter, score, rank, explain), plus the
+                                   encode and index_search steps inside
+                                   retrieval, batch_wait (queued for a
+                                   shared encode, see batching.py) and
+                                   response serialization
+  search_candidates_total{stage}   candidates left after retrieve, geo and
+                                   filter, summed over searches
+  search_batch_fallback_total      batch searches whose shared retrieval
+                                   failed, so each entry retrieved alone
+  http_request_seconds{endpoint}   whole requests, by route
+  http_requests_total{endpoint,status}
+
+timed(stage) also adds the elapsed ms to the dict installed by recording()
+on the current thread, which is how a search collects its own breakdown
+for ?debug_timing=1.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+import threading
+import time
+
+# Seconds; covers sub-millisecond stages up to slow cold-start searches
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+_local = threading.local()
+
+
+def _labels_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs) + "}"
+
+
+def _num(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values -> count
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, v in items:
+            lines.append(f"{self.name}{_labels_text(self.labelnames, labels)} {_num(v)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, n) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, labels, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels_text(self.labelnames, labels)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels_text(self.labelnames, labels)} {n}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("search_stage_seconds", "Time spent per search stage", ("stage",))
+CANDIDATES = Counter("search_candidates_total", "Candidates left after each pruning stage", ("stage",))
+BATCH_FALLBACKS = Counter("search_batch_fallback_total", "Batch searches whose shared retrieval failed")
+REQUEST_SECONDS = Histogram("http_request_seconds", "Request latency by route", ("endpoint",))
+REQUESTS = Counter("http_requests_total", "Requests by route and status", ("endpoint", "status"))
+
+
+def observe_stage(stage, seconds):
+    """Records a stage duration, in the histogram and in the thread's recording() dict."""
+    STAGE_SECONDS.observe(seconds, stage)
+    sink = getattr(_local, "timings", None)
+    if sink is not None:
+        sink[stage] = sink.get(stage, 0.0) + seconds * 1000.0
+
+
+@contextmanager
+def timed(stage):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - t0)
+
+
+@contextmanager
+def recording(timings):
+    """Also collects this thread's stage timings into `timings` (ms) while active."""
+    prev = getattr(_local, "timings", None)
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = prev
+
+
+def add_recorded(timings):
+    """
+    Adds stage timings (ms) measured on another thread, e.g. a shared batch,
+    to this thread's recording() dict. Not observed again: the histograms
+    already counted them where they ran.
+    """
+    sink = getattr(_local, "timings", None)
+    if sink is not None:
+        for stage, ms in timings.items():
+            sink[stage] = sink.get(stage, 0.0) + ms
+
+
+def render():
+    """All metrics in the Prometheus text format (version 0.0.4)."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
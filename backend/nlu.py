@@ -1,4 +1,24 @@
+"""
+Query intent: causes, ZIP, radius and donation type from free text.
+
+The query is lowercased and tokenized once. ZIP and radius come from the
+number tokens in that pass. Causes and donation types are found by one
+Aho-Corasick automaton compiled from CAUSE_CANON and DONATION_TYPES, so
+matching costs the query length plus the matches, however many synonyms
+the taxonomy has.
+
+A phrase must start at a word boundary and may end inside a word, so
+inflections still match ("teen" in "teens", "homeless" in "homelessness"),
+but "rent" no longer matches inside "parents" or "stem" inside "system".
+Parses are cached by query text.
+"""
 import re
+from collections import deque
+
+try:
+    from backend.cache import LRUCache
+except ImportError:
+    from cache import LRUCache
 
 CAUSE_CANON = {
     "housing": ["housing", "affordable housing", "homeless", "shelter", "rent"],
@@ -9,34 +29,117 @@ CAUSE_CANON = {
     "youth": ["youth", "teen", "teenagers"],
     "legal": ["legal", "law", "eviction"]
 }
+# One-time wins when both are mentioned
+DONATION_TYPES = {
+    "one-time": ["one-time", "one time"],
+    "recurring": ["recurring", "monthly"],
+}
+MAX_RADIUS_MILES = 200  # clamp silly values
 
+_TOKEN = re.compile(r"[a-z0-9]+")
+# radius token: "10", "10mi", "10miles", "10km" (km are taken as miles)
+_RADIUS = re.compile(r"(\d{1,3})(?:mi|miles|km)?")
 
-def parse_intent(query: str):
-    q = (query or "").lower().strip()
 
-    # zip (US 5 digits)
-    zip_match = re.search(r"\b(\d{5})\b", q)
-    zip_code = zip_match.group(1) if zip_match else None
+def normalize(text):
+    """Lowercase tokens joined by single spaces; what phrases are matched against."""
+    return " ".join(_TOKEN.findall((text or "").lower()))
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over normalized phrases, each mapped to a value."""
+
+    def __init__(self, phrases):
+        # phrases: iterable of (phrase, value)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]  # per state: (phrase length, value) of phrases ending here
+        for phrase, value in phrases:
+            key = normalize(phrase)
+            if not key:
+                continue
+            node = 0
+            for ch in key:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = self.goto[node][ch] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                node = nxt
+            self.out[node] += ((len(key), value),)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] += self.out[self.fail[nxt]]
 
-    # radius (e.g., "within 10 miles", "10mi", "radius 15")
-    rad_match = re.search(r"(?:within|radius)?\s*(\d{1,3})\s*(?:mi|miles|km)?", q)
-    radius_miles = int(rad_match.group(1)) if rad_match else None
-    if radius_miles and radius_miles > 200:  # clamp silly values
-        radius_miles = 200
+    def find(self, text):
+        """Values of the phrases in normalized `text` that start at a word boundary."""
+        goto, fail, out = self.goto, self.fail, self.out
+        found = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, value in out[node]:
+                start = i - length + 1
+                if start == 0 or text[start - 1] == " ":
+                    found.append(value)
+        return found
 
-    # donation type
-    donation_type = "one-time" if "one-time" in q or "one time" in q else ("recurring" if "recurring" in q or "monthly" in q else None)
 
-    # causes
-    causes = set()
-    for canon, variants in CAUSE_CANON.items():
-        if any(v in q for v in variants):
-            causes.add(canon)
+def compile_matcher(cause_canon=CAUSE_CANON, donation_types=DONATION_TYPES):
+    phrases = [(v, ("cause", canon)) for canon, variants in cause_canon.items() for v in variants]
+    phrases += [(v, ("donation", kind)) for kind, variants in donation_types.items() for v in variants]
+    return PhraseMatcher(phrases)
+
+
+_matcher = compile_matcher()
+_cache = LRUCache(maxsize=4096)
+
+
+def parse(q, matcher):
+    """(causes, zip, radius_miles, donation_type) of a lowercased query."""
+    tokens = _TOKEN.findall(q)
+    zip_code = radius_miles = None
+    for tok in tokens:
+        if not tok[0].isdigit():
+            continue
+        if zip_code is None and len(tok) == 5 and tok.isdigit():
+            zip_code = tok
+        elif radius_miles is None:
+            m = _RADIUS.fullmatch(tok)
+            if m:
+                radius_miles = min(int(m.group(1)), MAX_RADIUS_MILES)
+
+    causes, donations = set(), set()
+    for kind, value in matcher.find(" ".join(tokens)):
+        (causes if kind == "cause" else donations).add(value)
+    donation_type = next((d for d in DONATION_TYPES if d in donations), None)
+    return tuple(sorted(causes)) or None, zip_code, radius_miles, donation_type
+
+
+def parse_intent(query: str):
+    q = (query or "").lower().strip()
+    parsed = _cache.get(q)
+    if parsed is None:
+        parsed = parse(q, _matcher)
+        _cache.put(q, parsed)
+    causes, zip_code, radius_miles, donation_type = parsed
 
     return {
-        "causes": sorted(list(causes)) if causes else None,
+        "causes": list(causes) if causes else None,
         "location": {"zip": zip_code, "radius_miles": radius_miles} if zip_code or radius_miles else None,
         "donation_type": donation_type
     }
 
 
+def cache_stats():
+    return _cache.stats()
@@ -0,0 +1,712 @@
+"""
+Search pipeline shared by every search endpoint.
+
+A search runs through fixed, named stages:
+
+    intent -> retrieve -> geo -> filter -> score -> rank -> explain
+
+Each stage is a plain function `stage(ctx)` that reads and writes fields on
+a SearchContext. Stages are timed individually (ctx.timings, in ms, and the
+search_stage_seconds histogram in metrics.py) and can
+be swapped per pipeline, e.g. `SearchPipeline(corpus, stages={"score": fn})`.
+
+From retrieval on, candidates are parallel NumPy arrays over corpus rows
+(ctx.rows, ctx.semantic, ctx.distance, ...), so geo, scoring and sorting are
+whole-array operations; per-result dicts are only built for the page.
+"""
+import base64
+import copy
+import hashlib
+import json
+import logging
+import time
+import numpy as np
+
+try:
+    from backend import metrics
+    from backend.nlu import parse_intent
+    from backend.vector_search import search as vec_search, search_batch as vec_search_batch, encode_queries, score_rows, current_state
+    from backend.geo import haversine_miles_np, geo_score_miles_np, ZIP_TO_LATLON
+    from backend.ranking import feature_matrix, score, active_scorer
+except ImportError:
+    import metrics
+    from nlu import parse_intent
+    from vector_search import search as vec_search, search_batch as vec_search_batch, encode_queries, score_rows, current_state
+    from geo import haversine_miles_np, geo_score_miles_np, ZIP_TO_LATLON
+    from ranking import feature_matrix, score, active_scorer
+
+DEFAULT_RADIUS_MILES = 25
+# How spatial candidates combine with vector hits when a location is given:
+#   "union"     - also pull in nearby orgs the semantic top_k missed
+#   "intersect" - only vector hits, cut to the radius
+# sort=distance always uses the spatial index (nearest-first).
+GEO_MODE = "union"
+# Deepest retrieval (top_k) a relevance cursor may expand to, doubling from
+# the request's top_k. Other sorts scroll the candidates page 1 was ranked on.
+MAX_CURSOR_DEPTH = 5000
+SORTS = ("relevance", "distance", "impact", "popularity", "newest", "rating")
+# "hybrid" fuses FAISS and BM25 hits; "lexical" is the fast mode, also used
+# automatically while the vector index is not loaded.
+RETRIEVAL_MODES = ("hybrid", "semantic", "lexical")
+
+log = logging.getLogger(__name__)
+
+
+class SearchCancelled(Exception):
+    """Raised by SearchPipeline.run when its cancel event is set between stages."""
+
+
+class Snapshot:
+    """
+    A corpus and the vector state built from the same records. Published as
+    one object so a search never pairs rows of one version with index labels
+    of another.
+    """
+
+    def __init__(self, corpus, vectors):
+        self.corpus = corpus
+        self.vectors = vectors
+
+
+class SearchRequest:
+    """Normalized search parameters, independent of the HTTP shape they came in."""
+
+    def __init__(self, query="", location=None, filters=None, sort="relevance",
+                 top_k=100, page=1, limit=10, retrieval="hybrid", cursor=None):
+        self.query = query
+        self.location = location or {}
+        self.filters = dict(filters or {})
+        self.sort = sort
+        self.top_k = top_k
+        self.page = page
+        self.limit = limit
+        self.retrieval = retrieval if retrieval in RETRIEVAL_MODES else "hybrid"
+        self.cursor = cursor  # next_cursor of a previous response; replaces page
+
+    @classmethod
+    def from_json(cls, body):
+        """Body of POST /api/search (see server.search_api for the schema)."""
+        limit = max(1, min(50, int(body.get("limit") or 10)))
+        return cls(
+            query=(body.get("query") or "").strip(),
+            location=body.get("location") or {},
+            filters=body.get("filters") or {},
+            sort=(body.get("sort") or "relevance").lower(),
+            top_k=max(limit, int(body.get("top_k") or 100)),
+            page=max(1, int(body.get("page") or 1)),
+            limit=limit,
+            retrieval=(body.get("retrieval") or "hybrid").lower(),
+            cursor=body.get("cursor") or None,
+        )
+
+    @classmethod
+    def from_args(cls, args):
+        """Query string of GET /search."""
+        zip_code = args.get("zip")
+        radius = args.get("radius", type=int)
+        cause = args.getlist("cause")  # ?cause=housing&cause=families
+        limit = max(1, min(50, int(args.get("limit") or 10)))
+        return cls(
+            query=args.get("query", args.get("q", "")),
+            location={"zip": zip_code, "radius_miles": radius} if zip_code or radius else {},
+            filters={"cause": cause} if cause else {},
+            sort=(args.get("sort") or "relevance").lower(),
+            top_k=max(limit, int(args.get("top_k") or 100)),
+            page=max(1, int(args.get("page") or 1)),
+            limit=limit,
+            retrieval=(args.get("retrieval") or "hybrid").lower(),
+            cursor=args.get("cursor") or None,
+        )
+
+
+class SearchContext:
+    """Mutable state threaded through the stages of one search."""
+
+    def __init__(self, req, corpus, vectors=None):
+        self.req = req
+        self.corpus = corpus  # fixed for the whole run
+        self.vectors = vectors  # VectorState matching corpus, None = not loaded
+        self.intent = None
+        self.filters = dict(req.filters)
+        self.loc_zip = None
+        self.radius = None
+        self.user_latlon = None
+        self.allowed = None  # row mask from the filter index, None = unfiltered
+        self.retrieval = req.retrieval  # mode actually used
+        self.hits = []  # [{"id", "semantic_score"}] from retrieval
+        self.prefetched = None  # vector hits already searched by run_batch()
+        self.depth_limited = False  # some source returned a full top_k: deeper results may exist
+        self.next_cursor = None
+        self.lexical_norm = 0.0  # best BM25 score for the query; scales ctx.lexical to [0,1]
+        # Candidate columns, pruned together: corpus row, cosine, BM25, miles, geo, final
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.semantic = np.zeros(0)
+        self.lexical = np.zeros(0)
+        self.distance = None  # None when the search has no location
+        self.geo = np.zeros(0)
+        self.final = None  # set by the score stage
+        self.total = 0
+        self.page = np.zeros(0, dtype=np.int64)  # candidate positions on this page
+        self.results = []
+        self.timings = {}
+        self.candidates = {}  # stage -> candidates left after it (retrieve, geo, filter)
+
+    def keep(self, mask):
+        """Prunes every candidate column with a boolean mask."""
+        self.rows = self.rows[mask]
+        self.semantic = self.semantic[mask]
+        self.lexical = self.lexical[mask]
+        self.geo = self.geo[mask]
+        if self.distance is not None:
+            self.distance = self.distance[mask]
+        if self.final is not None:
+            self.final = self.final[mask]
+
+    def response(self):
+        req = self.req
+        return {
+            "success": True,
+            "query": req.query,
+            "intent": self.intent,
+            "sort": req.sort,
+            "retrieval": self.retrieval,
+            "page": req.page,
+            "limit": req.limit,
+            "total_found": self.total,
+            "results": self.results,
+            "next_cursor": self.next_cursor,
+        }
+
+
+# ---- stages -----------------------------------------------------------------
+
+def stage_intent(ctx):
+    # Intent parse (merge with explicit payload)
+    req = ctx.req
+    ctx.intent = intent = parse_intent(req.query)
+    nlu_loc = intent.get("location") or {}
+    ctx.loc_zip = req.location.get("zip") or nlu_loc.get("zip")
+    ctx.radius = req.location.get("radius_miles") or nlu_loc.get("radius_miles") or DEFAULT_RADIUS_MILES
+    # If causes explicitly passed, keep them; else use NLU
+    if "cause" not in ctx.filters and "causes" not in ctx.filters and intent.get("causes"):
+        ctx.filters["cause"] = intent["causes"]
+
+
+def _allowed(ctx):
+    # Resolve filters against the corpus filter index once per search
+    if ctx.allowed is None and ctx.filters:
+        ctx.allowed = ctx.corpus.filter_mask(ctx.filters)
+    return ctx.allowed
+
+
+def _query_text(ctx):
+    return ctx.req.query or "nonprofit"
+
+
+def _lexical_scores(ctx, rows):
+    if not ctx.lexical_norm or not len(rows):
+        return np.zeros(len(rows))
+    return np.clip(ctx.corpus.lexical.score_rows(ctx.req.query, rows) / ctx.lexical_norm, 0.0, 1.0)
+
+
+def add_candidates(ctx, rows):
+    """Appends rows found by a non-vector source, scoring them semantically and lexically."""
+    rows = rows[~np.isin(rows, ctx.rows)]
+    if not len(rows):
+        return
+    if ctx.retrieval != "lexical":
+        sem = np.clip(score_rows(_query_text(ctx), rows, state=ctx.vectors), 0.0, 1.0)
+    else:
+        sem = np.zeros(len(rows))
+    ctx.rows = np.concatenate((ctx.rows, rows))
+    ctx.semantic = np.concatenate((ctx.semantic, sem))
+    ctx.lexical = np.concatenate((ctx.lexical, _lexical_scores(ctx, rows)))
+    ctx.geo = np.concatenate((ctx.geo, np.zeros(len(rows))))
+
+
+def stage_retrieve(ctx):
+    # Semantic retrieval: [{"id": "...", "semantic_score": 0.83}, ...]
+    # Filters are pushed into FAISS so top_k is spent on admissible rows only.
+    if ctx.retrieval != "lexical" and ctx.vectors is None:
+        ctx.retrieval = "lexical"  # degraded fast mode until the index is loaded
+    if ctx.retrieval != "lexical" and ctx.prefetched is not None:
+        ctx.hits = ctx.prefetched
+    elif ctx.retrieval != "lexical":
+        ctx.hits = vec_search(_query_text(ctx), top_k=ctx.req.top_k, allowed=_allowed(ctx),
+                              state=ctx.vectors)
+    ctx.depth_limited = len(ctx.hits) >= ctx.req.top_k
+    row_of = ctx.corpus.row_of
+    hits = [h for h in ctx.hits if h["id"] in row_of]
+    ctx.rows = np.array([row_of[h["id"]] for h in hits], dtype=np.int64)
+    ctx.semantic = np.clip([h["semantic_score"] for h in hits], 0.0, 1.0)  # cosine in [0,1]
+    ctx.geo = np.zeros(len(ctx.rows))
+
+    # Lexical (BM25) retrieval, fused by adding its hits and a lexical score term
+    if ctx.retrieval != "semantic" and ctx.req.query:
+        lex_rows, lex_scores = ctx.corpus.lexical.search(ctx.req.query, ctx.req.top_k, allowed=_allowed(ctx))
+        ctx.lexical_norm = float(lex_scores[0]) if len(lex_scores) else 0.0
+        ctx.depth_limited |= len(lex_rows) >= ctx.req.top_k
+        ctx.lexical = _lexical_scores(ctx, ctx.rows)
+        add_candidates(ctx, lex_rows)
+    else:
+        ctx.lexical = np.zeros(len(ctx.rows))
+
+
+def stage_geo(ctx):
+    # Geospatial score, then keep only candidates within radius if a location was given
+    ctx.user_latlon = user_latlon = ZIP_TO_LATLON.locate(ctx.loc_zip) if ctx.loc_zip else None
+    if not user_latlon:
+        return
+    c = ctx.corpus
+    mode = ctx.req.location.get("mode") or GEO_MODE
+    if mode == "union" or ctx.req.sort == "distance":
+        # Nearest admissible orgs in radius from the grid, up to top_k of them
+        near, _ = c.spatial.nearest(user_latlon[0], user_latlon[1], ctx.req.top_k,
+                                    ctx.radius, allowed=_allowed(ctx))
+        ctx.depth_limited |= len(near) >= ctx.req.top_k
+        add_candidates(ctx, near)
+    ctx.distance = haversine_miles_np(user_latlon[0], user_latlon[1], c.lat[ctx.rows], c.lon[ctx.rows])
+    ctx.geo = geo_score_miles_np(ctx.distance, ctx.radius)
+    ctx.keep(ctx.distance <= ctx.radius)
+
+
+def stage_filter(ctx):
+    # Filters (cause, rating…): a mask lookup per candidate. Usually a no-op
+    # since retrieval was already restricted, but keeps swapped-in
+    # retrieval stages honest.
+    allowed = _allowed(ctx)
+    if allowed is not None:
+        ctx.keep(allowed[ctx.rows])
+
+
+def features(ctx):
+    """Ranking feature matrix of the candidates, columns in ranking.FEATURES order."""
+    c = ctx.corpus
+    return feature_matrix({"semantic": ctx.semantic, "geo": ctx.geo, "trust": c.trust[ctx.rows],
+                           "popularity": c.popularity[ctx.rows], "lexical": ctx.lexical})
+
+
+def stage_score(ctx):
+    # The active ranking scorer (ranking.set_scorer), on all candidates at once
+    ctx.final = score(features(ctx))
+
+
+def top_positions(key, m):
+    """
+    Positions of the m smallest keys, sorted by key then position (i.e. what
+    a stable full sort would put first), without sorting everything.
+    """
+    n = len(key)
+    if m >= n:
+        return np.lexsort((np.arange(n), key))
+    if m <= 0:
+        return np.zeros(0, dtype=np.int64)
+    kth = np.partition(key, m - 1)[m - 1]
+    cand = np.flatnonzero(key <= kth)  # includes every tie at the boundary
+    return cand[np.lexsort((cand, key[cand]))][:m]
+
+
+def sort_key(ctx):
+    """Ascending sort key per candidate for the requested sort mode."""
+    sort, c, rows = ctx.req.sort, ctx.corpus, ctx.rows
+    if sort == "distance" and ctx.user_latlon:
+        return ctx.distance
+    if sort == "rating":
+        return -c.avg_rating[rows]
+    if sort == "popularity":
+        return -c.popularity[rows]
+    if sort == "newest":
+        return -c.created_at[rows]
+    if sort == "impact":
+        return -c.impact[rows]
+    return -ctx.final  # relevance
+
+
+def stage_rank(ctx):
+    # Only the requested page is ordered; argpartition does the rest
+    ctx.total = len(ctx.rows)
+    start = (ctx.req.page - 1) * ctx.req.limit
+    order = top_positions(sort_key(ctx), start + ctx.req.limit)
+    ctx.page = order[start:]
+
+
+def stage_explain(ctx):
+    c = ctx.corpus
+    results = []
+    for pos in ctx.page:
+        row = ctx.rows[pos]
+        why = []
+        if ctx.filters.get("cause"):
+            why.append(f"matches: {', '.join(ctx.filters['cause'])}")
+        elif ctx.intent.get("causes"):
+            why.append(f"matches: {', '.join(ctx.intent['causes'])}")
+        if ctx.distance is not None:
+            why.append(f"{ctx.distance[pos]:.1f} mi away")
+        if c.trust[row] >= 1.0:
+            why.append("verified")
+        rec = c.items[row]  # decoded for this response only, safe to annotate
+        rec["_scores"] = {
+            "semantic": round(float(ctx.semantic[pos]), 3),
+            "lexical": round(float(ctx.lexical[pos]), 3),
+            "geo": round(float(ctx.geo[pos]), 3),
+            "final": round(float(ctx.final[pos]), 3)
+        }
+        rec["_explain"] = " • ".join(why) if why else "relevant to your search"
+        results.append(rec)
+    ctx.results = results
+
+
+def _intent_fields(ctx):
+    req = ctx.req
+    return (
+        " ".join(req.query.lower().split()),  # matching and encoding are case/space-insensitive
+        ctx.loc_zip,
+        ctx.radius,
+        req.location.get("mode") or GEO_MODE,
+        json.dumps(ctx.filters, sort_keys=True, default=str),
+        req.sort,
+        req.retrieval,
+    )
+
+
+def result_key(ctx):
+    """
+    Result-cache key of a search after its intent stage: everything that
+    decides the ranked list (not which page of it is shown).
+    """
+    return (ctx.corpus.version, getattr(ctx.vectors, "version", None), ctx.req.top_k,
+            active_scorer()[0]) + _intent_fields(ctx)
+
+
+def fingerprint(ctx):
+    """Stable digest of the normalized intent; ties a cursor to its search."""
+    return hashlib.sha1(json.dumps(_intent_fields(ctx), default=str).encode("utf-8")).hexdigest()[:16]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# Sort keys are compared at this many decimals for cursors: the same org can
+# be scored through FAISS or through score_rows() at different depths, and
+# the two differ in the last float32 bits.
+CURSOR_KEY_DECIMALS = 6
+
+
+def encode_cursor(fp, k, served, last_key, levels, tie_ids):
+    data = {"f": fp, "k": k, "n": served, "s": last_key, "l": levels, "t": tie_ids}
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """(fingerprint, k, served, last_key, levels, tie_ids) of a next_cursor token."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        levels = [(int(k), str(cid)) for k, cid in data["l"]]
+        return (data["f"], int(data["k"]), int(data["n"]), float(data["s"]), levels,
+                [str(t) for t in data["t"]])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise InvalidCursor("invalid cursor") from None
+
+
+class RankedResult:
+    """Every candidate of a finished search, columns in final sort order."""
+
+    __slots__ = ("rows", "semantic", "lexical", "geo", "final", "distance", "user_latlon", "retrieval",
+                 "depth_limited", "_cursor_order")
+
+    def __init__(self, ctx):
+        order = top_positions(sort_key(ctx), len(ctx.rows))
+        self.rows = ctx.rows[order]
+        self.semantic = ctx.semantic[order]
+        self.lexical = ctx.lexical[order]
+        self.geo = ctx.geo[order]
+        self.final = ctx.final[order]
+        self.distance = ctx.distance[order] if ctx.distance is not None else None
+        self.user_latlon = ctx.user_latlon
+        self.retrieval = ctx.retrieval
+        self.depth_limited = ctx.depth_limited
+        self._cursor_order = None
+
+    def restore(self, ctx):
+        """Fills ctx as if retrieve..rank had run, for the page ctx.req asks for."""
+        for name in self.__slots__[:-1]:
+            setattr(ctx, name, getattr(self, name))
+        ctx.total = len(self.rows)
+        start = (ctx.req.page - 1) * ctx.req.limit
+        ctx.page = np.arange(start, min(start + ctx.req.limit, ctx.total), dtype=np.int64)
+
+    def after(self, keys, last_key, served_rows):
+        """
+        Positions after a cursor, in cursor order: (rounded key, row).
+        keys: cursor keys of this ranking (cursor_keys(ctx) once restored).
+        served_rows: rows tied at last_key that were already served.
+        """
+        if self._cursor_order is None:
+            self._cursor_order = np.lexsort((self.rows, keys))
+        order = self._cursor_order
+        k = keys[order]
+        keep = (k > last_key) | ((k == last_key) & ~np.isin(self.rows[order], served_rows))
+        return order[keep]
+
+
+def cursor_keys(ctx):
+    return np.round(sort_key(ctx), CURSOR_KEY_DECIMALS)
+
+
+def can_deepen(ctx, k):
+    """
+    Whether retrieval deeper than k may add results after the cursor: only
+    for relevance, where deeper candidates score lower. Under any other
+    sort they can land anywhere, before the cursor included.
+    """
+    return ctx.req.sort == "relevance" and ctx.depth_limited and k < MAX_CURSOR_DEPTH
+
+
+def page_cursor(ctx, k, served, keys, prev=None):
+    """
+    Cursor continuing after the page just built, or None when nothing can
+    follow. keys: cursor keys of the page rows. served: results served so
+    far, this page included. prev: (last_key, levels, tie_ids) of the cursor
+    this page came from.
+
+    Rows tied at the last key are served in row order, but which rows the
+    ranking holds depends on the retrieval depth. The cursor keeps one
+    (k, last id) level per depth the tie group was served at, plus the ties
+    served by page 1 (which came in rank order).
+    """
+    if not len(keys) or not (can_deepen(ctx, k) or served < ctx.total):
+        return None
+    last_key = float(keys[-1])
+    if prev is None:
+        ties = [ctx.corpus.ids[row] for key, row in zip(keys, ctx.rows[ctx.page]) if key == last_key]
+        return encode_cursor(fingerprint(ctx), k, served, last_key, [], ties)
+    levels, ties = (list(prev[1]), prev[2]) if prev[0] == last_key else ([], [])
+    if levels and levels[-1][0] == k:
+        levels.pop()
+    levels.append((k, ctx.corpus.ids[ctx.rows[ctx.page[-1]]]))
+    return encode_cursor(fingerprint(ctx), k, served, last_key, levels, ties)
+
+
+# Stages after which the candidate count is recorded
+PRUNING_STAGES = ("retrieve", "geo", "filter")
+
+DEFAULT_STAGES = (
+    ("intent", stage_intent),
+    ("retrieve", stage_retrieve),
+    ("geo", stage_geo),
+    ("filter", stage_filter),
+    ("score", stage_score),
+    ("rank", stage_rank),
+    ("explain", stage_explain),
+)
+
+
+class SearchPipeline:
+    """
+    corpus: zero-arg callable returning the current Snapshot (or a bare
+        Corpus, searched against the published vector state); called once
+        per search so a run never mixes two versions.
+    stages: optional {name: fn} overrides for any of DEFAULT_STAGES.
+    result_cache: optional LRUCache of RankedResult by result_key(). A hit
+        skips retrieve..rank and only slices the requested page out of the
+        cached ranking, so pages 2..N of a search are nearly free.
+    """
+
+    def __init__(self, corpus, stages=None, result_cache=None):
+        self.corpus = corpus
+        self.result_cache = result_cache
+        self.stages = list(DEFAULT_STAGES)
+        for name, fn in (stages or {}).items():
+            self.replace_stage(name, fn)
+
+    def replace_stage(self, name, fn):
+        for i, (stage_name, _) in enumerate(self.stages):
+            if stage_name == name:
+                self.stages[i] = (name, fn)
+                return
+        raise KeyError(f"unknown stage {name!r}")
+
+    def _context(self, req, snap):
+        if isinstance(snap, Snapshot):
+            return SearchContext(req, snap.corpus, snap.vectors)
+        return SearchContext(req, snap, current_state())
+
+    def _run_stages(self, ctx, stages, cancel=None):
+        # Steps timed inside a stage (encode, index_search) land in ctx.timings too
+        with metrics.recording(ctx.timings):
+            for name, fn in stages:
+                if cancel is not None and cancel.is_set():
+                    raise SearchCancelled(name)
+                t0 = time.perf_counter()
+                fn(ctx)
+                metrics.observe_stage(name, time.perf_counter() - t0)
+                if name in PRUNING_STAGES:
+                    ctx.candidates[name] = len(ctx.rows)
+                    metrics.CANDIDATES.inc(len(ctx.rows), name)
+        return ctx
+
+    def run(self, req, cancel=None):
+        """
+        cancel: optional threading.Event; once set, the run stops before its
+            next stage with SearchCancelled (e.g. the client went away).
+        """
+        if req.cursor:
+            return self._run_cursor(req, cancel)
+        ctx = self._context(req, self.corpus())
+        if self.result_cache is None:
+            self._run_stages(ctx, self.stages, cancel)
+        else:
+            self._run_stages(ctx, self.stages[:1], cancel)
+            self._ranked(ctx, cancel).restore(ctx)
+            self._run_stages(ctx, self.stages[-1:], cancel)
+        if req.page == 1:
+            ctx.next_cursor = page_cursor(ctx, req.top_k, len(ctx.page), cursor_keys(ctx)[ctx.page])
+        return ctx
+
+    def _ranked(self, ctx, cancel=None):
+        """RankedResult of ctx (after its intent stage), from the result cache if possible."""
+        ranked = self._cached_ranking(ctx)
+        return ranked if ranked is not None else self._rank(ctx, cancel)
+
+    def _cached_ranking(self, ctx):
+        """RankedResult of ctx from the result cache, or None."""
+        if self.result_cache is None:
+            return None
+        t0 = time.perf_counter()
+        ranked = self.result_cache.get(result_key(ctx))
+        if ranked is not None:
+            with metrics.recording(ctx.timings):
+                metrics.observe_stage("result_cache", time.perf_counter() - t0)
+        return ranked
+
+    def _rank(self, ctx, cancel=None):
+        """Runs retrieve .. score on ctx; its full RankedResult goes to the result cache."""
+        self._run_stages(ctx, self.stages[1:-2], cancel)
+        with metrics.recording(ctx.timings), metrics.timed("rank"):
+            ranked = RankedResult(ctx)  # full sort, in place of the rank stage
+        if self.result_cache is not None:
+            self.result_cache.put(result_key(ctx), ranked)
+        return ranked
+
+    def _run_cursor(self, req, cancel=None, snap=None):
+        """
+        Next page after req.cursor. Continues from the cursor's (score, id)
+        in the cached ranking for retrieval depth k. For relevance, k doubles
+        (up to MAX_CURSOR_DEPTH) as the user scrolls deeper or when the
+        ranking runs short while retrieval was cut at k. Other sorts stay at
+        page 1's depth, so the scroll covers exactly its total_found. Each k
+        is ranked once and then cached, so most pages are a seek plus a slice.
+        snap: the Snapshot to search (default: the current one).
+        """
+        fp, k, served, last_key, levels, tie_ids = decode_cursor(req.cursor)
+        if req.sort == "relevance":
+            k = max(k, req.top_k)
+            # Keep retrieval well ahead of the scroll position: a deeper
+            # ranking can surface candidates that belong before the cursor,
+            # and those would be skipped for good.
+            while k < 2 * (served + req.limit):
+                k *= 2
+            k = min(k, MAX_CURSOR_DEPTH)
+        snap = self.corpus() if snap is None else snap
+        corpus = snap.corpus if isinstance(snap, Snapshot) else snap
+        served_rows = [corpus.rows_for(tie_ids)]
+        for level_k, last_id in levels:
+            ctx, _, keys = self._ranking_at(req, snap, level_k, fp, cancel)
+            last_row = ctx.corpus.row_of.get(last_id, -1)
+            served_rows.append(ctx.rows[(keys == last_key) & (ctx.rows <= last_row)])
+        served_rows = np.concatenate(served_rows)
+        while True:
+            ctx, ranked, keys = self._ranking_at(req, snap, k, fp, cancel)
+            positions = ranked.after(keys, last_key, served_rows)
+            if len(positions) > req.limit or not can_deepen(ctx, k):
+                break
+            k = min(2 * k, MAX_CURSOR_DEPTH)
+        ctx.page = positions[:req.limit]
+        self._run_stages(ctx, self.stages[-1:], cancel)
+        ctx.next_cursor = page_cursor(ctx, k, served + len(ctx.page), keys[ctx.page], (last_key, levels, tie_ids))
+        if len(positions) <= req.limit and not can_deepen(ctx, k):
+            ctx.next_cursor = None
+        return ctx
+
+    def _ranking_at(self, req, snap, k, fp, cancel=None):
+        """(ctx, RankedResult, cursor keys) of req ranked at retrieval depth k."""
+        sub = copy.copy(req)
+        sub.top_k, sub.page = k, 1
+        ctx = self._context(sub, snap)
+        self._run_stages(ctx, self.stages[:1], cancel)
+        if fingerprint(ctx) != fp:
+            raise InvalidCursor("cursor belongs to a different search")
+        ranked = self._ranked(ctx, cancel)
+        ranked.restore(ctx)
+        return ctx, ranked, cursor_keys(ctx)
+
+    def run_batch(self, reqs):
+        """
+        Runs several searches against one snapshot. All query texts are
+        encoded in one model call and the vector retrieval of searches with
+        the same filters is one multi-query index search. Returns one entry
+        per request, in order: its SearchContext, or the exception it raised
+        (a failing search does not affect the others). Rankings go through
+        the result cache as in run(): a search found there is not retrieved.
+        """
+        snap = self.corpus()
+        out = []
+        cached = {}  # position in out -> RankedResult from the result cache
+        for req in reqs:
+            try:
+                if req.cursor:  # continues a cached ranking, nothing to batch
+                    out.append(self._run_cursor(req, snap=snap))
+                    continue
+                ctx = self._run_stages(self._context(req, snap), self.stages[:1])
+                ranked = self._cached_ranking(ctx)
+                if ranked is not None:
+                    cached[len(out)] = ranked
+                out.append(ctx)
+            except Exception as e:
+                out.append(e)
+
+        pending = [ctx for i, ctx in enumerate(out) if isinstance(ctx, SearchContext) and not ctx.req.cursor
+                   and i not in cached and ctx.retrieval != "lexical" and ctx.vectors is not None]
+        groups = {}
+        for ctx in pending:
+            groups.setdefault(json.dumps(ctx.filters, sort_keys=True, default=str), []).append(ctx)
+        t0 = time.perf_counter()
+        try:
+            if pending:
+                encode_queries(sorted({_query_text(ctx) for ctx in pending}))
+            for group in groups.values():
+                allowed = _allowed(group[0])
+                for ctx in group[1:]:
+                    ctx.allowed = allowed
+                hits = vec_search_batch([_query_text(ctx) for ctx in group],
+                                        top_k=max(ctx.req.top_k for ctx in group),
+                                        allowed=allowed, state=group[0].vectors)
+                for ctx, h in zip(group, hits):
+                    ctx.prefetched = h[:ctx.req.top_k]
+        except Exception:
+            # Each search falls back to its own retrieval and fails (or not) alone
+            log.exception("batched retrieval failed for %d searches; retrieving one by one", len(pending))
+            metrics.BATCH_FALLBACKS.inc()
+        batch_ms = (time.perf_counter() - t0) * 1000.0
+        if pending:
+            metrics.STAGE_SECONDS.observe(batch_ms / 1000.0, "batch_retrieve")
+
+        for i, ctx in enumerate(out):
+            if not isinstance(ctx, SearchContext) or ctx.req.cursor:
+                continue
+            if ctx.prefetched is not None:
+                ctx.timings["batch_retrieve"] = batch_ms
+            try:
+                if self.result_cache is None:
+                    self._run_stages(ctx, self.stages[1:])
+                else:
+                    ranked = cached[i] if i in cached else self._rank(ctx)
+                    ranked.restore(ctx)
+                    self._run_stages(ctx, self.stages[-1:])
+            except Exception as e:
+                out[i] = e
+                continue
+            if ctx.req.page == 1:
+                ctx.next_cursor = page_cursor(ctx, ctx.req.top_k, len(ctx.page), cursor_keys(ctx)[ctx.page])
+        return out
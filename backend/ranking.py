@@ -1,3 +1,193 @@
-def final_score(semantic, geo_s, trust, popularity):
-    # Simple transparent formula; tune via A/B tests
-    return 0.6*semantic + 0.2*geo_s + 0.15*trust + 0.05*popularity
+"""
+Relevance scoring of search candidates.
+
+All candidates of a search are scored in one call on a feature matrix: one
+row per candidate, one column per name in FEATURES (each in [0, 1]). A
+scorer is any callable X -> scores of shape (n,); higher ranks first.
+
+Scorers are registered by name and the pipeline uses the active one
+(set_scorer(), or RANKING_SCORER / RANKING_MODEL in server.py):
+
+  linear    - weighted sum of the features, DEFAULT_WEIGHTS unless given
+  logistic  - sigmoid of a weighted sum plus bias
+  gbdt      - gradient-boosted regression trees, evaluated level by level
+              for every candidate at once
+
+Learned scorers are loaded from JSON model files with load_scorer():
+
+  {"type": "logistic", "weights": {"semantic": 4.1, ...}, "bias": -2.0}
+  {"type": "gbdt", "features": ["semantic", "geo", ...], "base_score": 0.0,
+   "learning_rate": 0.1, "trees": [{"feature": [0, -1, -1],
+   "threshold": [0.42, 0, 0], "left": [1, -1, -1], "right": [2, -1, -1],
+   "value": [0, -0.3, 0.8]}, ...]}
+
+Tree node i splits on features[feature[i]] (x <= threshold[i] goes to
+left[i], otherwise right[i]); feature[i] = -1 marks a leaf worth value[i].
+"""
+import json
+import os
+
+import numpy as np
+
+FEATURES = ("semantic", "geo", "trust", "popularity", "lexical")
+# Weight of the BM25 term. The pre-hybrid weights (0.6 / 0.2 / 0.15 / 0.05)
+# share the remaining 0.8 in the same proportions, so scores stay in [0, 1]
+# and candidates without a lexical match keep their relative order.
+LEXICAL_WEIGHT = 0.2
+DEFAULT_WEIGHTS = {"semantic": 0.48, "geo": 0.16, "trust": 0.12, "popularity": 0.04, "lexical": LEXICAL_WEIGHT}
+
+
+def _feature_index(names):
+    unknown = [f for f in names if f not in FEATURES]
+    if unknown:
+        raise ValueError(f"unknown ranking features {unknown}; expected a subset of {FEATURES}")
+    return [FEATURES.index(f) for f in names]
+
+
+def feature_matrix(columns):
+    """(n, len(FEATURES)) float64 matrix from {feature name: array of n}."""
+    return np.column_stack([np.asarray(columns[f], dtype=np.float64) for f in FEATURES])
+
+
+class LinearScorer:
+    kind = "linear"
+
+    def __init__(self, weights=None, bias=0.0):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.bias = float(bias)
+        # Column by column in FEATURES order: the same float operations as
+        # the formula this replaces, so rankings are unchanged bit for bit
+        self._terms = [(col, float(self.weights[f]))
+                       for col, f in zip(_feature_index(self.weights), self.weights) if self.weights[f]]
+        self._terms.sort()
+
+    def linear(self, X):
+        out = np.zeros(len(X))
+        for i, (col, w) in enumerate(self._terms):
+            out = w * X[:, col] if i == 0 else out + w * X[:, col]
+        return out + self.bias if self.bias else out
+
+    def __call__(self, X):
+        return self.linear(X)
+
+
+class LogisticScorer(LinearScorer):
+    kind = "logistic"
+
+    def __call__(self, X):
+        return 1.0 / (1.0 + np.exp(-self.linear(X)))
+
+
+class _Tree:
+    def __init__(self, spec, n_features):
+        self.feature = np.asarray(spec["feature"], dtype=np.int64)
+        self.threshold = np.asarray(spec["threshold"], dtype=np.float64)
+        self.left = np.asarray(spec["left"], dtype=np.int64)
+        self.right = np.asarray(spec["right"], dtype=np.int64)
+        self.value = np.asarray(spec["value"], dtype=np.float64)
+        n = len(self.feature)
+        if not all(len(a) == n for a in (self.threshold, self.left, self.right, self.value)):
+            raise ValueError("tree arrays must all have one entry per node")
+        inner = self.feature >= 0
+        if (self.feature >= n_features).any() or ((self.left[inner] <= 0) | (self.left[inner] >= n)).any() \
+                or ((self.right[inner] <= 0) | (self.right[inner] >= n)).any():
+            raise ValueError("tree node points outside the tree or the feature list")
+        # Leaves loop to themselves, so every candidate takes `depth` steps
+        self.left = np.where(inner, self.left, np.arange(n))
+        self.right = np.where(inner, self.right, np.arange(n))
+        self.feature = np.where(inner, self.feature, 0)
+        self.depth = self._depth(inner)
+
+    def _depth(self, inner):
+        depth, level = 0, np.zeros(1, dtype=np.int64)
+        while inner[level].any():
+            level = np.concatenate((self.left[level[inner[level]]], self.right[level[inner[level]]]))
+            depth += 1
+            if depth > len(inner):
+                raise ValueError("tree has a cycle")
+        return depth
+
+    def leaves(self, X):
+        node = np.zeros(len(X), dtype=np.int64)
+        rows = np.arange(len(X))
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node]
+
+
+class TreeEnsembleScorer:
+    kind = "gbdt"
+
+    def __init__(self, trees, features=FEATURES, base_score=0.0, learning_rate=1.0):
+        self.features = tuple(features)
+        self._cols = _feature_index(self.features)
+        self.base_score = float(base_score)
+        self.learning_rate = float(learning_rate)
+        self.trees = [_Tree(t, len(self.features)) for t in trees]
+
+    def __call__(self, X):
+        X = X[:, self._cols]
+        out = np.full(len(X), self.base_score)
+        for tree in self.trees:
+            out += self.learning_rate * tree.leaves(X)
+        return out
+
+
+def load_scorer(path):
+    """Scorer from a JSON model file (see the module docstring)."""
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    kind = spec.get("type")
+    if kind == "linear":
+        return LinearScorer(spec.get("weights"), spec.get("bias", 0.0))
+    if kind == "logistic":
+        return LogisticScorer(spec["weights"], spec.get("bias", 0.0))
+    if kind == "gbdt":
+        return TreeEnsembleScorer(spec["trees"], spec.get("features", FEATURES),
+                                  spec.get("base_score", 0.0), spec.get("learning_rate", 1.0))
+    raise ValueError(f"{path}: unknown scorer type {kind!r}")
+
+
+SCORERS = {"linear": LinearScorer()}
+_active = "linear"
+
+
+def register_scorer(name, scorer):
+    SCORERS[name] = scorer
+
+
+def get_scorer(name):
+    try:
+        return SCORERS[name]
+    except KeyError:
+        raise KeyError(f"unknown scorer {name!r}; registered: {sorted(SCORERS)}") from None
+
+
+def set_scorer(name=None, path=None):
+    """
+    Makes a registered scorer the active one; with path, loads it from that
+    model file first (registered under name, default the file's base name).
+    """
+    global _active
+    if path:
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        register_scorer(name, load_scorer(path))
+    get_scorer(name)
+    _active = name
+
+
+def active_scorer():
+    """(name, scorer) used by score()."""
+    return _active, SCORERS[_active]
+
+
+def score(X):
+    return SCORERS[_active](X)
+
+
+def final_score(semantic, geo_s, trust, popularity, lexical=0.0):
+    # The default linear formula on scalars or arrays, kept for callers
+    # that score a few values outside the pipeline.
+    # lexical is the BM25 score normalized to [0,1] by the query's best match.
+    return 0.48*semantic + 0.16*geo_s + 0.12*trust + 0.04*popularity + LEXICAL_WEIGHT*lexical
@@ -0,0 +1,117 @@
+"""
+Compact storage for the nonprofit records themselves.
+
+Nested dicts cost several hundred bytes of object overhead per org on top
+of their content. RecordStore instead keeps every record as compact UTF-8
+JSON in one contiguous bytes blob, addressed by an int64 offsets array
+indexed by corpus row (the same row id as the Corpus columns and the FAISS
+labels). A dict is only decoded when a record is actually returned, e.g.
+for the page of search results or a detail lookup; the numeric fields
+ranking needs live in Corpus' typed columns and never go through here.
+"""
+from collections.abc import Mapping, Sequence
+import json
+
+import numpy as np
+
+
+def _encode(rec):
+    return json.dumps(rec, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class RecordStore(Sequence):
+    """
+    Row -> record dict (a fresh copy per access), or None for a deleted
+    row. Immutable: with_rows() returns a new store that shares this one's
+    blob and only holds the changed rows itself.
+    """
+
+    __slots__ = ("_blob", "_offsets", "_overlay", "_len")
+
+    def __init__(self, records=()):
+        parts, offsets, size = [], [0], 0
+        for rec in records:
+            data = _encode(rec)
+            parts.append(data)
+            size += len(data)
+            offsets.append(size)
+        self._blob = b"".join(parts)
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self._overlay = {}  # row -> encoded record, or None for a delete
+        self._len = len(offsets) - 1
+
+    def __len__(self):
+        return self._len
+
+    def raw(self, row):
+        """Encoded JSON bytes of a row, or None if deleted."""
+        if row < 0:
+            row += self._len
+        if not 0 <= row < self._len:
+            raise IndexError(row)
+        if row in self._overlay:
+            return self._overlay[row]
+        return self._blob[self._offsets[row]:self._offsets[row + 1]]
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(self._len))]
+        data = self.raw(int(row))
+        return None if data is None else json.loads(data)
+
+    def with_rows(self, changes):
+        """New store with {row: record or None} applied; rows past the end append."""
+        new = RecordStore.__new__(RecordStore)
+        new._blob = self._blob
+        new._offsets = self._offsets
+        new._overlay = dict(self._overlay)
+        new._len = self._len
+        for row, rec in changes.items():
+            new._overlay[row] = None if rec is None else _encode(rec)
+            new._len = max(new._len, row + 1)
+        return new
+
+    @property
+    def nbytes(self):
+        overlay = sum(len(v) for v in self._overlay.values() if v is not None)
+        return len(self._blob) + self._offsets.nbytes + overlay
+
+
+class RecordsById(Mapping):
+    """Read-only id -> record view over a corpus; decodes on lookup."""
+
+    __slots__ = ("_store", "_row_of")
+
+    def __init__(self, store, row_of):
+        self._store = store
+        self._row_of = row_of
+
+    def __getitem__(self, cid):
+        return self._store[self._row_of[cid]]
+
+    def __contains__(self, cid):
+        return cid in self._row_of
+
+    def __iter__(self):
+        return iter(self._row_of)
+
+    def __len__(self):
+        return len(self._row_of)
+
+
+class LiveRecords(Sequence):
+    """The non-deleted records of a store, in row order, decoded on access."""
+
+    __slots__ = ("_store", "_rows")
+
+    def __init__(self, store, rows):
+        self._store = store
+        self._rows = rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._store[row] for row in self._rows[i]]
+        return self._store[self._rows[i]]
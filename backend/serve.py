@@ -0,0 +1,151 @@
+"""
+Production entry point: N pre-forked worker processes sharing one loaded
+search stack.
+
+The parent loads the data, the MiniLM model and the FAISS index once, then
+forks. Workers inherit everything copy-on-write:
+
+  - the embedding matrix is memory-mapped from the on-disk artifact
+    (backend/data/index_cache), so it is page-cache pages shared by every
+    worker (and by restarts). So are the inverted lists of the IVF index
+    types (ivf_flat, ivf_pq, pq). faiss reads flat, hnsw and sq8 indexes
+    into the parent's heap: those are shared by fork copy-on-write only,
+    as nothing writes to them, and each restart of the parent reads them
+    again;
+  - records (one bytes blob), Corpus columns and model weights are a few
+    large buffers nobody writes to after load;
+  - gc.freeze() moves everything allocated during load out of the
+    collector's reach, so collections in a worker do not touch (and copy)
+    the parent's pages.
+
+Per-worker memory is then mostly the Python heap of in-flight requests, and
+total memory grows much slower than N full copies of the app.
+
+torch runs single-threaded in the parent. Loading and warm-up encode
+queries there (and the corpus too, if the artifact is stale), and forking
+a process whose OpenMP/MKL thread pools have started can deadlock the
+child. With one thread those pools are never spun up, so the fork is
+safe. Each worker then sets its own --torch-threads. For a full rebuild
+on a multi-core box, set SEARCH_ENCODE_WORKERS so the corpus is encoded
+by a spawned process pool rather than the single-threaded parent.
+
+All workers accept() on one listening socket opened by the parent; each one
+serves requests on a thread pool (werkzeug threaded server). A worker that
+dies is replaced. SIGTERM/SIGINT stop the workers and exit.
+
+Usage:
+  python serve.py --workers 4 --port 5000
+
+Updates through /admin/* only reach the worker that served the request; with
+several workers use DATA_WATCH_INTERVAL so every worker reloads the data file.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+try:
+    from backend import server
+    from backend.ingest import peak_rss_mb
+except ImportError:
+    import server
+    from ingest import peak_rss_mb
+
+_children = {}  # pid -> worker number
+_stopping = False
+
+
+def _single_threaded_torch():
+    """Keeps torch's intra/inter-op thread pools from starting in the parent (see above)."""
+    import torch
+    torch.set_num_threads(1)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # only settable before any inter-op work; nothing has run yet in practice
+
+
+def _worker(sock, host, port, torch_threads):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles ^C
+    import torch
+    torch.set_num_threads(torch_threads or os.cpu_count() or 1)
+    server.start_background()
+    httpd = make_server(host, port, server.app, threaded=True, fd=sock.fileno())
+    httpd.serve_forever()
+
+
+def _spawn(n, sock, args):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _worker(sock, args.host, args.port, args.torch_threads)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    _children[pid] = n
+
+
+def _stop(signum, frame):
+    global _stopping
+    _stopping = True
+    for pid in list(_children):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    ap.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5000)))
+    ap.add_argument("--workers", type=int, default=int(os.environ.get("SERVE_WORKERS", os.cpu_count() or 1)))
+    ap.add_argument("--backlog", type=int, default=2048)
+    ap.add_argument("--torch-threads", type=int, default=int(os.environ.get("SERVE_TORCH_THREADS", 1)),
+                    help="intra-op threads per worker for query encoding (0 = one per CPU)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    _single_threaded_torch()
+    server.init_search(shared=True)
+    family = socket.AF_INET6 if ":" in args.host else socket.AF_INET
+    sock = socket.create_server((args.host, args.port), family=family, backlog=args.backlog)
+    sock.set_inheritable(True)
+    print(f"Loaded {len(server.DATA.get('nonprofits', []))} nonprofits in {time.perf_counter() - t0:.1f}s "
+          f"(peak RSS {peak_rss_mb():.0f} MiB); forking {args.workers} workers on {args.host}:{args.port}",
+          flush=True)
+
+    gc.collect()
+    gc.freeze()
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    for n in range(args.workers):
+        _spawn(n, sock, args)
+
+    while _children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        n = _children.pop(pid, None)
+        if n is not None and not _stopping:
+            print(f"worker {n} (pid {pid}) exited with status {status}; restarting", file=sys.stderr, flush=True)
+            time.sleep(0.5)  # don't spin if workers crash on start
+            _spawn(n, sock, args)
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
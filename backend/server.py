@@ -1,33 +1,173 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-import json, os
+import hmac, json, os, threading, time
 from datetime import datetime
+import numpy as np
 
 try:
-    from backend.nlu import parse_intent
-    from backend.vector_search import build_index, search as vec_search
-    from backend.geo import haversine_miles, geo_score_miles, ZIP_TO_LATLON
-    from backend.ranking import final_score
+    from backend import metrics
+    from backend.cache import LRUCache
+    from backend.corpus import Corpus
+    from backend.geo import ZIP_TO_LATLON
+    from backend.ingest import iter_records, peak_rss_mb
+    from backend.pipeline import SearchPipeline, SearchRequest, Snapshot, InvalidCursor
+    from backend.ranking import set_scorer
+    from backend.vector_search import build_index, load_model, set_search_params, warm_query_cache, query_cache_stats, enable_batching, batching_stats, current_state, publish_state
 except ImportError:
-    from nlu import parse_intent
-    from vector_search import build_index, search as vec_search
-    from geo import haversine_miles, geo_score_miles, ZIP_TO_LATLON
-    from ranking import final_score
+    import metrics
+    from cache import LRUCache
+    from corpus import Corpus
+    from geo import ZIP_TO_LATLON
+    from ingest import iter_records, peak_rss_mb
+    from pipeline import SearchPipeline, SearchRequest, Snapshot, InvalidCursor
+    from ranking import set_scorer
+    from vector_search import build_index, load_model, set_search_params, warm_query_cache, query_cache_stats, enable_batching, batching_stats, current_state, publish_state
 
 app = Flask(__name__)
 CORS(app)
 
 DATA = {"nonprofits": []}
 NP_BY_ID = {}
+CORPUS = Corpus([])
+# (corpus, vectors) searches run against; swapped in one assignment on updates.
+# None until the first index build, then searches pair CORPUS with the
+# published vector state.
+SNAPSHOT = None
+_UPDATE_LOCK = threading.Lock()
+
+# Startup progress for /ready. "idle" until init_search() runs (e.g. when the
+# app is driven by tests), then "loading", "ready" or "failed"; stages holds
+# the load time of each finished step in ms.
+READINESS = {"state": "idle", "stages": {}, "error": None}
+WARMUP_RETRY_AFTER = 2  # seconds
+
+# Query vectors precomputed at startup ("nonprofit" is the empty-query fallback)
+FREQUENT_QUERIES = [
+    "nonprofit", "housing", "affordable housing", "homeless shelter", "veterans",
+    "mental health", "education", "youth", "families", "legal aid",
+]
 
 def _data_path():
-    return os.path.join(os.path.dirname(__file__), "data", "nonprofits.json")
+    # NONPROFITS_PATH may point at a .json or a .jsonl (one record per line) file
+    return os.environ.get("NONPROFITS_PATH") or os.path.join(os.path.dirname(__file__), "data", "nonprofits.json")
+
+def _index_cache_dir():
+    # Versioned embedding/FAISS artifact lives next to the corpus it was built from
+    return os.path.join(os.path.dirname(_data_path()), "index_cache")
 
 def load_data():
-    global DATA, NP_BY_ID
-    with open(_data_path(), "r", encoding="utf-8") as f:
-        DATA = json.load(f)
-    NP_BY_ID = {n["id"]: n for n in DATA.get("nonprofits", [])}
+    global DATA, NP_BY_ID, CORPUS
+    # Streamed record by record into the compact store: neither the raw file
+    # text nor a list of parsed dicts is ever held in memory
+    meta = {}
+    CORPUS = Corpus(iter_records(_data_path(), meta=meta))
+    # Lazy views over CORPUS.items; rows line up with build_index()
+    DATA = {**meta, "nonprofits": CORPUS.live_items()}
+    NP_BY_ID = CORPUS.by_id
+    _publish(None)  # vectors must be rebuilt for the new rows
+
+def current_snapshot():
+    return SNAPSHOT or Snapshot(CORPUS, current_state())
+
+def _publish(snap):
+    global SNAPSHOT, DATA, NP_BY_ID, CORPUS
+    if snap is not None:
+        DATA = {**DATA, "nonprofits": snap.corpus.live_items()}
+        NP_BY_ID = snap.corpus.by_id
+        CORPUS = snap.corpus
+        if snap.vectors is not None:
+            publish_state(snap.vectors)
+    SNAPSHOT = snap
+    # Keys carry the corpus/index versions, so nothing stale can be served;
+    # clearing just frees the old rankings right away.
+    RESULT_CACHE.clear()
+
+class IndexLoading(RuntimeError):
+    """Raised by apply_changes() while init_search() is building the index."""
+
+
+def apply_changes(upserts=(), deletes=()):
+    """
+    Applies upserts (nonprofit dicts) and deletes (ids) without a restart:
+    only changed records are re-embedded and the FAISS index is patched in
+    place of a rebuild. The new snapshot is published atomically; searches
+    already running finish on the old one.
+    Raises IndexLoading during warm-up: the index is built from the rows
+    load_data() read, so a change made meanwhile would be missing from it.
+    """
+    with _UPDATE_LOCK:
+        return _apply_changes(upserts, deletes)
+
+def _require_index():
+    if READINESS["state"] == "loading":
+        raise IndexLoading("search index is still loading; retry once /ready answers 200")
+
+def _apply_changes(upserts, deletes):
+    # Caller holds _UPDATE_LOCK
+    _require_index()
+    snap = current_snapshot()
+    corpus, changes = snap.corpus.with_changes(upserts, deletes)
+    vectors = snap.vectors.with_changes(changes) if snap.vectors is not None else None
+    _publish(Snapshot(corpus, vectors))
+    return {"upserted": sum(1 for it in changes.values() if it is not None),
+            "deleted": sum(1 for it in changes.values() if it is None)}
+
+def reload_data():
+    """
+    Re-reads the data file and applies the difference to the live snapshot.
+    The diff is taken under the update lock, so an admin change cannot land
+    between computing it and applying it.
+    """
+    with _UPDATE_LOCK:
+        _require_index()
+        live = current_snapshot().corpus.by_id
+        seen = set()
+        upserts = []
+        for it in iter_records(_data_path()):
+            seen.add(it["id"])
+            if it["id"] not in live or json.dumps(it, sort_keys=True) != json.dumps(live[it["id"]], sort_keys=True):
+                upserts.append(it)
+        deletes = [cid for cid in live if cid not in seen]
+        if not upserts and not deletes:
+            return {"upserted": 0, "deleted": 0}
+        return _apply_changes(upserts, deletes)
+
+def watch_data_file(interval):
+    """Polls the data file's mtime and hot-reloads it when it changes; set the returned event to stop."""
+    stop = threading.Event()
+    last = os.stat(_data_path()).st_mtime
+
+    def run():
+        nonlocal last
+        while not stop.wait(interval):
+            try:
+                mtime = os.stat(_data_path()).st_mtime
+                if mtime != last:
+                    print(f"Data file changed, reloaded: {reload_data()}")
+                    last = mtime
+            except (OSError, ValueError, IndexLoading) as e:  # half-written file or warming up: retry next tick
+                print(f"Data reload failed: {e}")
+    threading.Thread(target=run, name="data-watch", daemon=True).start()
+    return stop
+
+def _admin_allowed():
+    # ADMIN_TOKEN set: require it in X-Admin-Token. Unset: refused, unless
+    # ADMIN_ALLOW_LOCALHOST=1 opts in to localhost callers (not behind a
+    # same-host reverse proxy, where every request comes from localhost).
+    token = os.environ.get("ADMIN_TOKEN")
+    if token:
+        return hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token)
+    return os.environ.get("ADMIN_ALLOW_LOCALHOST") == "1" and request.remote_addr in ("127.0.0.1", "::1")
+
+# Max searches per POST /api/search/batch
+SEARCH_BATCH_LIMIT = int(os.environ.get("SEARCH_BATCH_LIMIT", 100))
+
+# Full ranked lists by normalized intent; every page of a search is a slice
+RESULT_CACHE = LRUCache(maxsize=int(os.environ.get("RESULT_CACHE_SIZE", 2048)),
+                        ttl=float(os.environ.get("RESULT_CACHE_TTL", 300)))
+
+# The search endpoints are thin adapters over this pipeline
+PIPELINE = SearchPipeline(current_snapshot, result_cache=RESULT_CACHE)
 
 @app.route("/")
 def root():
@@ -35,23 +175,87 @@ def root():
         "message": "Business Search API",
         "endpoints": [
             "/health",
+            "/ready",
+            "/metrics",
+            "/api/stats",
             "/api/businesses",
             "POST /api/search",
-            "/search?q=...&zip=...&radius=...&cause=housing"
+            "POST /api/search/batch",
+            "/search?q=...&zip=...&radius=...&cause=housing",
+            "POST /admin/nonprofits",
+            "DELETE /admin/nonprofits/<id>",
+            "POST /admin/reload"
         ]
     })
 
+@app.before_request
+def _start_timer():
+    g.t0 = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    t0 = g.get("t0")
+    if t0 is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - t0, endpoint)
+        metrics.REQUESTS.inc(1, endpoint, response.status_code)
+    return response
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+def search_payload(ctx, debug_timing=False):
+    """Response body of a search; debug_timing adds its stage breakdown (ms) and candidate counts."""
+    payload = ctx.response()
+    if debug_timing:
+        payload["timings"] = {name: round(ms, 3) for name, ms in ctx.timings.items()}
+        payload["candidates"] = dict(ctx.candidates)
+    return payload
+
+def _search_json(ctx):
+    payload = search_payload(ctx, request.args.get("debug_timing") == "1")
+    with metrics.timed("serialize"):
+        return jsonify(payload)
+
 @app.route("/health")
 def health():
+    # Liveness only: answers as soon as the process serves requests
     return jsonify({
         "status": "ok",
         "count": len(DATA.get("nonprofits", [])),
         "ts": datetime.utcnow().isoformat()
     })
 
+@app.route("/ready")
+def ready():
+    body, ok = readiness()
+    if ok:
+        return jsonify(body)
+    return jsonify(body), 503, {"Retry-After": str(WARMUP_RETRY_AFTER)}
+
+def readiness():
+    """(/ready body, whether the full search stack is loaded)."""
+    ok = READINESS["state"] in ("idle", "ready") and current_snapshot().vectors is not None
+    return {"ready": ok, "state": READINESS["state"], "stages": dict(READINESS["stages"]),
+            "error": READINESS["error"], "gazetteer": ZIP_TO_LATLON.stats()}, ok
+
+def warming_up():
+    # No corpus yet, not even lexical search can answer
+    return READINESS["state"] in ("loading", "failed") and "data" not in READINESS["stages"]
+
+def _warming_up_response(message="Search is warming up, retry shortly"):
+    return (jsonify({"success": False, "message": message}), 503,
+            {"Retry-After": str(WARMUP_RETRY_AFTER)})
+
+@app.route("/api/stats")
+def stats():
+    return jsonify({"query_cache": query_cache_stats(), "result_cache": RESULT_CACHE.stats(),
+                    "batching": batching_stats(), "gazetteer": ZIP_TO_LATLON.stats()})
+
 @app.route("/api/businesses")
 def all_orgs():
-    return jsonify({"success": True, "nonprofits": DATA.get("nonprofits", [])})
+    return jsonify({"success": True, "nonprofits": list(DATA.get("nonprofits", []))})
 
 @app.route("/api/businesses/<org_id>")
 def org_detail(org_id):
@@ -60,300 +264,200 @@ def org_detail(org_id):
         return jsonify({"success": False, "message": "Not found"}), 404
     return jsonify({"success": True, "nonprofit": it})
 
-def _apply_filters(candidate_ids, filters):
-    if not filters:
-        return candidate_ids
-    causes = set((filters.get("cause") or []) + (filters.get("causes") or []))
-    min_rating = filters.get("min_rating")
-    out = []
-    for cid in candidate_ids:
-        it = NP_BY_ID[cid]
-        ok = True
-        if causes:
-            if not (set(it.get("causes", [])) & set(causes)):
-                ok = False
-        if ok and min_rating:
-            if (it.get("ratings", {}).get("avg_rating", 0) < float(min_rating)):
-                ok = False
-        if ok:
-            out.append(cid)
-    return out
-
 @app.route("/api/search", methods=["POST"])
 def search_api():
     """
     Request JSON:
     {
       "query": "affordable housing near 94103 for families",
-      "location": {"zip":"94103", "radius_miles": 10},
+      "location": {"zip":"94103", "radius_miles": 10, "mode": "union|intersect"},
       "filters": {"cause":["housing","families"], "min_rating":4},
       "sort": "relevance|distance|impact|popularity|newest|rating",
+      "retrieval": "hybrid|semantic|lexical",
       "top_k": 100,
       "page": 1,
-      "limit": 10
+      "limit": 10,
+      "cursor": null
     }
+    location.mode "union" (default) adds the orgs nearest the ZIP, up to
+    top_k, to the vector/BM25 hits; "intersect" only cuts those hits to the
+    radius.
+    Page 1 responses (and cursor responses) carry "next_cursor"; send it
+    back as "cursor" for the next page instead of bumping "page".
+    ?debug_timing=1 adds "timings" (ms per stage) and "candidates" (count
+    left after retrieve/geo/filter) to the response.
+    Until the vector index is loaded, results are lexical only
+    ("retrieval": "lexical"); before the data is loaded, 503 + Retry-After.
     """
+    if warming_up():
+        return _warming_up_response()
     body = request.get_json(force=True, silent=True) or {}
-    q = (body.get("query") or "").strip()
-    sort = (body.get("sort") or "relevance").lower()
-    page = max(1, int(body.get("page") or 1))
-    limit = max(1, min(50, int(body.get("limit") or 10)))
-    top_k = max(limit, int(body.get("top_k") or 100))
-    explicit_loc = body.get("location") or {}
-    filters = body.get("filters") or {}
-
-    # 1) Intent parse (merge with explicit payload)
-    intent = parse_intent(q)
-    loc_zip = explicit_loc.get("zip") or (intent.get("location") or {}).get("zip")
-    radius = explicit_loc.get("radius_miles") or (intent.get("location") or {}).get("radius_miles") or 25
-    # If causes explicitly passed, keep them; else use NLU
-    if "cause" in filters or "causes" in filters:
-        pass
-    elif intent.get("causes"):
-        filters["cause"] = intent["causes"]
-
-    # 2) Semantic retrieval
-    vec_hits = vec_search(q or "nonprofit")
-    # vec_hits: [{"id": "...", "semantic_score": 0.83}, ...]
-
-    # 3) Geospatial filter + score
-    user_latlon = ZIP_TO_LATLON.get(str(loc_zip)) if loc_zip else None
-
-    enriched = []
-    for h in vec_hits:
-        it = NP_BY_ID[h["id"]]
-        # Pre-filter by causes/min_rating
-        # (We'll also apply again after candidate selection to be safe)
-        semantic = max(0.0, min(1.0, h["semantic_score"]))  # cosine in [0,1]
-        # distance
-        if user_latlon:
-            d_miles = haversine_miles(user_latlon[0], user_latlon[1],
-                                      it["location"]["lat"], it["location"]["lon"])
-            gscore = geo_score_miles(d_miles, radius)
+    try:
+        ctx = PIPELINE.run(SearchRequest.from_json(body))
+    except InvalidCursor as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return _search_json(ctx)
+
+@app.route("/api/search/batch", methods=["POST"])
+def search_batch_api():
+    """
+    Request JSON: {"searches": [<POST /api/search body>, ...]} (or the bare
+    list), at most SEARCH_BATCH_LIMIT entries.
+    Response: {"success": true, "results": [...]} with one POST /api/search
+    response per entry, in order; an entry that fails gets
+    {"success": false, "message": ...} without failing the others.
+    """
+    if warming_up():
+        return _warming_up_response()
+    body = request.get_json(force=True, silent=True)
+    searches = body.get("searches") if isinstance(body, dict) else body
+    if not isinstance(searches, list):
+        return jsonify({"success": False, "message": "expected a list of searches"}), 400
+    if len(searches) > SEARCH_BATCH_LIMIT:
+        return jsonify({"success": False, "message": f"at most {SEARCH_BATCH_LIMIT} searches per batch"}), 400
+    reqs, results = [], [None] * len(searches)
+    for i, item in enumerate(searches):
+        try:
+            reqs.append((i, SearchRequest.from_json(item)))
+        except (AttributeError, TypeError, ValueError) as e:
+            results[i] = {"success": False, "message": f"invalid search: {e}"}
+    ctxs = PIPELINE.run_batch([req for _, req in reqs])
+    debug_timing = request.args.get("debug_timing") == "1"
+    for (i, _), ctx in zip(reqs, ctxs):
+        if isinstance(ctx, Exception):
+            results[i] = {"success": False, "message": f"search failed: {ctx}"}
         else:
-            d_miles = None
-            gscore = 0.0
-        trust = 1.0 if it.get("trust", {}).get("verification_status") else 0.0
-        popularity = float(it.get("popularity_90d", 0.0))
-
-        enriched.append({
-            "id": it["id"],
-            "semantic": semantic,
-            "distance_miles": d_miles,
-            "geo_score": gscore,
-            "trust": trust,
-            "popularity": popularity,
-            "item": it
-        })
-
-    # If user provided a location + radius, keep only within radius
-    if user_latlon:
-        enriched = [e for e in enriched if e["distance_miles"] is not None and e["distance_miles"] <= radius]
-
-    # 4) Filters (cause, rating…)
-    candidate_ids = [e["id"] for e in enriched]
-    candidate_ids = _apply_filters(candidate_ids, filters)
-    enriched = [e for e in enriched if e["id"] in candidate_ids]
-
-    # 5) Compute final score
-    for e in enriched:
-        e["final_score"] = final_score(e["semantic"], e["geo_score"], e["trust"], e["popularity"])
-
-    # 6) Sorting
-    if sort == "distance" and user_latlon:
-        enriched.sort(key=lambda x: (x["distance_miles"] if x["distance_miles"] is not None else 1e9))
-    elif sort == "rating":
-        enriched.sort(key=lambda x: x["item"]["ratings"]["avg_rating"], reverse=True)
-    elif sort == "popularity":
-        enriched.sort(key=lambda x: x["popularity"], reverse=True)
-    elif sort == "newest":
-        enriched.sort(key=lambda x: x["item"]["created_at"], reverse=True)
-    elif sort == "impact":
-        # simple proxy: invert cost_per_* if exists (lower cost → higher impact)
-        def impact_score(it):
-            im = it["item"].get("impact_metrics", {})
-            for k in ["cost_per_family", "cost_per_session"]:
-                if k in im and im[k] > 0:
-                    return 1.0 / float(im[k])
-            return 0.0
-        enriched.sort(key=lambda x: impact_score(x), reverse=True)
-    else:
-        # relevance
-        enriched.sort(key=lambda x: x["final_score"], reverse=True)
-
-    total = len(enriched)
-    start, end = (page - 1) * limit, (page - 1) * limit + limit
-    page_items = enriched[start:end]
-
-    # 7) Build explain lines
-    results = []
-    for e in page_items:
-        it = e["item"]
-        why = []
-        if filters.get("cause"):
-            why.append(f"matches: {', '.join(filters['cause'])}")
-        elif intent.get("causes"):
-            why.append(f"matches: {', '.join(intent['causes'])}")
-        if e["distance_miles"] is not None:
-            why.append(f"{e['distance_miles']:.1f} mi away")
-        if e["trust"] >= 1.0:
-            why.append("verified")
-        results.append({
-            **it,
-            "_scores": {
-                "semantic": round(e["semantic"], 3),
-                "geo": round(e["geo_score"], 3),
-                "final": round(e["final_score"], 3)
-            },
-            "_explain": " • ".join(why) if why else "relevant to your search"
-        })
-
-    return jsonify({
-        "success": True,
-        "query": q,
-        "intent": intent,
-        "sort": sort,
-        "page": page,
-        "limit": limit,
-        "total_found": total,
-        "results": results
-    })
+            results[i] = search_payload(ctx, debug_timing)
+    with metrics.timed("serialize"):
+        return jsonify({"success": True, "results": results})
 
 # Optional: GET /search passthrough for convenience
 @app.route("/search")
 def search_get():
-    q = request.args.get("query", request.args.get("q", ""))
-    zip_code = request.args.get("zip")
-    radius = request.args.get("radius", type=int)
-    cause = request.args.getlist("cause")  # ?cause=housing&cause=families
-    
-    # Call the search logic directly
-    sort = (request.args.get("sort") or "relevance").lower()
-    page = max(1, int(request.args.get("page") or 1))
-    limit = max(1, min(50, int(request.args.get("limit") or 10)))
-    top_k = max(limit, int(request.args.get("top_k") or 100))
-    explicit_loc = {"zip": zip_code, "radius_miles": radius} if zip_code or radius else {}
-    filters = {"cause": cause} if cause else {}
-
-    # 1) Intent parse (merge with explicit payload)
-    intent = parse_intent(q)
-    loc_zip = explicit_loc.get("zip") or (intent.get("location") or {}).get("zip")
-    radius = explicit_loc.get("radius_miles") or (intent.get("location") or {}).get("radius_miles") or 25
-    # If causes explicitly passed, keep them; else use NLU
-    if "cause" in filters or "causes" in filters:
-        pass
-    elif intent.get("causes"):
-        filters["cause"] = intent["causes"]
-
-    # 2) Semantic retrieval
-    vec_hits = vec_search(q or "nonprofit")
-    # vec_hits: [{"id": "...", "semantic_score": 0.83}, ...]
-
-    # 3) Geospatial filter + score
-    user_latlon = ZIP_TO_LATLON.get(str(loc_zip)) if loc_zip else None
-
-    enriched = []
-    for h in vec_hits:
-        it = NP_BY_ID[h["id"]]
-        # Pre-filter by causes/min_rating
-        # (We'll also apply again after candidate selection to be safe)
-        semantic = max(0.0, min(1.0, h["semantic_score"]))  # cosine in [0,1]
-        # distance
-        if user_latlon:
-            d_miles = haversine_miles(user_latlon[0], user_latlon[1],
-                                      it["location"]["lat"], it["location"]["lon"])
-            gscore = geo_score_miles(d_miles, radius)
-        else:
-            d_miles = None
-            gscore = 0.0
-        trust = 1.0 if it.get("trust", {}).get("verification_status") else 0.0
-        popularity = float(it.get("popularity_90d", 0.0))
-
-        enriched.append({
-            "id": it["id"],
-            "semantic": semantic,
-            "distance_miles": d_miles,
-            "geo_score": gscore,
-            "trust": trust,
-            "popularity": popularity,
-            "item": it
-        })
-
-    # If user provided a location + radius, keep only within radius
-    if user_latlon:
-        enriched = [e for e in enriched if e["distance_miles"] is not None and e["distance_miles"] <= radius]
-
-    # 4) Filters (cause, rating…)
-    candidate_ids = [e["id"] for e in enriched]
-    candidate_ids = _apply_filters(candidate_ids, filters)
-    enriched = [e for e in enriched if e["id"] in candidate_ids]
-
-    # 5) Compute final score
-    for e in enriched:
-        e["final_score"] = final_score(e["semantic"], e["geo_score"], e["trust"], e["popularity"])
-
-    # 6) Sorting
-    if sort == "distance" and user_latlon:
-        enriched.sort(key=lambda x: (x["distance_miles"] if x["distance_miles"] is not None else 1e9))
-    elif sort == "rating":
-        enriched.sort(key=lambda x: x["item"]["ratings"]["avg_rating"], reverse=True)
-    elif sort == "popularity":
-        enriched.sort(key=lambda x: x["popularity"], reverse=True)
-    elif sort == "newest":
-        enriched.sort(key=lambda x: x["item"]["created_at"], reverse=True)
-    elif sort == "impact":
-        # simple proxy: invert cost_per_* if exists (lower cost → higher impact)
-        def impact_score(it):
-            im = it["item"].get("impact_metrics", {})
-            for k in ["cost_per_family", "cost_per_session"]:
-                if k in im and im[k] > 0:
-                    return 1.0 / float(im[k])
-            return 0.0
-        enriched.sort(key=lambda x: impact_score(x), reverse=True)
-    else:
-        # relevance
-        enriched.sort(key=lambda x: x["final_score"], reverse=True)
-
-    total = len(enriched)
-    start, end = (page - 1) * limit, (page - 1) * limit + limit
-    page_items = enriched[start:end]
-
-    # 7) Build explain lines
-    results = []
-    for e in page_items:
-        it = e["item"]
-        why = []
-        if filters.get("cause"):
-            why.append(f"matches: {', '.join(filters['cause'])}")
-        elif intent.get("causes"):
-            why.append(f"matches: {', '.join(intent['causes'])}")
-        if e["distance_miles"] is not None:
-            why.append(f"{e['distance_miles']:.1f} mi away")
-        if e["trust"] >= 1.0:
-            why.append("verified")
-        results.append({
-            **it,
-            "_scores": {
-                "semantic": round(e["semantic"], 3),
-                "geo": round(e["geo_score"], 3),
-                "final": round(e["final_score"], 3)
-            },
-            "_explain": " • ".join(why) if why else "relevant to your search"
-        })
+    if warming_up():
+        return _warming_up_response()
+    try:
+        ctx = PIPELINE.run(SearchRequest.from_args(request.args))
+    except InvalidCursor as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return _search_json(ctx)
+
+@app.route("/admin/nonprofits", methods=["POST"])
+def admin_update():
+    """
+    Request JSON: {"upsert": [<nonprofit>, ...], "delete": ["<id>", ...]}
+    Changes are applied in memory; the data file is not rewritten.
+    """
+    if not _admin_allowed():
+        return jsonify({"success": False, "message": "Forbidden"}), 403
+    body = request.get_json(force=True, silent=True) or {}
+    upserts = body.get("upsert") or []
+    deletes = body.get("delete") or []
+    if not all(isinstance(it, dict) and isinstance(it.get("id"), str) for it in upserts) \
+            or not all(isinstance(cid, str) for cid in deletes):
+        return jsonify({"success": False, "message": "upsert must be objects with a string id, delete a list of ids"}), 400
+    try:
+        return jsonify({"success": True, **apply_changes(upserts, deletes)})
+    except IndexLoading as e:
+        return _warming_up_response(str(e))
+
+@app.route("/admin/nonprofits/<org_id>", methods=["DELETE"])
+def admin_delete(org_id):
+    if not _admin_allowed():
+        return jsonify({"success": False, "message": "Forbidden"}), 403
+    if org_id not in NP_BY_ID:
+        return jsonify({"success": False, "message": "Not found"}), 404
+    try:
+        return jsonify({"success": True, **apply_changes(deletes=[org_id])})
+    except IndexLoading as e:
+        return _warming_up_response(str(e))
+
+@app.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    if not _admin_allowed():
+        return jsonify({"success": False, "message": "Forbidden"}), 403
+    try:
+        return jsonify({"success": True, **reload_data()})
+    except IndexLoading as e:
+        return _warming_up_response(str(e))
+
+def init_search(shared=False):
+    """
+    Everything a serving process needs before it takes traffic: data, the
+    vector index (from the on-disk artifact when it is current) and the
+    query-vector cache. shared=True makes sure the index and embeddings end
+    up memory-mapped from the artifact (the index only for the IVF types,
+    which faiss can map), so forked workers share those pages.
+    """
+    READINESS.update(state="loading", stages={}, error=None)
+    try:
+        _timed_stage("data", load_data)  # from here on, lexical search works
+        # SEARCH_INDEX_TYPE: flat (default) | ivf_flat | ivf_pq | hnsw | sq8 | pq
+        set_search_params(nprobe=os.environ.get("SEARCH_NPROBE"), ef_search=os.environ.get("SEARCH_EF_SEARCH"),
+                          rerank=os.environ.get("SEARCH_RERANK"))
+        # RANKING_MODEL: JSON model file (see ranking.py); RANKING_SCORER: registered scorer name
+        if os.environ.get("RANKING_SCORER") or os.environ.get("RANKING_MODEL"):
+            set_scorer(os.environ.get("RANKING_SCORER"), os.environ.get("RANKING_MODEL"))
+        _timed_stage("model", load_model)
+        # Admin updates are refused until "ready" (see apply_changes), so
+        # CORPUS still holds exactly the rows the vectors are built from
+        vectors = _timed_stage("index", _load_vectors, shared)
+        with _UPDATE_LOCK:
+            _publish(Snapshot(CORPUS, vectors))
+        _timed_stage("query_cache", warm_query_cache, FREQUENT_QUERIES)
+    except Exception as e:
+        READINESS.update(state="failed", error=f"{type(e).__name__}: {e}")
+        raise
+    READINESS["state"] = "ready"
+
+def _timed_stage(name, fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    READINESS["stages"][name] = round((time.perf_counter() - t0) * 1000.0, 1)
+    return out
 
-    return jsonify({
-        "success": True,
-        "query": q,
-        "intent": intent,
-        "sort": sort,
-        "page": page,
-        "limit": limit,
-        "total_found": total,
-        "results": results
-    })
+def _load_vectors(shared):
+    index_type = os.environ.get("SEARCH_INDEX_TYPE", "flat")
+    # SEARCH_ENCODE_WORKERS: processes for a (re)build's corpus encoding, 0 = one per CPU
+    vectors = build_index(DATA.get("nonprofits", []), cache_dir=_index_cache_dir(), index_type=index_type,
+                          workers=os.environ.get("SEARCH_ENCODE_WORKERS", 1))
+    if shared and not isinstance(vectors.embeddings, np.memmap):
+        # Freshly built: re-open what was just written, file-backed this time
+        vectors = build_index(DATA.get("nonprofits", []), cache_dir=_index_cache_dir(), index_type=index_type)
+    return vectors
+
+def start_warmup():
+    """
+    Runs init_search() on a background thread so the server accepts traffic
+    right away: /health answers at once, searches get 503 until the data is
+    loaded, then lexical results until the index is, and /ready turns 200
+    when everything is loaded.
+    """
+    def run():
+        try:
+            init_search()
+        except Exception as e:
+            print(f"Search warm-up failed: {type(e).__name__}: {e}")
+            return
+        print(f"Search ready: {len(DATA.get('nonprofits', []))} nonprofits, stages {READINESS['stages']} ms "
+              f"(peak RSS {peak_rss_mb():.0f} MiB).")
+    thread = threading.Thread(target=run, name="search-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def start_background():
+    """Per-process threads; started after fork in serve.py since threads do not survive it."""
+    if os.environ.get("SEARCH_BATCH_WINDOW_MS"):
+        # Micro-batch concurrent query encodes (only useful with a threaded server)
+        enable_batching(window_ms=float(os.environ["SEARCH_BATCH_WINDOW_MS"]),
+                        max_batch=int(os.environ.get("SEARCH_BATCH_MAX", 32)))
+    if os.environ.get("DATA_WATCH_INTERVAL"):
+        watch_data_file(float(os.environ["DATA_WATCH_INTERVAL"]))
 
 if __name__ == "__main__":
-    load_data()
-    build_index(DATA.get("nonprofits", []))
-    print(f"Loaded {len(DATA.get('nonprofits', []))} nonprofits; FAISS index ready.")
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # Development server. For production use serve.py (pre-forked workers
+    # sharing one loaded index).
+    start_warmup()
+    start_background()
+    print("Serving; the data, model and index load in the background (see /ready).")
+    app.run(host="0.0.0.0", port=5000, debug=os.environ.get("FLASK_DEBUG") == "1")
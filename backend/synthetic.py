@@ -0,0 +1,218 @@
+"""
+Synthetic nonprofits in the nonprofits.json schema, for benchmarks and load
+tests at sizes the sample data cannot reach.
+
+Records are generated one at a time from a seeded RNG, so the same
+(n, seed) always gives the same corpus and 1M records stream to disk in
+constant memory. Causes, text and impact metrics are drawn per cause from
+the vocabulary the intent parser and BM25 index see in real data;
+locations cluster around weighted metro centers (including every seed ZIP
+in geo.py, so location queries resolve without the full gazetteer).
+
+Usage:
+  python synthetic.py --n 100000 --out data/synthetic_100k.jsonl
+  python synthetic.py --n 1000 --out data/synthetic_1k.json     # JSON, same layout as nonprofits.json
+"""
+import argparse
+import datetime
+import json
+import random
+
+# name, state, zip, lat, lon, weight (roughly metro size)
+METROS = (
+    ("San Francisco", "CA", "94103", 37.7763, -122.4167, 5),
+    ("Oakland", "CA", "94612", 37.8044, -122.2712, 3),
+    ("San Jose", "CA", "95113", 37.3348, -121.8906, 4),
+    ("San Rafael", "CA", "94901", 37.9735, -122.5311, 1),
+    ("Phoenix", "AZ", "85004", 33.4510, -112.0730, 5),
+    ("Atlanta", "GA", "30303", 33.7537, -84.3884, 6),
+    ("Los Angeles", "CA", "90012", 34.0614, -118.2385, 12),
+    ("New York", "NY", "10007", 40.7134, -74.0072, 18),
+    ("Chicago", "IL", "60602", 41.8830, -87.6290, 9),
+    ("Houston", "TX", "77002", 29.7594, -95.3594, 7),
+    ("Dallas", "TX", "75201", 32.7876, -96.7994, 7),
+    ("Seattle", "WA", "98104", 47.6022, -122.3262, 4),
+    ("Denver", "CO", "80202", 39.7528, -104.9997, 3),
+    ("Boston", "MA", "02108", 42.3576, -71.0636, 5),
+    ("Miami", "FL", "33130", 25.7671, -80.2044, 6),
+    ("Minneapolis", "MN", "55401", 44.9847, -93.2702, 3),
+    ("Philadelphia", "PA", "19107", 39.9517, -75.1588, 6),
+    ("Detroit", "MI", "48226", 42.3314, -83.0479, 4),
+    ("Portland", "OR", "97204", 45.5186, -122.6764, 2),
+    ("Washington", "DC", "20001", 38.9109, -77.0179, 6),
+)
+
+CAUSES = ("housing", "families", "anti-homelessness", "mental health", "veterans", "education", "youth", "legal")
+# Causes that tend to co-occur with each primary cause
+RELATED = {
+    "housing": ("families", "anti-homelessness", "legal"),
+    "families": ("housing", "youth", "education"),
+    "anti-homelessness": ("housing", "mental health"),
+    "mental health": ("veterans", "youth", "families"),
+    "veterans": ("mental health", "housing"),
+    "education": ("youth", "families"),
+    "youth": ("education", "mental health"),
+    "legal": ("housing", "families", "veterans"),
+}
+
+# cause -> (name words, mission phrases, description phrases, tags, impact metric generators)
+VOCAB = {
+    "housing": (
+        ("Housing", "Homes", "Shelter Alliance", "Housing Trust"),
+        ("Affordable housing and rental assistance for low-income families",
+         "Preserving and building affordable homes for working households",
+         "Emergency rent support that keeps tenants housed"),
+        ("Provides subsidies, landlord partnerships and move-in support.",
+         "Builds and manages permanently affordable units."),
+        ("shelter", "rent assistance", "affordable units", "landlords"),
+        {"families_housed": (20, 900), "units_preserved": (10, 600), "cost_per_family": (900, 4000)},
+    ),
+    "families": (
+        ("Family Center", "Families First", "Family Network"),
+        ("Wraparound services for families in crisis",
+         "Childcare, parenting classes and food support for young families"),
+        ("Case managers connect parents with childcare, benefits and jobs.",),
+        ("childcare", "parenting", "food"),
+        {"families_served": (50, 3000), "children_supported": (40, 4000)},
+    ),
+    "anti-homelessness": (
+        ("Outreach", "Street Team", "Open Door"),
+        ("Street outreach, meals and a path out of homelessness",
+         "Ending homelessness one neighbor at a time"),
+        ("Runs outreach vans, day centers and navigation to permanent housing.",),
+        ("outreach", "meals", "navigation"),
+        {"people_served": (100, 8000), "warm_meals": (1000, 60000)},
+    ),
+    "mental health": (
+        ("Counseling Collective", "Mind Matters", "Wellness Center"),
+        ("Free and sliding-scale counseling and therapy",
+         "Crisis support and long-term mental health care"),
+        ("Licensed therapists offer individual and group sessions.",),
+        ("counseling", "therapy", "crisis line"),
+        {"sessions_delivered": (200, 20000), "cost_per_session": (20, 120)},
+    ),
+    "veterans": (
+        ("Veterans Alliance", "Vets Forward", "Service Members Fund"),
+        ("Support for veterans transitioning to civilian life",
+         "PTSD care, housing and jobs for veterans and their families"),
+        ("Peer mentors help veterans with benefits, jobs and PTSD care.",),
+        ("PTSD", "benefits", "employment"),
+        {"veterans_served": (50, 3000), "cost_per_session": (30, 90)},
+    ),
+    "education": (
+        ("Learning Lab", "Scholars Fund", "Education Project"),
+        ("Tutoring and STEM programs for under-served students",
+         "Closing the opportunity gap through after-school learning"),
+        ("Volunteers tutor students and run STEM clubs in public schools.",),
+        ("STEM", "tutoring", "after-school"),
+        {"students_served": (100, 6000), "graduation_rate_lift": (0.01, 0.15)},
+    ),
+    "youth": (
+        ("Youth Alliance", "Teen Center", "Young Leaders"),
+        ("Safe spaces, mentoring and jobs for teenagers",
+         "Youth development through sports, arts and mentoring"),
+        ("Mentors and coaches run programs for teens after school.",),
+        ("mentoring", "sports", "teen jobs"),
+        {"youth_served": (50, 5000), "mentors_matched": (10, 900)},
+    ),
+    "legal": (
+        ("Legal Aid", "Justice Center", "Tenant Law Project"),
+        ("Free legal help for tenants facing eviction",
+         "Legal aid for immigrants, veterans and low-income households"),
+        ("Staff attorneys and volunteers provide representation and clinics.",),
+        ("eviction", "tenants", "legal clinic"),
+        {"evictions_prevented": (20, 1500), "success_rate": (0.5, 0.95)},
+    ),
+}
+
+STREETS = ("Main St", "Market St", "Oak Ave", "Broadway", "Elm St", "Park Ave", "Washington Blvd", "Lake St")
+FIRST_DAY = datetime.date(2010, 1, 1)
+LAST_DAY = datetime.date(2025, 7, 31)
+
+
+def _metric(rng, lo, hi):
+    if isinstance(lo, float):
+        return round(rng.uniform(lo, hi), 2)
+    return rng.randint(lo, hi)
+
+
+def make_record(i, rng):
+    """The i-th synthetic nonprofit, drawn from rng."""
+    city, state, zip_code, lat, lon, _ = rng.choices(METROS, weights=[m[5] for m in METROS])[0]
+    primary = rng.choice(CAUSES)
+    causes = [primary] + rng.sample(RELATED[primary], rng.randint(0, 2))
+    names, missions, descriptions, tags, impact = VOCAB[primary]
+    ein = f"{rng.randint(10, 99)}-{rng.randint(1000000, 9999999)}"
+    metrics = rng.sample(sorted(impact), min(2, len(impact)))
+    days = (LAST_DAY - FIRST_DAY).days
+    return {
+        "id": f"syn_{i:07d}",
+        "ein": ein,
+        "name": f"{city} {rng.choice(names)} {i}",
+        "mission_text": f"{rng.choice(missions)} in {city}.",
+        "description": " ".join(rng.sample(descriptions, 1) + [rng.choice(VOCAB[c][2]) for c in causes[1:]]),
+        "causes": causes,
+        "location": {
+            "street": f"{rng.randint(1, 9999)} {rng.choice(STREETS)}",
+            "city": city,
+            "state": state,
+            "zip": zip_code,
+            "country": "US",
+            "lat": round(lat + rng.gauss(0, 0.12), 4),
+            "lon": round(lon + rng.gauss(0, 0.12), 4),
+        },
+        "ratings": {
+            "avg_rating": round(min(5.0, max(1.0, rng.gauss(4.2, 0.5))), 1),
+            "reviews_count": int(rng.expovariate(1 / 120)),
+        },
+        "trust": {"verification_status": int(rng.random() < 0.6)},
+        "financials": {"annual_revenue": int(rng.lognormvariate(13.5, 1.2))},
+        "impact_metrics": {m: _metric(rng, *impact[m]) for m in metrics},
+        "popularity_90d": round(rng.betavariate(2, 5), 2),
+        "created_at": (FIRST_DAY + datetime.timedelta(days=rng.randint(0, days))).isoformat(),
+        "tags": rng.sample(tags, rng.randint(1, 2)),
+        "donation_options": rng.sample(["one-time", "recurring"], rng.randint(1, 2)),
+    }
+
+
+def iter_nonprofits(n, seed=0):
+    """Yields n synthetic nonprofits; deterministic for a given seed."""
+    rng = random.Random(seed)
+    for i in range(n):
+        yield make_record(i, rng)
+
+
+def metadata():
+    return {
+        "categories": list(CAUSES),
+        "zips_supported": [m[2] for m in METROS],
+        "last_updated": LAST_DAY.isoformat(),
+        "synthetic": True,
+    }
+
+
+def write_corpus(path, n, seed=0):
+    """Writes n records to path: JSONL for .jsonl/.ndjson, else nonprofits.json layout."""
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for rec in iter_nonprofits(n, seed):
+                f.write(json.dumps(rec) + "\n")
+            return
+        f.write('{"nonprofits": [\n')
+        for i, rec in enumerate(iter_nonprofits(n, seed)):
+            f.write((",\n" if i else "") + json.dumps(rec))
+        f.write('\n], "metadata": ' + json.dumps(metadata()) + "}\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", required=True, help=".jsonl/.ndjson or .json")
+    args = ap.parse_args()
+    write_corpus(args.out, args.n, args.seed)
+    print(f"wrote {args.n} synthetic nonprofits to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
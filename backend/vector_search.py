@@ -1,57 +1,608 @@
+import hashlib
+import importlib.util
+import itertools
+import json
+import os
+import sys
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import faiss
+
+
+def _lazy_import(name):
+    """
+    The module `name`, executed on first attribute access. faiss and
+    sentence_transformers (which pulls in torch) take seconds to import, and
+    processes that never search (health checks, tooling, tests) skip that.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+faiss = _lazy_import("faiss")
+
+try:
+    from backend import embedding, metrics
+    from backend.batching import QueryBatcher
+    from backend.cache import LRUCache
+    from backend.ingest import iter_chunks
+except ImportError:
+    import embedding
+    import metrics
+    from batching import QueryBatcher
+    from cache import LRUCache
+    from ingest import iter_chunks
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"  # 384-dim
+# Bump when the on-disk artifact layout changes; older artifacts are ignored.
+ARTIFACT_VERSION = 1
+
+# Index backends: exact brute force, or approximate for large corpora.
+# "sq8" (int8 per dimension, 384 B/org) and "pq" (product quantization,
+# pq_m bytes/org) are flat scans over compressed codes.
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq8", "pq")
+# Backends whose scores are approximate, so their top hits get re-ranked
+QUANTIZED_TYPES = ("ivf_pq", "sq8", "pq")
+# Runtime knobs for the approximate backends (ignored by "flat"). rerank: a
+# quantized index fetches rerank * top_k candidates, which are re-scored
+# exactly against the float embeddings; 0 serves the quantized scores.
+SEARCH_PARAMS = {"nprobe": 16, "ef_search": 64, "rerank": 4}
+
+_versions = itertools.count(1)
+
+DEFAULT_TEXT_FIELDS = ("name", "mission_text", "description")
+# Records per encode call / FAISS add while building, bounds transient memory
+ENCODE_CHUNK = 4096
 
 # Global (simple for demo)
 _model = None
-_index = None
-_ids = None
+_model_lock = threading.Lock()
+_state = None  # current VectorState; replaced wholesale, never mutated
+
+# Normalized query vectors keyed on (model, normalized query text)
+_query_cache = LRUCache(maxsize=4096, ttl=24 * 3600)
+# Optional micro-batcher in front of the encoder, see enable_batching()
+_batcher = None
 
 def _get_model():
     global _model
     if _model is None:
-        _model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")  # 384-dim
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(MODEL_NAME)
     return _model
 
+def load_model():
+    """Loads the encoder now (e.g. during warm-up) instead of on first use."""
+    _get_model()
+
 def _normalize(vecs: np.ndarray) -> np.ndarray:
     # cosine similarity via inner product on normalized vectors
     norms = np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12
     return vecs / norms
 
-def build_index(items, text_fields=("name", "mission_text", "description")):
+def _record_text(it, text_fields):
+    # simple concat of fields to embed
+    return " ".join([str(it.get(f, "")) for f in text_fields])
+
+def _content_hash(text: str) -> bytes:
+    # The embedding only depends on the embedded text, so that is what we hash.
+    # Hex (not raw digest) because numpy "S" arrays strip trailing NUL bytes.
+    return hashlib.sha1(text.encode("utf-8")).hexdigest().encode("ascii")
+
+def _load_artifact(cache_dir, text_fields):
+    """
+    Returns (manifest, ids, hashes, embeddings) for a compatible artifact in
+    cache_dir, or None. Embeddings and hashes are memory-mapped, not read.
+    """
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if (manifest.get("version") != ARTIFACT_VERSION
+                or manifest.get("model") != MODEL_NAME
+                or tuple(manifest.get("text_fields") or ()) != tuple(text_fields)):
+            return None
+        with open(os.path.join(cache_dir, "ids.json"), "r", encoding="utf-8") as f:
+            ids = json.load(f)
+        hashes = np.load(os.path.join(cache_dir, "hashes.npy"), mmap_mode="r")
+        embeddings = np.load(os.path.join(cache_dir, "embeddings.npy"), mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if len(ids) != len(hashes) or len(ids) != embeddings.shape[0]:
+        return None
+    return manifest, ids, hashes, embeddings
+
+def make_index(embeddings: np.ndarray, index_type: str = "flat", nlist: int = None,
+               pq_m: int = 48, hnsw_m: int = 32, ids=None):
+    """
+    Builds and fills a FAISS index over normalized embeddings.
+    index_type: one of INDEX_TYPES. IVF, SQ and PQ variants are trained on
+        the embeddings themselves; corpora too small to train them fall back
+        to "flat".
+    ids: optional int64 labels (corpus rows). IVF stores them natively, the
+        other backends are wrapped in an IndexIDMap2, so labels survive
+        remove_ids/add_with_ids on incremental updates.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"unknown index_type {index_type!r}, expected one of {INDEX_TYPES}")
+    n, dim = embeddings.shape
+    if index_type in ("ivf_flat", "ivf_pq"):
+        nlist = nlist or max(1, int(np.sqrt(n)))
+        # faiss wants ~39 training points per centroid; PQ codebooks need 256
+        if n < 39 * nlist or (index_type == "ivf_pq" and n < 256):
+            index_type = "flat"
+        else:
+            train = _training_sample(embeddings, 256 * nlist)
+    elif index_type == "pq" and n < 256:
+        index_type = "flat"
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(train)
+    elif index_type == "ivf_pq":
+        if dim % pq_m:
+            raise ValueError(f"pq_m={pq_m} must divide embedding dim {dim}")
+        index = faiss.IndexIVFPQ(faiss.IndexFlatIP(dim), dim, nlist, pq_m, 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(train)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+    elif index_type == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(_training_sample(embeddings, 65536))
+    elif index_type == "pq":
+        if dim % pq_m:
+            raise ValueError(f"pq_m={pq_m} must divide embedding dim {dim}")
+        # IVF with a single list: the same flat scan over PQ codes as an
+        # IndexPQ, which (unlike IVF) cannot take an IDSelector for filters
+        index = faiss.IndexIVFPQ(faiss.IndexFlatIP(dim), dim, 1, pq_m, 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(_training_sample(embeddings, 65536))
+    else:
+        index = faiss.IndexFlatIP(dim)  # inner product on normalized = cosine
+    if ids is not None and faiss.try_extract_index_ivf(index) is None:
+        index = faiss.IndexIDMap2(index)
+    # Added in slices so a memory-mapped matrix is never copied whole
+    for start in range(0, n, ENCODE_CHUNK):
+        block = np.ascontiguousarray(embeddings[start:start + ENCODE_CHUNK], dtype="float32")
+        if ids is None:
+            index.add(block)
+        else:
+            index.add_with_ids(block, np.asarray(ids[start:start + ENCODE_CHUNK], dtype=np.int64))
+    apply_search_params(index)
+    return index
+
+def _training_sample(embeddings, max_points):
+    # faiss subsamples to 256 points per centroid anyway; sampling first
+    # avoids copying the whole (possibly memory-mapped) matrix to train
+    n = embeddings.shape[0]
+    if n <= max_points:
+        return np.ascontiguousarray(embeddings, dtype="float32")
+    rows = np.sort(np.random.default_rng(1234).choice(n, max_points, replace=False))
+    return np.ascontiguousarray(embeddings[rows], dtype="float32")
+
+def _base_index(index):
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    return index
+
+def _supports_remove(index):
+    return not hasattr(_base_index(index), "hnsw")
+
+def apply_search_params(index, nprobe: int = None, ef_search: int = None):
+    """Pushes nprobe/efSearch (defaults: SEARCH_PARAMS) onto an index; no-op for flat."""
+    nprobe = nprobe or SEARCH_PARAMS["nprobe"]
+    ef_search = ef_search or SEARCH_PARAMS["ef_search"]
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    hnsw = getattr(_base_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+
+def set_search_params(nprobe: int = None, ef_search: int = None, rerank: int = None):
+    """Updates the default knobs and applies them to the live index."""
+    if nprobe:
+        SEARCH_PARAMS["nprobe"] = int(nprobe)
+    if ef_search:
+        SEARCH_PARAMS["ef_search"] = int(ef_search)
+    if rerank is not None and rerank != "":
+        SEARCH_PARAMS["rerank"] = int(rerank)
+    if _state is not None:
+        apply_search_params(_state.index)
+
+def _read_index(path):
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(path)
+
+def _save_artifact(cache_dir, text_fields, ids, hashes, embeddings, index, index_type):
+    # Write every file under a temp name and rename into place, manifest last,
+    # so a concurrently starting worker never sees a half-written artifact.
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = ".tmp-%d" % os.getpid()
+
+    def _path(name):
+        return os.path.join(cache_dir, name)
+
+    with open(_path("ids.json") + tmp, "w", encoding="utf-8") as f:
+        json.dump(ids, f)
+    with open(_path("hashes.npy") + tmp, "wb") as f:
+        np.save(f, np.asarray(hashes, dtype="S40"))
+    with open(_path("embeddings.npy") + tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(embeddings, dtype="float32"))
+    faiss.write_index(index, _path("index.faiss") + tmp)
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "model": MODEL_NAME,
+        "text_fields": list(text_fields),
+        "index_type": index_type,
+        "id_map": True,
+        "dim": int(embeddings.shape[1]),
+        "count": len(ids),
+    }
+    with open(_path("manifest.json") + tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    for name in ("ids.json", "hashes.npy", "embeddings.npy", "index.faiss", "manifest.json"):
+        os.replace(_path(name) + tmp, _path(name))
+
+class VectorState:
+    """
+    One consistent (index, ids, embeddings) triple. FAISS labels are corpus
+    rows: ids[row] is the org id, or None for a deleted row. Instances are
+    never mutated after publishing; with_changes() returns a new one.
+    """
+
+    def __init__(self, index, ids, embeddings, hashes, text_fields, index_type, overrides=None):
+        self.version = next(_versions)  # identifies this state in result-cache keys
+        self.index = index
+        self.ids = ids
+        self.embeddings = embeddings  # (len at build, dim), possibly memory-mapped
+        self.hashes = hashes
+        self.text_fields = tuple(text_fields)
+        self.index_type = index_type
+        self.overrides = overrides or {}  # row -> vector for rows re-embedded since build
+
+    @property
+    def n_rows(self):
+        return len(self.ids)
+
+    def embedding_rows(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.zeros((len(rows), self.embeddings.shape[1]), dtype="float32")
+        base = rows < self.embeddings.shape[0]
+        out[base] = self.embeddings[rows[base]]
+        for i, row in enumerate(rows):
+            vec = self.overrides.get(int(row))
+            if vec is not None:
+                out[i] = vec
+        return out
+
+    def with_changes(self, changes):
+        """
+        changes: {row: nonprofit dict, or None to delete}; rows >= n_rows
+        append. Only records whose embedded text changed are re-encoded. The
+        index is cloned and patched with remove_ids/add_with_ids (HNSW, which
+        cannot remove, and memory-mapped IVF lists, which cannot be cloned,
+        are rebuilt from the stored vectors instead).
+        """
+        ids = list(self.ids)
+        hashes = list(self.hashes)
+        size = max([self.n_rows] + [row + 1 for row in changes])
+        ids.extend([None] * (size - len(ids)))
+        hashes.extend([None] * (size - len(hashes)))
+        overrides = dict(self.overrides)
+        removed, encode_rows, encode_texts = [], [], []
+        for row, it in sorted(changes.items()):
+            live = row < self.n_rows and self.ids[row] is not None
+            if it is None:
+                if live:
+                    removed.append(row)
+                ids[row] = hashes[row] = None
+                overrides.pop(row, None)
+                continue
+            text = _record_text(it, self.text_fields)
+            h = _content_hash(text)
+            ids[row] = it["id"]
+            if live and self.hashes[row] == h:
+                continue  # text unchanged, keep the vector
+            if live:
+                removed.append(row)
+            hashes[row] = h
+            encode_rows.append(row)
+            encode_texts.append(text)
+
+        vecs = None
+        if encode_texts:
+            vecs = _normalize(np.array(_get_model().encode(encode_texts, batch_size=32,
+                                                           show_progress_bar=False)).astype("float32"))
+            for row, vec in zip(encode_rows, vecs):
+                overrides[row] = vec
+        state = VectorState(self.index, ids, self.embeddings, hashes, self.text_fields,
+                            self.index_type, overrides)
+        if not removed and vecs is None:
+            return state
+        index = _clone_for_update(self.index)
+        if index is not None:
+            if removed:
+                index.remove_ids(np.array(removed, dtype=np.int64))
+            if vecs is not None:
+                index.add_with_ids(vecs, np.array(encode_rows, dtype=np.int64))
+            apply_search_params(index)
+        else:
+            live_rows = np.array([r for r, cid in enumerate(ids) if cid is not None], dtype=np.int64)
+            index = make_index(state.embedding_rows(live_rows), self.index_type, ids=live_rows)
+        state.index = index
+        return state
+
+def _clone_for_update(index):
+    """Writable copy of an index to patch in place, or None if it must be rebuilt."""
+    if not _supports_remove(index):
+        return None
+    try:
+        return faiss.clone_index(index)
+    except RuntimeError:
+        return None  # e.g. IVF lists memory-mapped from the artifact
+
+def current_state():
+    return _state
+
+def publish_state(state):
+    """Makes `state` the one plain search()/search_batch() calls use (atomic swap)."""
+    global _state
+    _state = state
+
+def build_index(items, text_fields=DEFAULT_TEXT_FIELDS, cache_dir=None, index_type="flat",
+                chunk_size=ENCODE_CHUNK, workers=1, progress=None):
+    """
+    items: iterable of dicts (nonprofits); consumed once, in chunks of
+        chunk_size, so a streamed source (see ingest.iter_records) is never
+        materialized here: only ids, hashes and vectors are kept.
+    index_type: FAISS backend, see make_index()
+    cache_dir: optional directory holding the versioned index artifact. When
+        given, unchanged records reuse their stored embeddings (matched by
+        content hash), only new/edited records are encoded, and the artifact
+        is rewritten if anything changed.
+    workers: encoder processes, see embedding.encode_jobs() (0 = one per CPU)
+    progress: optional callable(encoded, elapsed_s, done=False), e.g.
+        embedding.ProgressLog()
+    Records with identical embedded text are encoded once.
+    returns: the new VectorState, which is also published as current
+    """
+    cached = _load_artifact(cache_dir, text_fields) if cache_dir else None
+    if cached is not None:
+        manifest, cached_ids, cached_hashes, cached_emb = cached
+        row_by_hash = {bytes(h): row for row, h in enumerate(cached_hashes)}
+    else:
+        row_by_hash = {}
+
+    ids = []
+    hashes = []
+    reuse = []  # cached artifact row per record, or None if encoded
+    fresh_by_hash = {}  # content hash -> first row encoded with it
+    copies = []  # (row, row with the same text that gets encoded)
+
+    def jobs():
+        for chunk in iter_chunks(items, chunk_size):
+            texts, rows = [], []
+            for it in chunk:
+                text = _record_text(it, text_fields)
+                h = _content_hash(text)
+                cached_row = row_by_hash.get(h)
+                if cached_row is None:
+                    first = fresh_by_hash.setdefault(h, len(ids))
+                    if first == len(ids):
+                        texts.append(text)
+                        rows.append(len(ids))
+                    else:
+                        copies.append((len(ids), first))
+                ids.append(it["id"])
+                hashes.append(h)
+                reuse.append(cached_row)
+            if texts:
+                yield rows, texts
+
+    fresh_rows, fresh_vecs = [], []
+    for rows, vecs in embedding.encode_jobs(jobs(), _get_model, MODEL_NAME, workers=workers,
+                                            progress=progress):
+        fresh_rows.extend(rows)
+        fresh_vecs.append(_normalize(vecs))
+    rows = np.arange(len(ids), dtype=np.int64)
+
+    if cached is not None and not fresh_rows and cached_ids == ids and list(cached_hashes) == hashes:
+        index = None
+        if manifest.get("index_type", "flat") == index_type and manifest.get("id_map"):
+            # Nothing changed: serve straight from the memory-mapped artifact.
+            index = _read_index(os.path.join(cache_dir, "index.faiss"))
+            apply_search_params(index)
+        if index is None or isinstance(_base_index(index), faiss.IndexPQ):
+            # Same vectors, different backend (or a "pq" artifact from before
+            # it was IVF-based, which cannot filter): no encoding, just re-index.
+            index = make_index(cached_emb, index_type, ids=rows)
+            _save_artifact(cache_dir, text_fields, ids, hashes, cached_emb, index, index_type)
+        state = VectorState(index, ids, cached_emb, hashes, text_fields, index_type)
+        publish_state(state)
+        return state
+
+    if fresh_vecs:
+        dim = fresh_vecs[0].shape[1]
+    elif cached is not None:
+        dim = cached_emb.shape[1]
+    else:
+        dim = _get_model().get_sentence_embedding_dimension()
+    embeddings = np.empty((len(ids), dim), dtype="float32")
+    if fresh_vecs:
+        embeddings[fresh_rows] = np.concatenate(fresh_vecs)
+        del fresh_vecs
+    if copies:
+        embeddings[[row for row, _ in copies]] = embeddings[[first for _, first in copies]]
+    kept = [i for i, row in enumerate(reuse) if row is not None]
+    if kept:
+        embeddings[kept] = cached_emb[[reuse[i] for i in kept]]
+
+    index = make_index(embeddings, index_type, ids=rows)
+
+    if cache_dir:
+        _save_artifact(cache_dir, text_fields, ids, hashes, embeddings, index, index_type)
+    state = VectorState(index, ids, embeddings, hashes, text_fields, index_type)
+    publish_state(state)
+    return state
+
+def _normalize_query(query_text: str) -> str:
+    # MiniLM's tokenizer is uncased and whitespace-insensitive, so encoding the
+    # normalized text gives the same vector and lets variants share a cache slot.
+    return " ".join((query_text or "").lower().split())
+
+def encode_queries(query_texts):
     """
-    items: list of dicts (nonprofits)
-    returns: None (populates globals)
+    Returns normalized float32 query vectors, shape (len(query_texts), dim).
+    Cached vectors are reused; all misses are encoded in a single model call.
     """
-    global _index, _ids
-    model = _get_model()
-    corpora = []
-    _ids = []
-    for it in items:
-        # simple concat of fields to embed
-        text = " ".join([str(it.get(f, "")) for f in text_fields])
-        corpora.append(text)
-        _ids.append(it["id"])
+    keys = [(MODEL_NAME, _normalize_query(t)) for t in query_texts]
+    vecs = [_query_cache.get(k) for k in keys]
+    missing = sorted({k[1] for k, v in zip(keys, vecs) if v is None})
+    if missing:
+        model = _get_model()
+        with metrics.timed("encode"):
+            fresh = _normalize(np.array(model.encode(missing)).astype("float32"))
+        by_text = dict(zip(missing, fresh))
+        for text, vec in by_text.items():
+            _query_cache.put((MODEL_NAME, text), vec)
+        vecs = [v if v is not None else by_text[k[1]] for k, v in zip(keys, vecs)]
+    return np.stack(vecs)
 
-    embeddings = model.encode(corpora, batch_size=32, show_progress_bar=False)
-    embeddings = _normalize(np.array(embeddings).astype("float32"))
+def warm_query_cache(query_texts):
+    """Precomputes vectors for known frequent queries (e.g. at startup)."""
+    if query_texts:
+        encode_queries(list(query_texts))
 
-    dim = embeddings.shape[1]
-    _index = faiss.IndexFlatIP(dim)  # inner product on normalized = cosine
-    _index.add(embeddings)
+def query_cache_stats():
+    return _query_cache.stats()
 
-def search(query_text: str, top_k: int = 50):
-    global _index, _ids
-    if _index is None:
+def _selector_params(index, allowed):
+    """
+    FAISS SearchParameters restricting results to the rows set in `allowed`
+    (bool mask over index positions). Returns (params, bitmap); the bitmap
+    must stay referenced until the search returns.
+    """
+    bitmap = np.packbits(np.asarray(allowed, dtype=bool), bitorder="little")
+    sel = faiss.IDSelectorBitmap(len(allowed), faiss.swig_ptr(bitmap))
+    ivf = faiss.try_extract_index_ivf(index)
+    hnsw = getattr(_base_index(index), "hnsw", None)
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=sel, nprobe=ivf.nprobe)
+    elif hnsw is not None:
+        params = faiss.SearchParametersHNSW(sel=sel, efSearch=hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=sel)
+    return params, bitmap
+
+def rerank_exact(q_emb, candidates, vectors_of, top_k):
+    """
+    Re-scores candidate rows (FAISS labels, -1 padded, one row per query)
+    with exact inner products. vectors_of(rows) returns their float vectors.
+    Returns (D, I) like index.search, top_k wide.
+    """
+    D = np.full((len(q_emb), top_k), -np.inf, dtype="float32")
+    I = np.full((len(q_emb), top_k), -1, dtype=np.int64)
+    for i, (q, rows) in enumerate(zip(q_emb, candidates)):
+        rows = rows[rows >= 0]
+        scores = vectors_of(rows) @ q
+        order = np.lexsort((rows, -scores))[:top_k]
+        D[i, :len(order)] = scores[order]
+        I[i, :len(order)] = rows[order]
+    return D, I
+
+def _search_index(state, q_emb, top_k, params=None):
+    factor = SEARCH_PARAMS["rerank"] if state.index_type in QUANTIZED_TYPES else 0
+    k = top_k * factor if factor > 1 else top_k
+    with metrics.timed("index_search"):
+        D, I = state.index.search(q_emb, k, params=params) if params is not None else state.index.search(q_emb, k)
+    if factor:
+        with metrics.timed("rerank"):
+            D, I = rerank_exact(q_emb, I, state.embedding_rows, top_k)
+    return D, I
+
+def _require(state):
+    state = state or _state
+    if state is None:
         raise RuntimeError("Index not built. Call build_index() first.")
-    model = _get_model()
-    q_emb = model.encode([query_text])
-    q_emb = _normalize(np.array(q_emb).astype("float32"))
-
-    D, I = _index.search(q_emb, top_k)  # D: scores, I: indices
-    hits = []
-    for score, idx in zip(D[0], I[0]):
-        if idx == -1:
-            continue
-        hits.append({"id": _ids[idx], "semantic_score": float(score)})
-    return hits
+    return state
+
+def search_batch(query_texts, top_k: int = 50, allowed=None, state=None):
+    """
+    Searches several queries at once: one encode call for the uncached
+    queries and one index search over the stacked vectors.
+    allowed: optional bool mask over corpus rows; only those rows are returned.
+    state: VectorState to search (default: the published one)
+    returns: list (per query) of [{"id", "semantic_score"}]
+    """
+    state = _require(state)
+    ids = state.ids
+    if allowed is not None and len(allowed) < state.n_rows:
+        # Rows past the mask would come back unfiltered
+        raise ValueError(f"allowed mask covers {len(allowed)} rows, the index has {state.n_rows}")
+    q_emb = encode_queries(query_texts)
+    if allowed is not None:
+        params, _bitmap = _selector_params(state.index, allowed)
+        D, I = _search_index(state, q_emb, top_k, params)
+    else:
+        D, I = _search_index(state, q_emb, top_k)  # D: scores, I: corpus rows
+    results = []
+    for scores, idxs in zip(D, I):
+        hits = []
+        for score, idx in zip(scores, idxs):
+            if idx == -1 or ids[idx] is None:
+                continue
+            hits.append({"id": ids[idx], "semantic_score": float(score)})
+        results.append(hits)
+    return results
+
+def score_rows(query_text: str, rows, state=None):
+    """
+    Cosine similarity of the query to specific corpus rows, read from the
+    stored embeddings. Lets candidates from other sources (geo, lexical) get a
+    semantic score without a search.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    state = state or _state
+    if state is None or not len(rows):
+        return np.zeros(len(rows), dtype="float32")
+    q = encode_queries([query_text])[0]
+    return state.embedding_rows(rows) @ q
+
+def enable_batching(window_ms: float = 3.0, max_batch: int = 32):
+    """Routes search() through a QueryBatcher so concurrent requests share forward passes."""
+    global _batcher
+    disable_batching()
+    _batcher = QueryBatcher(search_batch, window_ms=window_ms, max_batch=max_batch)
+    return _batcher
+
+def disable_batching():
+    global _batcher
+    if _batcher is not None:
+        _batcher.close()
+        _batcher = None
+
+def batching_stats():
+    return _batcher.stats() if _batcher is not None else None
+
+def is_ready():
+    return _state is not None
+
+def search(query_text: str, top_k: int = 50, allowed=None, state=None):
+    state = _require(state)
+    if _batcher is not None and allowed is None and state is _state:
+        return _batcher.submit(query_text, top_k)
+    return search_batch([query_text], top_k, allowed=allowed, state=state)[0]
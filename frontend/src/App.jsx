@@ -1,5 +1,5 @@
 // frontend/src/App.jsx
-import React, { useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import "./index.css"; // ensure Tailwind CSS is loaded
 
 const API_BASE = import.meta.env.VITE_API_URL || "http://localhost:5000";
@@ -12,6 +12,8 @@ export default function App() {
   const [results, setResults] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const sentinel = useRef(null);
 
   const KNOWN_CAUSES = ["housing","families","anti-homelessness","mental health","veterans","education","youth","legal"];
 
@@ -19,7 +21,8 @@ export default function App() {
     setSelectedCauses(prev => prev.includes(c) ? prev.filter(x => x !== c) : [...prev, c]);
   }
 
-  async function doSearch(page = 1) {
+  // cursor: next_cursor of the last response, to append the following page
+  async function doSearch(cursor = null) {
     setLoading(true);
     setError(null);
     try {
@@ -28,8 +31,8 @@ export default function App() {
         location: (zip || radius) ? { zip, radius_miles: Number(radius) } : null,
         filters: selectedCauses.length ? { cause: selectedCauses } : null,
         sort: "relevance",
-        page,
-        limit: 12
+        limit: 12,
+        ...(cursor ? { cursor } : {})
       };
 
       const resp = await fetch(`${API_BASE}/api/search`, {
@@ -44,7 +47,8 @@ export default function App() {
       }
 
       const data = await resp.json();
-      setResults(data.results || []);
+      setResults(prev => cursor ? [...prev, ...(data.results || [])] : (data.results || []));
+      setNextCursor(data.next_cursor || null);
     } catch (err) {
       console.error(err);
       setError("Search failed. Check backend and console.");
@@ -53,6 +57,16 @@ export default function App() {
     }
   }
 
+  // Infinite scroll: load the next page when the sentinel below the results shows up
+  useEffect(() => {
+    if (!nextCursor || loading || !sentinel.current) return;
+    const observer = new IntersectionObserver(entries => {
+      if (entries[0].isIntersecting) doSearch(nextCursor);
+    }, { rootMargin: "400px" });
+    observer.observe(sentinel.current);
+    return () => observer.disconnect();
+  }, [nextCursor, loading]);
+
   return (
     <div className="min-h-screen bg-gray-50 p-6">
       <div className="max-w-5xl mx-auto">
@@ -75,7 +89,7 @@ export default function App() {
             <option value="rating">Rating</option>
           </select>
           <button
-            onClick={() => doSearch(1)}
+            onClick={() => doSearch()}
             className="px-4 py-3 rounded-xl bg-black text-white"
           >
             Search
@@ -153,6 +167,7 @@ export default function App() {
             ))}
 
           </div>
+          {nextCursor && <div ref={sentinel} className="h-8" />}
         </div>
       </div>
     </div>
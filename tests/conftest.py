@@ -1,8 +1,12 @@
-import pytest
-
+import copy
+import re
 import sys
+import zlib
 from pathlib import Path
 
+import numpy as np
+import pytest
+
 
 # Ensure backend package is importable when running from project root
 ROOT = Path(__file__).resolve().parents[1]
@@ -28,3 +32,76 @@ def client(app):
     return app.test_client()
 
 
+# Two orgs for pipeline-level tests: "a" (housing, San Francisco, verified)
+# and "b" (veterans, Phoenix, better rated).
+SEARCH_RECORDS = [
+    {"id": "a", "name": "Housing Aid", "causes": ["housing"], "location": {"lat": 37.7763, "lon": -122.4167},
+     "ratings": {"avg_rating": 4.6}, "trust": {"verification_status": 1},
+     "popularity_90d": 0.7, "created_at": "2023-03-01", "impact_metrics": {}},
+    {"id": "b", "name": "Vets Help", "causes": ["veterans"], "location": {"lat": 33.4510, "lon": -112.0730},
+     "ratings": {"avg_rating": 4.9}, "trust": {"verification_status": 0},
+     "popularity_90d": 0.2, "created_at": "2024-01-01", "impact_metrics": {}},
+]
+
+
+def _fixed_hits(ctx):
+    ctx.hits = [{"id": "b", "semantic_score": 0.9}, {"id": "a", "semantic_score": 0.5}]
+    ctx.rows = ctx.corpus.rows_for(["b", "a"])
+    ctx.semantic = np.array([0.9, 0.5])
+    ctx.lexical = np.zeros(2)
+    ctx.geo = np.zeros(2)
+
+
+@pytest.fixture()
+def search_records():
+    return copy.deepcopy(SEARCH_RECORDS)
+
+
+@pytest.fixture()
+def fixed_hits():
+    """Retrieve stage stand-in: both records, "b" semantically closer."""
+    return _fixed_hits
+
+
+@pytest.fixture()
+def fixed_pipeline(search_records):
+    """SearchPipeline over search_records with retrieval stubbed by fixed_hits."""
+    from backend.corpus import Corpus
+    from backend.pipeline import SearchPipeline
+
+    corpus = Corpus(search_records)
+    return SearchPipeline(lambda: corpus, stages={"retrieve": _fixed_hits})
+
+
+class WordModel:
+    """Stand-in encoder: a bag of hashed words, so shared words mean similar vectors."""
+
+    dim = 64
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        self.calls.append(list(texts))
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for i, text in enumerate(texts):
+            for word in re.findall(r"[a-z0-9]+", str(text).lower()):
+                out[i, zlib.crc32(word.encode()) % self.dim] += 1.0
+            out[i, 0] += 0.01
+        return out
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+
+@pytest.fixture()
+def word_model(monkeypatch):
+    """WordModel installed as the vector_search encoder, with an empty query cache and no published state."""
+    import backend.vector_search as vs
+    from backend.cache import LRUCache
+
+    model = WordModel()
+    monkeypatch.setattr(vs, "_model", model)
+    monkeypatch.setattr(vs, "_query_cache", LRUCache(maxsize=64))
+    monkeypatch.setattr(vs, "_state", None)
+    return model
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import threading
+
+import httpx
+
+from backend import asgi, server, vector_search
+from backend.corpus import Corpus
+from backend.pipeline import SearchPipeline
+
+
+def _request(method, url, **kw):
+    async def go():
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kw)
+    return asyncio.run(go())
+
+
+def test_same_schema_as_flask(monkeypatch, fixed_pipeline):
+    monkeypatch.setattr(server, "PIPELINE", fixed_pipeline)
+    body = {"query": "help", "location": {"zip": "94103", "radius_miles": 10}}
+    got = _request("POST", "/api/search", json=body)
+    want = server.app.test_client().post("/api/search", json=body)
+    assert got.status_code == 200 and got.json() == want.get_json()
+    got = _request("GET", "/search?q=help&limit=1")
+    assert got.json() == server.app.test_client().get("/search?q=help&limit=1").get_json()
+    assert _request("GET", "/nope").status_code == 404
+    debug = _request("GET", "/search?q=help&debug_timing=1").json()
+    assert {"intent", "retrieve", "explain"} <= set(debug["timings"]) and debug["candidates"]["retrieve"] == 2
+    assert 'http_requests_total{endpoint="/search",status="200"}' in _request("GET", "/metrics").text
+
+
+def test_timeout_cancels_and_backpressure_rejects(monkeypatch, search_records):
+    release = threading.Event()
+    ran = []
+
+    def slow(ctx):
+        release.wait(5)
+
+    def later(ctx):
+        ran.append(ctx)
+
+    corpus = Corpus(search_records)
+    pipeline = SearchPipeline(lambda: corpus, stages={"retrieve": slow, "score": later})
+    monkeypatch.setattr(server, "PIPELINE", pipeline)
+    monkeypatch.setattr(asgi, "TIMEOUT_S", 0.05)
+    assert _request("POST", "/api/search", json={"query": "x"}).status_code == 504
+    monkeypatch.setattr(asgi, "_admitted", asgi.MAX_INFLIGHT + asgi.MAX_QUEUE)
+    busy = _request("GET", "/search?q=x")
+    assert busy.status_code == 503 and busy.headers["retry-after"] == "1"
+    monkeypatch.setattr(asgi, "_admitted", 1)
+    release.set()
+    asgi._executor.submit(lambda: None).result()  # let the timed-out search wind down
+    assert ran == []  # stopped before the stages after the one running at timeout
+
+
+def test_warmup_serves_lexical_until_ready(monkeypatch, tmp_path, search_records):
+    path = tmp_path / "np.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in search_records))
+    monkeypatch.setenv("NONPROFITS_PATH", str(path))
+    for name in ("DATA", "NP_BY_ID", "CORPUS", "SNAPSHOT"):
+        monkeypatch.setattr(server, name, getattr(server, name))
+    monkeypatch.setattr(server, "READINESS", {"state": "idle", "stages": {}, "error": None})
+    monkeypatch.setattr(vector_search, "_state", None)
+    model_loaded = threading.Event()
+    monkeypatch.setattr(server, "load_model", lambda: model_loaded.wait(5))
+    monkeypatch.setattr(server, "_load_vectors", lambda shared: object())
+    monkeypatch.setattr(server, "warm_query_cache", lambda queries: None)
+    monkeypatch.setattr(server, "PIPELINE", SearchPipeline(server.current_snapshot))
+
+    server.READINESS["state"] = "loading"  # as if warm-up had not loaded the data yet
+    busy = _request("GET", "/search?q=housing")
+    assert busy.status_code == 503 and busy.headers["retry-after"] == "2"
+
+    thread = server.start_warmup()
+    while "data" not in server.READINESS["stages"]:
+        thread.join(0.01)
+    ready = _request("GET", "/ready")
+    assert ready.status_code == 503 and "data" in ready.json()["stages"]
+    got = _request("GET", "/search?q=housing")
+    assert got.status_code == 200 and got.json()["retrieval"] == "lexical"
+    assert [r["id"] for r in got.json()["results"]] == ["a"]
+    model_loaded.set()
+    thread.join(5)
+    ready = _request("GET", "/ready")
+    assert ready.status_code == 200 and set(ready.json()["stages"]) == {"data", "model", "index", "query_cache"}
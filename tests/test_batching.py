@@ -0,0 +1,45 @@
+import threading
+
+from backend.batching import QueryBatcher
+
+
+def test_concurrent_queries_share_one_batch():
+    calls = []
+
+    def batch_fn(texts, top_k):
+        calls.append((list(texts), top_k))
+        return [[f"{t}-{i}" for i in range(top_k)] for t in texts]
+
+    batcher = QueryBatcher(batch_fn, window_ms=200, max_batch=4)
+    out = {}
+
+    def worker(q, k):
+        out[q] = batcher.submit(q, k)
+
+    threads = [threading.Thread(target=worker, args=(f"q{i}", i + 1)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert len(calls) == 1
+    assert sorted(calls[0][0]) == ["q0", "q1", "q2", "q3"]
+    assert calls[0][1] == 4
+    assert out["q0"] == ["q0-0"]
+    assert out["q2"] == ["q2-0", "q2-1", "q2-2"]
+
+
+def test_errors_reach_every_waiter():
+    def batch_fn(texts, top_k):
+        raise ValueError("boom")
+
+    batcher = QueryBatcher(batch_fn, window_ms=1)
+    try:
+        batcher.submit("housing", 5)
+    except ValueError as exc:
+        assert str(exc) == "boom"
+    else:
+        raise AssertionError("expected ValueError")
+    finally:
+        batcher.close()
@@ -0,0 +1,26 @@
+from backend.cache import LRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    c = LRUCache(maxsize=2)
+    c.put("a", 1)
+    c.put("b", 2)
+    assert c.get("a") == 1  # "a" is now most recent
+    c.put("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    st = c.stats()
+    assert st["evictions"] == 1
+    assert st["hits"] == 3 and st["misses"] == 1
+
+
+def test_ttl_expires_entries(monkeypatch):
+    import backend.cache as cache_mod
+    now = [100.0]
+    monkeypatch.setattr(cache_mod.time, "monotonic", lambda: now[0])
+    c = LRUCache(maxsize=10, ttl=5)
+    c.put("q", "vec")
+    assert c.get("q") == "vec"
+    now[0] += 6
+    assert c.get("q") is None
+    assert c.stats()["expirations"] == 1
@@ -0,0 +1,41 @@
+from backend.corpus import Corpus
+
+
+ITEMS = [
+    {"id": "a", "causes": ["housing", "families"], "ratings": {"avg_rating": 4.6}},
+    {"id": "b", "causes": ["veterans"], "ratings": {"avg_rating": 4.9}},
+    {"id": "c", "causes": ["housing"], "ratings": {"avg_rating": 3.8}},
+]
+
+
+def test_filter_mask_causes_are_any_of_and_rating_is_a_floor():
+    corpus = Corpus(ITEMS)
+    assert corpus.filter_mask({}) is None
+    assert list(corpus.filter_mask({"cause": ["housing"]})) == [True, False, True]
+    assert list(corpus.filter_mask({"cause": ["veterans"], "causes": ["families"]})) == [True, True, False]
+    assert list(corpus.filter_mask({"min_rating": 4.6})) == [True, True, False]
+    assert list(corpus.filter_mask({"cause": ["housing"], "min_rating": 4})) == [True, False, False]
+    assert not corpus.filter_mask({"cause": ["unknown"]}).any()
+
+
+def test_columns_line_up_with_rows():
+    corpus = Corpus(ITEMS)
+    assert list(corpus.rows_for(["c", "missing", "a"])) == [2, 0]
+    assert corpus.avg_rating[corpus.row_of["b"]] == 4.9
+
+
+def test_with_changes_keeps_rows_and_matches_a_fresh_build():
+    corpus = Corpus(ITEMS)
+    edited = {"id": "b", "causes": ["housing"], "ratings": {"avg_rating": 4.1}, "name": "shelter"}
+    added = {"id": "d", "causes": ["veterans"], "ratings": {"avg_rating": 5.0}, "name": "shelter"}
+    new, changes = corpus.with_changes(upserts=[edited, added], deletes=["a"])
+    assert changes == {0: None, 1: edited, 3: added}
+    assert corpus.by_id["b"]["causes"] == ["veterans"]  # original untouched
+    assert new.ids == [None, "b", "c", "d"] and "a" not in new.by_id
+    assert list(new.filter_mask({"cause": ["housing"]})) == [False, True, True, False]
+    assert list(new.filter_mask({"min_rating": 1})) == [False, True, True, True]
+    fresh = Corpus([edited, ITEMS[2], added])
+    rows, scores = new.lexical.search("shelter")
+    fresh_rows, fresh_scores = fresh.lexical.search("shelter")
+    assert [new.ids[r] for r in rows] == [fresh.ids[r] for r in fresh_rows]
+    assert list(scores) == list(fresh_scores)
@@ -0,0 +1,71 @@
+import numpy as np
+
+from backend import embedding
+import backend.vector_search as vs
+
+
+class LengthModel:
+    """Stand-in encoder: a text's vector is [len(text), 1, ...]; records what it was asked."""
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        self.calls.append(list(texts))
+        out = np.ones((len(texts), self.dim), dtype="float32")
+        out[:, 0] = [len(t) for t in texts]
+        return out
+
+
+def length_model(_name):
+    return LengthModel()
+
+
+def _jobs(n, per_job):
+    for start in range(0, n, per_job):
+        rows = list(range(start, min(n, start + per_job)))
+        yield rows, ["x" * (1 + (r * 7) % 50) for r in rows]
+
+
+def _assemble(results, n):
+    out = np.zeros((n, 8), dtype="float32")
+    seen = []
+    for rows, vecs in results:
+        out[rows] = vecs
+        seen.extend(rows)
+    assert sorted(seen) == list(range(n))
+    return out
+
+
+def test_shards_are_length_sorted_and_cover_every_row():
+    texts = ["a" * k for k in (3, 9, 1, 9, 5)]
+    shards = list(embedding.length_sorted_shards([10, 11, 12, 13, 14], texts, shard_size=2))
+    assert [rows for rows, _ in shards] == [[11, 13], [14, 10], [12]]
+    assert all(len(t) == len(texts[r - 10]) for rows, ts in shards for r, t in zip(rows, ts))
+
+
+def test_in_process_and_pool_give_the_same_vectors(monkeypatch):
+    model = LengthModel()
+    progress = []
+    local = _assemble(embedding.encode_jobs(_jobs(300, 64), lambda: model, workers=1, shard_size=32,
+                                            progress=lambda *a, **kw: progress.append(a)), 300)
+    assert local[:, 0].tolist() == [1 + (r * 7) % 50 for r in range(300)]
+    assert progress[-1][0] == 300 and all(len(c) <= 32 for c in model.calls)
+
+    monkeypatch.setattr(embedding, "MIN_PARALLEL", 100)
+    pooled = _assemble(embedding.encode_jobs(_jobs(300, 64), None, "fake", workers=2, shard_size=32,
+                                             loader=length_model), 300)
+    assert np.array_equal(local, pooled)
+
+
+def test_build_index_encodes_each_distinct_text_once(monkeypatch):
+    model = LengthModel(dim=16)
+    monkeypatch.setattr(vs, "_model", model)
+    monkeypatch.setattr(vs, "_state", vs._state)
+    items = [{"id": f"n{i}", "name": f"org {i % 3}", "mission_text": "m", "description": "d"} for i in range(9)]
+    state = vs.build_index(items, chunk_size=4)
+    encoded = [t for call in model.calls for t in call]
+    assert sorted(encoded) == ["org 0 m d", "org 1 m d", "org 2 m d"]
+    emb = state.embedding_rows(np.arange(9))
+    assert all(np.array_equal(emb[i], emb[i % 3]) for i in range(9))
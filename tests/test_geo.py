@@ -10,3 +10,60 @@ def test_haversine_and_geo_score():
     assert 0.0 <= s <= 1.0
 
 
+def test_grid_index_matches_brute_force():
+    import numpy as np
+    from backend.geo import GridIndex, haversine_miles_np
+
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(32, 40, 2000)
+    lon = rng.uniform(-123, -110, 2000)
+    grid = GridIndex(lat, lon)
+    center = ZIP_TO_LATLON["94103"]
+    dist = haversine_miles_np(center[0], center[1], lat, lon)
+
+    rows, d = grid.within(center[0], center[1], 60)
+    assert set(rows) == set(np.flatnonzero(dist <= 60))
+
+    rows, d = grid.nearest(center[0], center[1], 5, 500)
+    assert list(rows) == list(np.argsort(dist)[:5])
+    assert list(d) == sorted(d)
+
+
+def test_gazetteer_binary_lookup_and_prefix_fallback(tmp_path):
+    from backend.build_zip_gazetteer import read_centroids
+    from backend.geo import ZipGazetteer, write_gazetteer
+
+    src = tmp_path / "zcta.txt"
+    src.write_text(
+        "GEOID\tALAND\tINTPTLAT\tINTPTLONG                                                                                                               \n"
+        "94103\t1\t37.772\t-122.411\n"
+        "00601\t1\t18.180\t-66.752\n"
+        "94110\t1\t37.749\t-122.415\n"
+    )
+    zips, lats, lons = read_centroids(str(src))
+    assert zips == [94103, 601, 94110]
+    path = tmp_path / "zip_latlon.bin"
+    write_gazetteer(str(path), zips, lats, lons)
+
+    gz = ZipGazetteer(str(path))
+    assert len(gz) == 3
+    assert gz["00601"] == (18.18, -66.752)
+    assert gz.get("94103-1234") == (37.772, -122.411)
+    assert gz.get("94104") is None and "94104" not in gz
+    assert gz.locate("94104") == (37.772, -122.411)  # nearest in prefix 941
+    assert gz.locate("94109") == (37.749, -122.415)
+    assert gz.locate("10001") is None
+
+
+def test_missing_gazetteer_warns_and_reports_seed_fallback(tmp_path, caplog):
+    from backend.geo import SEED_ZIP_TO_LATLON, ZipGazetteer, write_gazetteer
+    from backend import server
+
+    gaz = ZipGazetteer(str(tmp_path / "missing.bin"))
+    assert "not found" in caplog.text
+    assert gaz.stats()["source"] == "seed" and gaz.stats()["zips"] == len(SEED_ZIP_TO_LATLON)
+
+    path = tmp_path / "zips.bin"
+    write_gazetteer(str(path), [94103, 10007, 60602], [37.77, 40.71, 41.88], [-122.41, -74.0, -87.63])
+    assert ZipGazetteer(str(path)).stats() == {"zips": 3, "source": "file", "path": str(path)}
+    assert server.app.test_client().get("/api/stats").get_json()["gazetteer"] == ZIP_TO_LATLON.stats()
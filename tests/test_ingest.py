@@ -0,0 +1,22 @@
+import json
+
+from backend import ingest
+
+
+RECORDS = [{"id": "a", "name": "Bay Area Housing", "score": 1.25}, {"id": "b", "tags": ["x", "y"]}]
+
+
+def test_json_is_streamed_across_buffer_refills(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "READ_SIZE", 5)
+    path = tmp_path / "nonprofits.json"
+    path.write_text(json.dumps({"metadata": {"v": 2}, "nonprofits": RECORDS, "count": 10}, indent=2))
+    meta = {}
+    assert list(ingest.iter_records(str(path), meta=meta)) == RECORDS
+    assert meta == {"metadata": {"v": 2}, "count": 10}
+
+
+def test_jsonl_and_chunks(tmp_path):
+    path = tmp_path / "nonprofits.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in RECORDS) + "\n\n")
+    assert list(ingest.iter_records(str(path))) == RECORDS
+    assert list(ingest.iter_chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
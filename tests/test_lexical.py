@@ -0,0 +1,29 @@
+import numpy as np
+
+from backend.lexical import BM25Index, tokenize
+
+
+ITEMS = [
+    {"id": "a", "ein": "12-3456789", "name": "Bay Area Housing Aid", "mission_text": "Affordable housing.", "tags": ["shelter"]},
+    {"id": "b", "ein": "98-7654321", "name": "Phoenix Veterans Mental Health", "mission_text": "Counseling for veterans."},
+    {"id": "c", "name": "Housing Housing Housing", "description": "housing"},
+]
+
+
+def test_tokenize_keeps_ein_as_one_token():
+    assert tokenize("EIN 12-3456789, Bay-Area!") == ["ein", "123456789", "bay", "area"]
+
+
+def test_bm25_ranks_and_scores_rows_consistently():
+    idx = BM25Index(ITEMS)
+    rows, scores = idx.search("housing", top_k=5)
+    assert list(rows) == [2, 0]
+    assert scores[0] > scores[1] > 0
+    assert np.allclose(idx.score_rows("housing", [0, 1, 2]), [scores[1], 0.0, scores[0]])
+
+    rows, _ = idx.search("98-7654321", top_k=5)
+    assert list(rows) == [1]
+
+    allowed = np.array([True, True, False])
+    rows, _ = idx.search("housing", top_k=5, allowed=allowed)
+    assert list(rows) == [0]
@@ -0,0 +1,35 @@
+import time
+
+from backend import metrics
+from backend.pipeline import SearchRequest
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = metrics.Histogram("test_latency_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 3.0):
+        h.observe(v, "a")
+    text = "\n".join(h.render())
+    assert 'test_latency_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{stage="a",le="1.0"} 3' in text
+    assert 'test_latency_seconds_bucket{stage="a",le="+Inf"} 4' in text
+    assert 'test_latency_seconds_count{stage="a"} 4' in text
+    assert "# TYPE test_latency_seconds histogram" in metrics.render()
+
+
+def test_timed_records_into_the_active_breakdown():
+    timings = {}
+    with metrics.recording(timings):
+        with metrics.timed("encode"):
+            time.sleep(0.001)
+    with metrics.timed("encode"):
+        pass
+    assert list(timings) == ["encode"] and timings["encode"] >= 1.0
+
+
+def test_pipeline_counts_candidates_and_times_stages(fixed_pipeline):
+    before = metrics.CANDIDATES.value("filter")
+    ctx = fixed_pipeline.run(
+        SearchRequest(query="x", filters={"cause": ["housing"]}))
+    assert ctx.candidates == {"retrieve": 2, "geo": 2, "filter": 1}
+    assert metrics.CANDIDATES.value("filter") == before + 1
+    assert metrics.STAGE_SECONDS.count("rank") >= 1
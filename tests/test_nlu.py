@@ -1,4 +1,4 @@
-from backend.nlu import parse_intent
+from backend.nlu import PhraseMatcher, normalize, parse_intent
 
 
 def test_parse_intent_zip_and_cause():
@@ -14,3 +14,25 @@ def test_parse_intent_multiple_causes():
     assert set(intent["causes"]) & {"youth", "education"}
 
 
+def test_parse_intent_matches_on_word_boundaries():
+    assert parse_intent("teens and homelessness")["causes"] == ["housing", "youth"]
+    assert parse_intent("parents support system")["causes"] is None
+    assert parse_intent("Mental  Health!!")["causes"] == ["mental health"]
+
+
+def test_parse_intent_numbers():
+    assert parse_intent("food bank 94103")["location"] == {"zip": "94103", "radius_miles": None}
+    assert parse_intent("within 10mi of 10007")["location"] == {"zip": "10007", "radius_miles": 10}
+    assert parse_intent("radius 999")["location"]["radius_miles"] == 200
+    assert parse_intent("covid19 relief")["location"] is None
+
+
+def test_parse_intent_results_are_not_shared_between_calls():
+    first = parse_intent("monthly kids")
+    first["causes"].append("legal")
+    assert parse_intent("monthly kids") == {"causes": ["families"], "location": None, "donation_type": "recurring"}
+
+
+def test_phrase_matcher_finds_overlapping_phrases():
+    m = PhraseMatcher([("he", 1), ("she", 2), ("hers", 3), ("his", 4), ("she sells", 5)])
+    assert sorted(m.find(normalize("she sells his hers"))) == [1, 2, 3, 4, 5]  # not the "he" inside "she"
@@ -0,0 +1,261 @@
+import numpy as np
+import pytest
+
+from backend import metrics, pipeline as pipeline_module, synthetic
+from backend.geo import ZIP_TO_LATLON, haversine_miles_np
+from backend.cache import LRUCache
+from backend.corpus import Corpus
+from backend.pipeline import (MAX_CURSOR_DEPTH, SORTS, InvalidCursor, SearchPipeline, SearchRequest, Snapshot,
+                              cursor_keys, top_positions)
+
+
+def test_pipeline_runs_every_stage_and_times_it(fixed_pipeline):
+    ctx = fixed_pipeline.run(SearchRequest(query="support"))
+    assert [r["id"] for r in ctx.results] == ["b", "a"]
+    assert set(ctx.timings) == {"intent", "retrieve", "geo", "filter", "score", "rank", "explain"}
+    assert ctx.response()["total_found"] == 2
+
+
+def test_pipeline_geo_radius_and_filters(fixed_pipeline):
+    ctx = fixed_pipeline.run(SearchRequest(query="", location={"zip": "94103", "radius_miles": 10}))
+    assert [r["id"] for r in ctx.results] == ["a"]
+    assert "mi away" in ctx.results[0]["_explain"]
+
+    ctx = fixed_pipeline.run(SearchRequest(query="", filters={"min_rating": 4.8}))
+    assert [r["id"] for r in ctx.results] == ["b"]
+
+
+def test_request_from_json_clamps_paging():
+    req = SearchRequest.from_json({"query": " housing ", "limit": 500, "page": 0, "top_k": 5})
+    assert req.query == "housing"
+    assert req.limit == 50 and req.page == 1 and req.top_k == 50
+
+
+def test_top_positions_matches_stable_sort():
+    key = np.array([3.0, 1.0, 2.0, 1.0, 5.0, 1.0, 0.5])
+    full = sorted(range(len(key)), key=lambda i: key[i])
+    for m in range(len(key) + 2):
+        assert list(top_positions(key, m)) == full[:m]
+
+
+def test_run_batch_isolates_failures(search_records, fixed_hits):
+    def retrieve(ctx):
+        if ctx.req.query == "boom":
+            raise ValueError("boom")
+        fixed_hits(ctx)
+
+    corpus = Corpus(search_records)
+    pipeline = SearchPipeline(lambda: corpus, stages={"retrieve": retrieve})
+    out = pipeline.run_batch([SearchRequest(query="a"), SearchRequest(query="boom"), SearchRequest(query="b", limit=1)])
+    assert [r["id"] for r in out[0].results] == ["b", "a"]
+    assert isinstance(out[1], ValueError)
+    assert [r["id"] for r in out[2].results] == ["b"]
+
+
+def test_run_batch_logs_and_counts_a_failed_batch_retrieval(search_records, fixed_hits, monkeypatch, caplog):
+    def broken(texts):
+        raise RuntimeError("encoder down")
+
+    monkeypatch.setattr(pipeline_module, "encode_queries", broken)
+    snap = Snapshot(Corpus(search_records), vectors=object())
+    pipeline = SearchPipeline(lambda: snap, stages={"retrieve": fixed_hits})
+    before = metrics.BATCH_FALLBACKS.value()
+    out = pipeline.run_batch([SearchRequest(query="a"), SearchRequest(query="b", limit=1)])
+    assert [r["id"] for r in out[0].results] == ["b", "a"] and len(out[1].results) == 1
+    assert metrics.BATCH_FALLBACKS.value() == before + 1
+    assert "encoder down" in caplog.text
+
+
+def test_result_cache_serves_every_page_from_one_ranking(search_records, fixed_hits):
+    calls = []
+
+    def retrieve(ctx):
+        calls.append(ctx.req.page)
+        fixed_hits(ctx)
+
+    corpus = Corpus(search_records)
+    cache = LRUCache(maxsize=8)
+    pipeline = SearchPipeline(lambda: corpus, stages={"retrieve": retrieve}, result_cache=cache)
+    first = pipeline.run(SearchRequest(query="Support", limit=1))
+    second = pipeline.run(SearchRequest(query="support ", limit=1, page=2))
+    assert calls == [1]
+    assert [r["id"] for r in first.results + second.results] == ["b", "a"]
+    assert second.response()["total_found"] == 2 and cache.stats()["hits"] == 1
+    pipeline.run(SearchRequest(query="support", limit=1, sort="rating"))
+    assert calls == [1, 1]
+
+
+def test_run_batch_shares_the_result_cache_and_the_batch_snapshot(search_records, fixed_hits, caplog):
+    calls = []
+
+    def retrieve(ctx):
+        calls.append(ctx.corpus)
+        fixed_hits(ctx)
+
+    first, later = Corpus(search_records), Corpus(search_records)
+    snaps = iter([first, first, later])
+    pipeline = SearchPipeline(lambda: next(snaps), stages={"retrieve": retrieve}, result_cache=LRUCache(maxsize=8))
+    page1 = pipeline.run(SearchRequest(query="support", limit=1))
+    out = pipeline.run_batch([SearchRequest(query="support", limit=1, cursor=page1.next_cursor),
+                              SearchRequest(query="support", limit=1, page=2)])
+    assert calls == [first]  # both served from page 1's ranking on the batch's snapshot
+    assert [r["id"] for r in out[0].results] == [r["id"] for r in out[1].results] == ["a"]
+    assert pipeline.run_batch([SearchRequest(query="support", limit=1)])[0].results[0]["id"] == "b"
+    assert calls == [first, later]
+    assert "batched retrieval failed" not in caplog.text  # nothing to batch, nothing to encode
+
+
+def test_cursor_scrolls_through_ties_without_repeats(search_records):
+    records = [dict(search_records[0], id=f"r{i}", ratings={"avg_rating": 4.0 + (i % 2)}) for i in range(7)]
+    corpus = Corpus(records)
+
+    def retrieve(ctx):
+        ctx.rows = np.arange(len(records), dtype=np.int64)[::-1].copy()
+        ctx.semantic = np.zeros(len(records))
+        ctx.lexical = np.zeros(len(records))
+        ctx.geo = np.zeros(len(records))
+
+    pipeline = SearchPipeline(lambda: corpus, stages={"retrieve": retrieve}, result_cache=LRUCache(maxsize=8))
+    ctx = pipeline.run(SearchRequest(sort="rating", limit=2))
+    seen = [r["id"] for r in ctx.results]
+    while ctx.next_cursor:
+        ctx = pipeline.run(SearchRequest(sort="rating", limit=2, cursor=ctx.next_cursor))
+        seen += [r["id"] for r in ctx.results]
+    assert sorted(seen) == sorted(r["id"] for r in records)
+    assert seen[:3] == ["r5", "r3", "r1"]
+    with pytest.raises(InvalidCursor):
+        pipeline.run(SearchRequest(sort="newest", cursor=ctx.next_cursor or "e30"))
+
+
+def _walk(pipeline, **kw):
+    ctx = pipeline.run(SearchRequest(**kw))
+    seen = [r["id"] for r in ctx.results]
+    while ctx.next_cursor:
+        ctx = pipeline.run(SearchRequest(cursor=ctx.next_cursor, **kw))
+        seen += [r["id"] for r in ctx.results]
+    return seen
+
+
+@pytest.fixture(scope="module")
+def synthetic_snapshot():
+    import backend.vector_search as vs
+    from conftest import WordModel
+
+    model, state = vs._model, vs._state
+    vs._model = WordModel()
+    try:
+        corpus = Corpus(list(synthetic.iter_nonprofits(800)))
+        yield Snapshot(corpus, vs.build_index(corpus.live_items()))
+    finally:
+        vs._model, vs._state = model, state
+
+
+@pytest.mark.parametrize("sort", SORTS)
+def test_cursor_walk_serves_the_whole_ranking_in_order(sort, synthetic_snapshot):
+    pipeline = SearchPipeline(lambda: synthetic_snapshot, result_cache=LRUCache(maxsize=64))
+    kw = dict(query="housing help for families", sort=sort, limit=7, top_k=60,
+              location={"zip": "94103", "radius_miles": 200} if sort == "distance" else None)
+    seen = _walk(pipeline, **kw)
+
+    # Relevance scrolls on into deeper retrieval; other sorts stay on page 1's candidates
+    depth = MAX_CURSOR_DEPTH if sort == "relevance" else 60
+    full = pipeline.run(SearchRequest(**{**kw, "top_k": depth}))
+    ids = [full.corpus.ids[row] for row in full.rows]
+    key_of = dict(zip(ids, cursor_keys(full)))
+    assert len(seen) == len(set(seen)) and sorted(seen) == sorted(ids)
+    assert [key_of[cid] for cid in seen] == sorted(key_of.values())
+    if sort != "relevance":
+        assert len(seen) == pipeline.run(SearchRequest(**kw)).total
+
+
+def test_hybrid_retrieval_surfaces_a_lexical_only_hit(synthetic_snapshot):
+    # The EIN is not in the embedded text, so only BM25 can find it
+    target = synthetic_snapshot.corpus.items[500]
+    pipeline = SearchPipeline(lambda: synthetic_snapshot)
+    semantic = pipeline.run(SearchRequest(query=target["ein"], retrieval="semantic", top_k=20))
+    assert target["id"] not in [r["id"] for r in semantic.results]
+    hybrid = pipeline.run(SearchRequest(query=target["ein"], top_k=20))
+    assert hybrid.retrieval == "hybrid" and hybrid.results[0]["id"] == target["id"]
+    assert hybrid.results[0]["_scores"]["lexical"] == 1.0
+
+
+def test_retrieval_falls_back_to_lexical_without_vectors(synthetic_snapshot):
+    corpus = synthetic_snapshot.corpus
+    pipeline = SearchPipeline(lambda: Snapshot(corpus, None))
+    ctx = pipeline.run(SearchRequest(query=corpus.items[7]["name"], retrieval="semantic"))
+    assert ctx.retrieval == "lexical" and ctx.response()["retrieval"] == "lexical"
+    assert ctx.results[0]["name"] == corpus.items[7]["name"]
+    assert all(r["_scores"]["semantic"] == 0 for r in ctx.results)
+
+
+def _candidates(ctx):
+    return {ctx.corpus.ids[row] for row in ctx.rows}
+
+
+def _nearest(corpus, zip_code, radius, n):
+    lat, lon = ZIP_TO_LATLON.locate(zip_code)
+    distance = haversine_miles_np(lat, lon, corpus.lat, corpus.lon)
+    order = [row for row in np.argsort(distance, kind="stable") if distance[row] <= radius]
+    return [corpus.ids[row] for row in order[:n]]
+
+
+def test_geo_union_adds_nearby_orgs_intersect_only_cuts(synthetic_snapshot):
+    pipeline = SearchPipeline(lambda: synthetic_snapshot)
+    kw = dict(query="community support programs", top_k=40)
+    unlocated = _candidates(pipeline.run(SearchRequest(**kw)))
+    nearest = set(_nearest(synthetic_snapshot.corpus, "94103", 100, 40))
+
+    intersect = _candidates(pipeline.run(SearchRequest(
+        **kw, location={"zip": "94103", "radius_miles": 100, "mode": "intersect"})))
+    assert intersect and intersect < unlocated
+    # The default: vector/BM25 hits in the radius plus the top_k nearest orgs, whatever their text
+    assert pipeline_module.GEO_MODE == "union"
+    union = pipeline.run(SearchRequest(**kw, location={"zip": "94103", "radius_miles": 100}))
+    assert _candidates(union) == intersect | nearest and union.total > len(intersect)
+
+
+def test_distance_sort_serves_the_nearest_orgs(synthetic_snapshot):
+    pipeline = SearchPipeline(lambda: synthetic_snapshot)
+    for mode in ("union", "intersect"):
+        ctx = pipeline.run(SearchRequest(query="community support programs", sort="distance", limit=10, top_k=20,
+                                         location={"zip": "94103", "radius_miles": 25, "mode": mode}))
+        assert [r["id"] for r in ctx.results] == _nearest(synthetic_snapshot.corpus, "94103", 25, 10)
+
+
+def test_relevance_cursor_deepens_through_a_tie(search_records):
+    records = [dict(search_records[0], id=f"r{i}") for i in range(40)]
+    corpus = Corpus(records)
+    depths = []
+
+    def retrieve(ctx):
+        # Every candidate scores the same: one tie group across every depth
+        k = ctx.req.top_k
+        depths.append(k)
+        ctx.rows = np.arange(len(records), dtype=np.int64)[::-1][:k].copy()
+        ctx.semantic = ctx.lexical = ctx.geo = np.zeros(len(ctx.rows))
+        ctx.depth_limited = len(ctx.rows) >= k
+
+    pipeline = SearchPipeline(lambda: corpus, stages={"retrieve": retrieve}, result_cache=LRUCache(maxsize=16))
+    seen = _walk(pipeline, limit=3, top_k=4)
+    assert sorted(seen) == sorted(r["id"] for r in records) and len(seen) == len(records)
+    assert max(depths) >= len(records) and depths == sorted(depths)
+
+
+def test_batched_retrieval_is_timed_per_request(search_records, word_model):
+    import backend.vector_search as vs
+
+    corpus = Corpus(search_records)
+    state = vs.build_index(corpus.items)
+    pipeline = SearchPipeline(lambda: Snapshot(corpus, state))
+    waits = metrics.STAGE_SECONDS.count("batch_wait")
+    vs.enable_batching(window_ms=1)
+    try:
+        batched = pipeline.run(SearchRequest(query="vets help"))
+    finally:
+        vs.disable_batching()
+    assert len(word_model.calls) == 2  # the corpus, then the query on the batcher thread
+    assert {"encode", "index_search", "batch_wait"} <= set(batched.timings)
+    assert metrics.STAGE_SECONDS.count("batch_wait") == waits + 1
+
+    direct = pipeline.run(SearchRequest(query="vets help"))
+    assert [r["id"] for r in batched.results] == [r["id"] for r in direct.results] == ["b", "a"]
@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pytest
+
+from backend import ranking
+from backend.eval_ranking import ndcg
+
+GBDT = {
+    "type": "gbdt", "features": ["semantic", "lexical"], "base_score": 0.1, "learning_rate": 0.5,
+    "trees": [
+        {"feature": [0, 1, -1, -1, -1], "threshold": [0.3, 0.5, 0, 0, 0],
+         "left": [1, 3, -1, -1, -1], "right": [2, 4, -1, -1, -1], "value": [0, 0, 0.9, 0.1, 0.4]},
+        {"feature": [-1], "threshold": [0], "left": [-1], "right": [-1], "value": [0.2]},
+    ],
+}
+
+
+@pytest.fixture()
+def registry(monkeypatch):
+    monkeypatch.setattr(ranking, "SCORERS", dict(ranking.SCORERS))
+    monkeypatch.setattr(ranking, "_active", "linear")
+
+
+def _features(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return {f: rng.random(n) for f in ranking.FEATURES}
+
+
+def test_linear_scorer_matches_the_formula_exactly():
+    cols = _features()
+    X = ranking.feature_matrix(cols)
+    expected = ranking.final_score(cols["semantic"], cols["geo"], cols["trust"], cols["popularity"], cols["lexical"])
+    assert np.array_equal(ranking.score(X), expected)
+    assert np.allclose(ranking.LinearScorer({"geo": 2.0}, bias=1.0)(X), 2.0 * cols["geo"] + 1.0)
+
+
+def test_tree_ensemble_walks_every_candidate_to_its_leaf(tmp_path):
+    path = tmp_path / "gbdt.json"
+    path.write_text(json.dumps(GBDT))
+    scorer = ranking.load_scorer(str(path))
+    cols = _features()
+    expected = 0.1 + 0.5 * 0.2 + 0.5 * np.where(cols["semantic"] > 0.3, 0.9,
+                                                 np.where(cols["lexical"] <= 0.5, 0.1, 0.4))
+    assert np.allclose(scorer(ranking.feature_matrix(cols)), expected)
+
+
+def test_load_scorer_rejects_bad_models(tmp_path):
+    bad = [
+        {"type": "logistic", "weights": {"clicks": 1.0}},
+        {"type": "gbdt", "trees": [{"feature": [0], "threshold": [0], "left": [5], "right": [1], "value": [0]}]},
+        {"type": "svm"},
+    ]
+    for i, spec in enumerate(bad):
+        path = tmp_path / f"{i}.json"
+        path.write_text(json.dumps(spec))
+        with pytest.raises(ValueError):
+            ranking.load_scorer(str(path))
+
+
+def test_set_scorer_loads_and_activates_a_model_file(tmp_path, registry):
+    path = tmp_path / "logistic.json"
+    path.write_text(json.dumps({"type": "logistic", "weights": {"semantic": 4.0}, "bias": -2.0}))
+    ranking.set_scorer(path=str(path))
+    name, scorer = ranking.active_scorer()
+    assert name == "logistic" and isinstance(scorer, ranking.LogisticScorer)
+    X = ranking.feature_matrix(_features(5))
+    assert np.allclose(ranking.score(X), 1 / (1 + np.exp(-(4.0 * X[:, 0] - 2.0))))
+    with pytest.raises(KeyError):
+        ranking.set_scorer("missing")
+    assert ranking.active_scorer()[0] == "logistic"
+
+
+def test_ndcg():
+    grades = {"a": 3, "b": 1}
+    assert ndcg(["a", "b", "c"], grades, 3) == pytest.approx(1.0)
+    assert ndcg(["c", "b", "a"], grades, 3) == pytest.approx((1 / np.log2(3) + 7 / 2) / (7 + 1 / np.log2(3)))
+    assert ndcg(["c"], grades, 1) == 0.0
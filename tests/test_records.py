@@ -0,0 +1,20 @@
+from backend.records import RecordStore, RecordsById
+
+
+RECORDS = [{"id": "a", "name": "Café Mission", "location": {"lat": 37.7}}, {"id": "b", "tags": []}]
+
+
+def test_store_round_trips_and_decodes_fresh_copies():
+    store = RecordStore(iter(RECORDS))
+    assert len(store) == 2 and list(store) == RECORDS
+    store[0]["name"] = "mutated"
+    assert store[0] == RECORDS[0]
+    by_id = RecordsById(store, {"a": 0, "b": 1})
+    assert by_id.get("b") == RECORDS[1] and "c" not in by_id
+
+
+def test_with_rows_overlays_without_touching_the_original():
+    store = RecordStore(RECORDS)
+    new = store.with_rows({0: None, 2: {"id": "c"}})
+    assert list(new) == [None, RECORDS[1], {"id": "c"}]
+    assert list(store) == RECORDS
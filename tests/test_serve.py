@@ -0,0 +1,106 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import pytest
+
+from backend import server, synthetic
+from backend.pipeline import SearchRequest
+import backend.vector_search as vs
+from conftest import ROOT
+
+# serve.py with the stand-in encoder, for `python -c`
+SERVE = """
+import sys
+sys.path[:0] = [{root!r}, {tests!r}]
+from conftest import WordModel
+import backend.vector_search as vs
+vs._model = WordModel()
+from backend import serve
+sys.argv = ["serve.py", "--host", "127.0.0.1", "--port", "{port}", "--workers", "2"]
+serve.main()
+"""
+
+
+@pytest.fixture()
+def data_file(monkeypatch, tmp_path, word_model):
+    """1600 synthetic records (enough to train IVF) as the data file; server globals restored afterwards."""
+    path = tmp_path / "np.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in synthetic.iter_nonprofits(1600)))
+    monkeypatch.setenv("NONPROFITS_PATH", str(path))
+    for name in ("DATA", "NP_BY_ID", "CORPUS", "SNAPSHOT"):
+        monkeypatch.setattr(server, name, getattr(server, name))
+    monkeypatch.setattr(server, "READINESS", {"state": "idle", "stages": {}, "error": None})
+    return path
+
+
+@pytest.mark.parametrize("index_type, mapped", [("flat", False), ("ivf_flat", True)])
+def test_shared_init_maps_the_artifact(monkeypatch, data_file, index_type, mapped):
+    monkeypatch.setenv("SEARCH_INDEX_TYPE", index_type)
+    server.init_search(shared=True)
+    assert isinstance(server.current_snapshot().vectors.embeddings, np.memmap)
+    # faiss maps the inverted lists of IVF indexes only; flat is read into the heap
+    index_path = str(data_file.parent / "index_cache" / "index.faiss")
+    with open("/proc/self/maps") as f:
+        assert (index_path in f.read()) is mapped
+
+    monkeypatch.setenv("SEARCH_BATCH_WINDOW_MS", "1")
+    try:
+        server.start_background()
+        assert vs.batching_stats() is not None
+        ctx = server.PIPELINE.run(SearchRequest(query="housing help"))
+        assert ctx.retrieval == "hybrid" and len(ctx.results) == 10
+    finally:
+        vs.disable_batching()
+
+
+def _get(port, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=2) as r:
+            return r.status, json.loads(r.read())
+    except OSError:
+        return None, None
+
+
+def _workers(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return {int(p) for p in f.read().split()}
+
+
+def _wait(predicate, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(0.1)
+    raise AssertionError("timed out")
+
+
+def test_serve_forks_workers_and_replaces_a_dead_one(tmp_path, data_file):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    code = SERVE.format(root=str(ROOT), tests=str(ROOT / "tests"), port=port)
+    proc = subprocess.Popen([sys.executable, "-c", code], env=dict(os.environ),
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    try:
+        _wait(lambda: _get(port, "/ready")[0] == 200)
+        workers = _wait(lambda: len(_workers(proc.pid)) == 2 and _workers(proc.pid))
+        os.kill(min(workers), signal.SIGKILL)
+        replaced = _wait(lambda: len(_workers(proc.pid)) == 2 and _workers(proc.pid) != workers
+                         and _workers(proc.pid))
+        assert min(workers) not in replaced and max(workers) in replaced
+        status, body = _get(port, "/search?q=housing+help")
+        assert status == 200 and body["retrieval"] == "hybrid" and body["results"]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        out, _ = proc.communicate(timeout=30)
+    assert proc.returncode == 0
+    assert b"forking 2 workers" in out and b"restarting" in out
@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from backend import server
+from backend.pipeline import DEFAULT_STAGES, SearchPipeline
+
+SHELTER = {"id": "c", "name": "Family Shelter", "causes": ["housing", "families"],
+           "location": {"lat": 37.7749, "lon": -122.4194}, "ratings": {"avg_rating": 4.2},
+           "trust": {"verification_status": 1}, "popularity_90d": 0.4, "created_at": "2022-06-01",
+           "impact_metrics": {}}
+QUERIES = ("housing help", "vets help", "family shelter")
+
+
+@pytest.fixture()
+def data_file(monkeypatch, tmp_path, search_records, word_model):
+    """search_records as the server's data file, with the server's globals restored afterwards."""
+    path = tmp_path / "np.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in search_records))
+    monkeypatch.setenv("NONPROFITS_PATH", str(path))
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    monkeypatch.setenv("ADMIN_ALLOW_LOCALHOST", "1")
+    for name in ("DATA", "NP_BY_ID", "CORPUS", "SNAPSHOT"):
+        monkeypatch.setattr(server, name, getattr(server, name))
+    monkeypatch.setattr(server, "READINESS", {"state": "idle", "stages": {}, "error": None})
+    monkeypatch.setattr(server, "PIPELINE", SearchPipeline(server.current_snapshot))
+    return path
+
+
+def test_admin_updates_wait_for_the_index(monkeypatch, data_file):
+    building, release = threading.Event(), threading.Event()
+    load_vectors = server._load_vectors
+
+    def slow_load_vectors(shared):
+        building.set()
+        release.wait(5)
+        return load_vectors(shared)
+
+    monkeypatch.setattr(server, "_load_vectors", slow_load_vectors)
+    thread = server.start_warmup()
+    assert building.wait(5)
+    client = server.app.test_client()
+    busy = client.post("/admin/nonprofits", json={"delete": ["a"]})
+    assert busy.status_code == 503 and busy.headers["Retry-After"] == "2"
+    assert "a" in server.current_snapshot().corpus.by_id
+
+    release.set()
+    thread.join(5)
+    assert client.post("/admin/nonprofits", json={"delete": ["a"]}).status_code == 200
+    snap = server.current_snapshot()
+    assert snap.vectors.ids == snap.corpus.ids == [None, "b"]
+
+
+def _write(path, records):
+    path.write_text("\n".join(json.dumps(r) for r in records))
+
+
+def _results(client):
+    return {q: client.post("/api/search", json={"query": q}).get_json()["results"] for q in QUERIES}
+
+
+def test_admin_calls_need_the_token(monkeypatch, data_file):
+    server.init_search()
+    client = server.app.test_client()
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    assert client.post("/admin/nonprofits", json={"delete": ["a"]}).status_code == 403
+    assert client.delete("/admin/nonprofits/a", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.post("/admin/reload").status_code == 403
+    assert "a" in server.current_snapshot().corpus.by_id
+    assert client.delete("/admin/nonprofits/a", headers={"X-Admin-Token": "s3cret"}).status_code == 200
+
+    monkeypatch.delenv("ADMIN_TOKEN")
+    remote = client.post("/admin/reload", environ_base={"REMOTE_ADDR": "10.0.0.7"})
+    assert remote.status_code == 403
+    assert client.post("/admin/reload").status_code == 200  # localhost, opted in
+    monkeypatch.delenv("ADMIN_ALLOW_LOCALHOST")
+    assert client.post("/admin/reload").status_code == 403
+
+
+def test_admin_changes_search_like_a_fresh_build(data_file, search_records):
+    server.init_search()
+    client = server.app.test_client()
+    edited = {**search_records[1], "name": "Veterans Housing Help"}
+    got = client.post("/admin/nonprofits", json={"upsert": [SHELTER, edited], "delete": ["a"]})
+    assert got.get_json() == {"success": True, "upserted": 2, "deleted": 1}
+    updated = _results(client)
+
+    _write(data_file, [edited, SHELTER])
+    server.init_search()
+    assert _results(client) == updated
+
+
+def test_reload_applies_the_data_file_diff(data_file, search_records):
+    server.init_search()
+    client = server.app.test_client()
+    _write(data_file, [search_records[1], SHELTER])
+    assert client.post("/admin/reload").get_json() == {"success": True, "upserted": 1, "deleted": 1}
+    assert client.post("/admin/reload").get_json() == {"success": True, "upserted": 0, "deleted": 0}
+    snap = server.current_snapshot()
+    assert snap.vectors.ids == snap.corpus.ids == [None, "b", "c"]
+    assert [r["id"] for r in _results(client)["family shelter"]][0] == "c"
+
+
+def test_reload_diff_and_admin_updates_do_not_interleave(monkeypatch, data_file, search_records):
+    server.init_search()
+    iter_records = server.iter_records
+    updater = threading.Thread(target=server.apply_changes, kwargs={"upserts": [SHELTER]})
+    blocked = []
+
+    def reading(path, **kw):
+        for it in iter_records(path, **kw):
+            if not updater.is_alive() and not blocked:
+                updater.start()
+                updater.join(0.2)
+                blocked.append(updater.is_alive())  # waits for the reload to finish
+            yield it
+
+    monkeypatch.setattr(server, "iter_records", reading)
+    _write(data_file, [search_records[0]])
+    assert server.reload_data() == {"upserted": 0, "deleted": 1}
+    updater.join(5)
+    assert blocked == [True] and "c" in server.current_snapshot().corpus.by_id
+    # The admin upsert came after that reload, so the next one removes it
+    assert server.reload_data() == {"upserted": 0, "deleted": 1}
+    snap = server.current_snapshot()
+    assert snap.vectors.ids == snap.corpus.ids == ["a", None, None]
+
+
+def test_watch_data_file_reloads_on_change(data_file, search_records):
+    server.init_search()
+    stop = server.watch_data_file(0.01)
+    try:
+        _write(data_file, [search_records[0]])
+        os.utime(data_file, (time.time() + 5, time.time() + 5))  # mtime may not tick on a fast rewrite
+        deadline = time.time() + 5
+        while "b" in server.current_snapshot().corpus.by_id and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        stop.set()
+    snap = server.current_snapshot()
+    assert "b" not in snap.corpus.by_id and snap.vectors.ids == ["a", None]
+
+
+def test_in_flight_searches_keep_their_snapshot(monkeypatch, data_file):
+    server.init_search()
+    started, release = threading.Event(), threading.Event()
+    stage_intent = dict(DEFAULT_STAGES)["intent"]
+
+    def paused_intent(ctx):
+        started.set()
+        release.wait(5)
+        stage_intent(ctx)
+
+    monkeypatch.setattr(server, "PIPELINE", SearchPipeline(server.current_snapshot,
+                                                           stages={"intent": paused_intent}))
+    client = server.app.test_client()
+    out = {}
+    thread = threading.Thread(target=lambda: out.update(before=_results(client)["housing help"]))
+    thread.start()
+    assert started.wait(5)
+    old = server.current_snapshot()
+    server.apply_changes(deletes=["a"])
+    assert server.current_snapshot() is not old and "a" in old.corpus.by_id
+    release.set()
+    thread.join(5)
+    assert "a" in [r["id"] for r in out["before"]]
+    assert "a" not in [r["id"] for r in _results(client)["housing help"]]
+
+
+def test_top_k_bounds_retrieval_end_to_end(data_file, search_records):
+    _write(data_file, [{**search_records[i % 2], "id": f"org{i}", "name": f"community help {i}"}
+                       for i in range(40)])
+    server.init_search()
+    client = server.app.test_client()
+    for retrieval in ("semantic", "lexical"):
+        for top_k in (5, 12):
+            body = {"query": "community help", "retrieval": retrieval, "top_k": top_k, "limit": 3}
+            got = client.post("/api/search?debug_timing=1", json=body).get_json()
+            assert got["candidates"]["retrieve"] == top_k and got["total_found"] == top_k
+            assert len(got["results"]) == 3
+    got = client.get("/search?q=community+help&retrieval=semantic&top_k=7&limit=3&debug_timing=1").get_json()
+    assert got["candidates"]["retrieve"] == 7
+    batch = client.post("/api/search/batch", json={"searches": [
+        {"query": "community help", "retrieval": "semantic", "top_k": k, "limit": 3} for k in (4, 9)]})
+    assert [r["total_found"] for r in batch.get_json()["results"]] == [4, 9]
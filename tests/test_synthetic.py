@@ -0,0 +1,30 @@
+import json
+from pathlib import Path
+
+from backend.corpus import Corpus
+from backend.ingest import iter_records
+from backend.synthetic import iter_nonprofits, write_corpus
+
+SAMPLE = json.loads((Path(__file__).resolve().parents[1] / "backend" / "data" / "nonprofits.json").read_text())
+
+
+def test_generator_is_deterministic_and_matches_the_schema():
+    first = list(iter_nonprofits(50, seed=3))
+    assert first == list(iter_nonprofits(50, seed=3))
+    assert first != list(iter_nonprofits(50, seed=4))
+    sample = SAMPLE["nonprofits"][0]
+    for rec in first:
+        assert set(rec) == set(sample)
+        assert set(rec["location"]) == set(sample["location"])
+        assert 1.0 <= rec["ratings"]["avg_rating"] <= 5.0
+    assert len({rec["id"] for rec in first}) == 50
+
+
+def test_written_corpus_loads_in_both_formats(tmp_path):
+    for name in ("np.jsonl", "np.json"):
+        path = str(tmp_path / name)
+        write_corpus(path, 20, seed=1)
+        meta = {}
+        corpus = Corpus(iter_records(path, meta=meta))
+        assert len(corpus) == 20 and corpus.by_id["syn_0000007"]["id"] == "syn_0000007"
+        assert name.endswith(".jsonl") or meta["metadata"]["synthetic"] is True
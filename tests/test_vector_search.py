@@ -0,0 +1,194 @@
+import json
+
+import numpy as np
+import pytest
+
+import backend.vector_search as vs
+from backend.vector_search import make_index, rerank_exact, _normalize
+
+
+def _vectors(n=600, dim=32, seed=0):
+    return _normalize(np.random.default_rng(seed).standard_normal((n, dim)).astype("float32"))
+
+
+@pytest.mark.parametrize("index_type", ["sq8", "pq"])
+def test_quantized_index_keeps_row_labels_and_supports_remove(index_type):
+    emb = _vectors()
+    rows = np.arange(len(emb), dtype=np.int64) + 1000
+    index = make_index(emb, index_type, pq_m=8, ids=rows)
+    _, I = index.search(emb[:5], 1)
+    assert set(I[:, 0]) <= set(rows)
+    index.remove_ids(np.array([1000], dtype=np.int64))
+    assert index.ntotal == len(emb) - 1
+
+
+def test_rerank_exact_orders_candidates_by_true_score():
+    emb = _vectors()
+    q = emb[:2]
+    candidates = np.array([[5, 0, -1, 7], [1, 9, 3, -1]], dtype=np.int64)
+    D, I = rerank_exact(q, candidates, lambda rows: emb[rows], 2)
+    assert I[0, 0] == 0 and I[1, 0] == 1
+    assert np.allclose(D[0], np.sort(emb[[5, 0, 7]] @ q[0])[::-1][:2])
+
+
+@pytest.mark.parametrize("index_type", ["sq8", "pq", "ivf_pq"])
+def test_filtered_search_on_quantized_indexes(index_type, monkeypatch):
+    emb = _vectors(n=2000)
+    rows = np.arange(len(emb), dtype=np.int64)
+    state = vs.VectorState(make_index(emb, index_type, pq_m=8, ids=rows), [f"n{r}" for r in rows], emb,
+                           [b""] * len(emb), vs.DEFAULT_TEXT_FIELDS, index_type)
+    monkeypatch.setattr(vs, "encode_queries", lambda texts: emb[:len(texts)])
+    allowed = rows % 2 == 1
+    hits = vs.search_batch(["q0", "q1"], top_k=10, allowed=allowed, state=state)
+    for per_query in hits:
+        assert len(per_query) == 10
+        assert all(int(h["id"][1:]) % 2 == 1 for h in per_query)
+
+
+@pytest.mark.parametrize("index_type, kind", [("ivf_flat", "IndexIVFFlat"), ("hnsw", "IndexHNSWFlat")])
+def test_build_and_search_each_backend(index_type, kind, monkeypatch):
+    emb = _vectors(n=2000)
+    rows = np.arange(len(emb), dtype=np.int64)
+    index = make_index(emb, index_type, ids=rows)
+    assert type(vs._base_index(index)).__name__ == kind
+    state = vs.VectorState(index, [f"n{r}" for r in rows], emb, [b""] * len(emb),
+                           vs.DEFAULT_TEXT_FIELDS, index_type)
+    monkeypatch.setattr(vs, "encode_queries", lambda texts: emb[[int(t[1:]) for t in texts]])
+    hits = vs.search_batch(["q3", "q1500"], top_k=10, state=state)
+    assert [len(h) for h in hits] == [10, 10]
+    assert [h[0]["id"] for h in hits] == ["n3", "n1500"]
+    assert all(h[0]["semantic_score"] >= h[-1]["semantic_score"] for h in hits)
+
+
+def test_ivf_falls_back_to_flat_on_a_small_corpus():
+    index = make_index(_vectors(n=100), "ivf_flat", ids=np.arange(100, dtype=np.int64))
+    assert type(vs._base_index(index)).__name__ == "IndexFlatIP"
+
+
+def test_search_batch_rejects_a_short_allowed_mask():
+    emb = _vectors(n=50)
+    rows = np.arange(len(emb), dtype=np.int64)
+    state = vs.VectorState(make_index(emb, "flat", ids=rows), [f"n{r}" for r in rows], emb,
+                           [b""] * len(emb), vs.DEFAULT_TEXT_FIELDS, "flat")
+    with pytest.raises(ValueError):
+        vs.search_batch(["q"], top_k=5, allowed=np.ones(40, dtype=bool), state=state)
+
+
+def test_query_variants_share_one_cached_vector(word_model):
+    first = vs.encode_queries(["Affordable Housing"])
+    again = vs.encode_queries(["  affordable   HOUSING ", "affordable housing"])
+    assert word_model.calls == [["affordable housing"]]
+    assert np.array_equal(again, np.vstack([first, first]))
+    assert vs.query_cache_stats()["hits"] == 2 and vs.query_cache_stats()["misses"] == 1
+
+
+def test_misses_of_one_call_are_encoded_together(word_model):
+    vs.encode_queries(["veterans"])
+    vs.encode_queries(["youth", "veterans", "Youth", "legal aid"])
+    assert word_model.calls == [["veterans"], ["legal aid", "youth"]]
+
+
+def test_warm_query_cache_precomputes(word_model):
+    vs.warm_query_cache(["housing", "veterans"])
+    assert word_model.calls == [["housing", "veterans"]]
+    vs.encode_queries(["Housing", "veterans"])
+    assert len(word_model.calls) == 1
+    assert vs.query_cache_stats()["size"] == 2
+
+
+def test_query_cache_evicts_the_least_recently_used(monkeypatch, word_model):
+    from backend.cache import LRUCache
+
+    monkeypatch.setattr(vs, "_query_cache", LRUCache(maxsize=2))
+    for q in ("housing", "veterans", "housing", "youth"):
+        vs.encode_queries([q])
+    assert vs.query_cache_stats()["evictions"] == 1
+    vs.encode_queries(["housing"])  # kept: used more recently than "veterans"
+    vs.encode_queries(["veterans"])
+    assert [c[0] for c in word_model.calls] == ["housing", "veterans", "youth", "veterans"]
+
+
+WORDS = ("housing", "shelter", "veterans", "youth", "tutoring", "legal", "food", "health", "arts", "jobs")
+
+
+def _records(n):
+    return [{"id": f"n{i}", "name": f"{WORDS[i % 10]} {WORDS[i * 3 % 7]} center",
+             "mission_text": WORDS[i * 7 % 10], "description": f"org {i}"} for i in range(n)]
+
+
+def _ranking(state, query):
+    hits = vs.search_batch([query], top_k=state.index.ntotal, state=state)[0]
+    return {h["id"]: h["semantic_score"] for h in hits}
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_with_changes_searches_like_a_fresh_build(index_type, word_model):
+    items = _records(30)
+    state = vs.build_index(items, index_type=index_type)
+    edited = {**items[4], "mission_text": "veterans legal"}
+    same_text = {**items[5], "causes": ["youth"]}
+    added = {"id": "new", "name": "legal food bank", "mission_text": "food", "description": "org new"}
+    word_model.calls.clear()
+    updated = state.with_changes({3: None, 4: edited, 5: same_text, 30: added})
+    assert word_model.calls == [[vs._record_text(it, vs.DEFAULT_TEXT_FIELDS) for it in (edited, added)]]
+    assert updated.ids[3] is None and updated.ids[30] == "new" and state.ids[3] == "n3"
+
+    fresh = vs.build_index(items[:3] + [edited, same_text] + items[6:] + [added], index_type=index_type)
+    for query in ("veterans legal", "food bank", "youth tutoring"):
+        got, want = _ranking(updated, query), _ranking(fresh, query)
+        assert set(got) == set(want)
+        assert all(abs(got[cid] - want[cid]) < 1e-5 for cid in want)
+
+
+def _encoded(model):
+    return [t for call in model.calls for t in call]
+
+
+def test_artifact_reuses_unchanged_embeddings(tmp_path, word_model):
+    items = _records(30)
+    first = vs.build_index(items, cache_dir=tmp_path)
+    assert len(_encoded(word_model)) == 30
+
+    word_model.calls.clear()
+    again = vs.build_index(items, cache_dir=tmp_path)
+    assert _encoded(word_model) == []
+    assert isinstance(again.embeddings, np.memmap)
+    assert _ranking(again, "veterans legal") == _ranking(first, "veterans legal")
+
+    edited = {**items[7], "description": "legal clinic"}
+    word_model.calls.clear()
+    changed = vs.build_index(items[:7] + [edited] + items[8:], cache_dir=tmp_path)
+    assert _encoded(word_model) == [vs._record_text(edited, vs.DEFAULT_TEXT_FIELDS)]
+    assert changed.ids == again.ids
+
+
+def test_artifact_switches_index_type_without_encoding(tmp_path, word_model):
+    items = _records(30)
+    vs.build_index(items, cache_dir=tmp_path)
+    word_model.calls.clear()
+    state = vs.build_index(items, cache_dir=tmp_path, index_type="hnsw")
+    assert _encoded(word_model) == [] and state.index_type == "hnsw"
+    assert json.loads((tmp_path / "manifest.json").read_text())["index_type"] == "hnsw"
+
+
+@pytest.mark.parametrize("key, value", [("model", "another/model"), ("version", 0), ("text_fields", ["name"])])
+def test_artifact_from_another_model_or_version_is_rebuilt(tmp_path, word_model, key, value):
+    items = _records(30)
+    vs.build_index(items, cache_dir=tmp_path)
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    (tmp_path / "manifest.json").write_text(json.dumps({**manifest, key: value}))
+
+    word_model.calls.clear()
+    state = vs.build_index(items, cache_dir=tmp_path)
+    assert len(_encoded(word_model)) == 30
+    assert not isinstance(state.embeddings, np.memmap)
+    assert json.loads((tmp_path / "manifest.json").read_text()) == manifest
+
+
+def test_unreadable_artifact_is_rebuilt(tmp_path, word_model):
+    items = _records(30)
+    vs.build_index(items, cache_dir=tmp_path)
+    (tmp_path / "manifest.json").write_text("{not json")
+    word_model.calls.clear()
+    vs.build_index(items, cache_dir=tmp_path)
+    assert len(_encoded(word_model)) == 30